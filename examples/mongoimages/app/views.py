@@ -1,11 +1,12 @@
 import calendar
 
-from flask import make_response, Response
+from flask import abort
 from flask_appbuilder import expose, has_access, permission_name
 from flask_appbuilder import ModelView
 from flask_appbuilder.charts.views import GroupByChartView
 from flask_appbuilder.models.group import aggregate_count
 from flask_appbuilder.models.mongoengine.interface import MongoEngineInterface
+from flask_appbuilder.utils.gridfs import send_gridfs_file
 
 
 from . import appbuilder
@@ -44,30 +45,27 @@ class ContactModelView(ModelView):
     @has_access
     def mongo_download(self, pk):
         item = self.datamodel.get(pk)
-        file = item.file.read()
-        response = make_response(file)
-        response.headers["Content-Disposition"] = "attachment; filename={0}".format(
-            item.file.name
-        )
-        return response
+        if not item or not item.file:
+            abort(404)
+        return send_gridfs_file(item.file.get(), as_attachment=True)
 
     @expose("/img/<pk>")
     @has_access
     @permission_name("show_img")
     def img(self, pk):
         item = self.datamodel.get(pk)
-        mime_type = item.image.content_type
-        return Response(item.image.read(), mimetype=mime_type, direct_passthrough=True)
+        if not item or not item.image:
+            abort(404)
+        return send_gridfs_file(item.image.get())
 
     @expose("/img_thumb/<pk>")
     @has_access
     @permission_name("show_img")
     def img_thumb(self, pk):
         item = self.datamodel.get(pk)
-        mime_type = item.image.content_type
-        return Response(
-            item.image.thumbnail.read(), mimetype=mime_type, direct_passthrough=True
-        )
+        if not item or not item.image.thumbnail:
+            abort(404)
+        return send_gridfs_file(item.image.thumbnail, mimetype=item.image.content_type)
 
 
 class GroupModelView(ModelView):
@@ -5,8 +5,17 @@ from .actions import action  # noqa: F401
 from .api import ModelRestApi  # noqa: F401
 from .base import AppBuilder  # noqa: F401
 from .baseviews import BaseView, expose  # noqa: F401
+from .charts.api import ChartRestApi, DirectByChartRestApi  # noqa: F401
 from .charts.views import DirectByChartView, GroupByChartView  # noqa: F401
-from .models.group import aggregate_avg, aggregate_count, aggregate_sum  # noqa: F401
+from .models.group import (  # noqa: F401
+    aggregate_avg,
+    aggregate_count,
+    aggregate_max,
+    aggregate_min,
+    aggregate_percentile,
+    aggregate_stddev,
+    aggregate_sum,
+)
 from .models.sqla import Base, Model, SQLA  # noqa: F401
 from .security.decorators import has_access, permission_name  # noqa: F401
 from .views import (  # noqa: F401
@@ -1,9 +1,10 @@
+import copy
 import functools
 import json
 import logging
 import re
 import traceback
-from typing import Callable, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
 import urllib.parse
 
 from apispec import APISpec, yaml_utils
@@ -19,7 +20,7 @@ from werkzeug.exceptions import BadRequest
 import yaml
 
 from .convert import Model2SchemaConverter
-from .schemas import get_info_schema, get_item_schema, get_list_schema
+from .schemas import bulk_schema, get_info_schema, get_item_schema, get_list_schema
 from .._compat import as_unicode
 from ..const import (
     API_ADD_COLUMNS_RES_KEY,
@@ -58,7 +59,11 @@ from ..const import (
     PERMISSION_PREFIX,
 )
 from ..exceptions import FABException, InvalidOrderByColumnFABException
+from ..models.cache import BaseCacheBackend, get_model_generation_name
+from ..models.filters import Filters
 from ..security.decorators import permission_name, protect
+from ..utils.base import get_column_root_relation
+from ..utils.singleflight import SingleFlight
 
 log = logging.getLogger(__name__)
 
@@ -943,6 +948,36 @@ class ModelRestApi(BaseModelApi):
     """
     validators_columns: Optional[Dict[str, Callable]] = None
     """ Dictionary to add your own marshmallow validators """
+    list_query_coalescing = False
+    """
+        Set to True to coalesce identical concurrent get list requests.
+        While a query is in flight, requests with the same filters, order,
+        page, select columns and user roles wait for it and share its result.
+        Requests using filters with callable values (ex: the current user)
+        are never coalesced. Hit rates are available on
+        ``list_query_single_flight.stats``
+    """
+    cache_backend: Optional[BaseCacheBackend] = None
+    """
+        Set a cache backend to cache get and get list results::
+
+            from flask_appbuilder.models.cache import MemoryCache
+
+            class MyApi(ModelRestApi):
+                datamodel = SQLAInterface(MyModel)
+                cache_backend = MemoryCache(max_size=500)
+
+        Entries are keyed by filters, order, page, select columns and user roles,
+        and are invalidated by any write made through the datamodel on this
+        model or on the related models it shows
+    """
+    cache_timeout: Optional[int] = None
+    """ Cache entries timeout in seconds, defaults to the backend default """
+    allow_bulk_operations = False
+    """
+        Set to True to expose the bulk delete and bulk update endpoints,
+        protected by the ``can_bulk_delete`` and ``can_bulk_update`` permissions
+    """
 
     add_query_rel_fields = None
     """
@@ -1010,14 +1045,29 @@ class ModelRestApi(BaseModelApi):
         (inherit from BaseModel2SchemaConverter)
     """
     _apispec_parameter_schemas = {
+        "bulk_schema": bulk_schema,
         "get_info_schema": get_info_schema,
         "get_item_schema": get_item_schema,
         "get_list_schema": get_list_schema,
     }
 
     def __init__(self):
+        if not self.allow_bulk_operations:
+            self.exclude_route_methods = set(self.exclude_route_methods) | {
+                "bulk_delete",
+                "bulk_update",
+            }
+        # PATCH follows the route exclusion and permission name of PUT
+        if "put" in self.exclude_route_methods:
+            self.exclude_route_methods = set(self.exclude_route_methods) | {"patch"}
+        if self.method_permission_name and "put" in self.method_permission_name:
+            self.method_permission_name = {
+                "patch": self.method_permission_name["put"],
+                **self.method_permission_name,
+            }
         super(ModelRestApi, self).__init__()
         self.validators_columns = self.validators_columns or {}
+        self.list_query_single_flight = SingleFlight()
         self.model2schemaconverter = self.model2schemaconverter(
             self.datamodel, self.validators_columns
         )
@@ -1148,6 +1198,7 @@ class ModelRestApi(BaseModelApi):
         )
         self.edit_query_rel_fields = self.edit_query_rel_fields or dict()
         self.add_query_rel_fields = self.add_query_rel_fields or dict()
+        self._cache_generation_names = self._get_cache_generation_names()
 
     def merge_add_field_info(self, response, **kwargs):
         _kwargs = kwargs.get("add_columns", {})
@@ -1324,7 +1375,8 @@ class ModelRestApi(BaseModelApi):
             500:
               $ref: '#/components/responses/500'
         """
-        return self.info_headless(**kwargs)
+        with self.datamodel.read_only():
+            return self.info_headless(**kwargs)
 
     def get_headless(self, pk, **kwargs) -> Response:
         """
@@ -1334,27 +1386,39 @@ class ModelRestApi(BaseModelApi):
         :param kwargs: Query string parameter arguments
         :return: HTTP Response
         """
-        item = self.datamodel.get(pk, self._base_filters, self.show_select_columns)
-        if not item:
-            return self.response_404()
-
         _response = dict()
         _args = kwargs.get("rison", {})
         select_cols = _args.get(API_SELECT_COLUMNS_RIS_KEY, [])
         _pruned_select_cols = [col for col in select_cols if col in self.show_columns]
+        if _pruned_select_cols:
+            _show_model_schema = self.model2schemaconverter.convert(_pruned_select_cols)
+        else:
+            _show_model_schema = self.show_model_schema
+
+        query_key = None
+        if self.cache_backend is not None:
+            query_key = self._get_query_key(
+                "get", self._base_filters, pk, tuple(_pruned_select_cols)
+            )
+        if query_key is None:
+            result = self._get_item_result(pk, _show_model_schema)
+        else:
+            result = copy.deepcopy(
+                self._get_shared_result(
+                    query_key, False, self._get_item_result, pk, _show_model_schema
+                )
+            )
+        if result is None:
+            return self.response_404()
+
         self.set_response_key_mappings(
             _response,
             self.get,
             _args,
             **{API_SELECT_COLUMNS_RIS_KEY: _pruned_select_cols},
         )
-        if _pruned_select_cols:
-            _show_model_schema = self.model2schemaconverter.convert(_pruned_select_cols)
-        else:
-            _show_model_schema = self.show_model_schema
-
         _response["id"] = pk
-        _response[API_RESULT_RES_KEY] = _show_model_schema.dump(item, many=False)
+        _response[API_RESULT_RES_KEY] = result
         self.pre_get(_response)
         return self.response(200, **_response)
 
@@ -1438,7 +1502,8 @@ class ModelRestApi(BaseModelApi):
             500:
               $ref: '#/components/responses/500'
         """
-        return self.get_headless(pk, **kwargs)
+        with self.datamodel.read_only():
+            return self.get_headless(pk, **kwargs)
 
     def get_list_headless(self, **kwargs) -> Response:
         """
@@ -1475,18 +1540,38 @@ class ModelRestApi(BaseModelApi):
         # handle pagination
         page_index, page_size = self._handle_page_args(_args)
         # Make the query
-        count, lst = self.datamodel.query(
+        query_args = (
             joined_filters,
             order_column,
             order_direction,
-            page=page_index,
-            page_size=page_size,
-            select_columns=self.list_select_columns,
+            page_index,
+            page_size,
+            _list_model_schema,
         )
-        pks = self.datamodel.get_keys(lst)
-        _response[API_RESULT_RES_KEY] = _list_model_schema.dump(lst, many=True)
-        _response["ids"] = pks
-        _response["count"] = count
+        query_key = None
+        if self.list_query_coalescing or self.cache_backend is not None:
+            query_key = self._get_query_key(
+                "get_list",
+                joined_filters,
+                order_column,
+                order_direction,
+                page_index,
+                page_size,
+                tuple(_pruned_select_cols),
+            )
+        if query_key is None:
+            _response.update(self._get_list_result(*query_args))
+        else:
+            _response.update(
+                copy.deepcopy(
+                    self._get_shared_result(
+                        query_key,
+                        self.list_query_coalescing,
+                        self._get_list_result,
+                        *query_args,
+                    )
+                )
+            )
         self.pre_get_list(_response)
         return self.response(200, **_response)
 
@@ -1582,7 +1667,8 @@ class ModelRestApi(BaseModelApi):
             500:
               $ref: '#/components/responses/500'
         """
-        return self.get_list_headless(**kwargs)
+        with self.datamodel.read_only():
+            return self.get_list_headless(**kwargs)
 
     def post_headless(self) -> Response:
         """
@@ -1716,6 +1802,89 @@ class ModelRestApi(BaseModelApi):
         """
         return self.put_headless(pk)
 
+    def patch_headless(self, pk) -> Response:
+        """
+            PATCH/Partial edit item to Model, only the sent columns
+            are loaded, validated and updated
+        """
+        if not request.is_json or not isinstance(request.json, dict):
+            return self.response(400, **{"message": "Request is not JSON"})
+        data = request.json
+        select_columns = [
+            col
+            for col in data
+            if col in self.edit_columns and not self.datamodel.is_relation(col)
+        ]
+        if not select_columns:
+            pk_name = self.datamodel.get_pk_name()
+            select_columns = pk_name if isinstance(pk_name, list) else [pk_name]
+        item = self.datamodel.get(pk, self._base_filters, select_columns)
+        if not item:
+            return self.response_404()
+        try:
+            item = self.edit_model_schema.load(data, instance=item, partial=True)
+        except ValidationError as err:
+            return self.response_422(message=err.messages)
+        self.pre_update(item)
+        try:
+            self.datamodel.edit(item, raise_exception=True)
+        except IntegrityError as e:
+            return self.response_422(message=str(e.orig))
+        self.post_update(item)
+        if request.headers.get("Prefer") == "return=minimal":
+            return make_response("", 204)
+        return self.response(
+            200, **{API_RESULT_RES_KEY: self.edit_model_schema.dump(item, many=False)}
+        )
+
+    @expose("/<pk>", methods=["PATCH"])
+    @protect()
+    @safe
+    @permission_name("put")
+    def patch(self, pk):
+        """PATCH item to Model
+        ---
+        patch:
+          description: >-
+            Change only the sent columns of an item. Send the header
+            Prefer: return=minimal to get an empty 204 response
+          parameters:
+          - in: path
+            schema:
+              type: integer
+            name: pk
+          requestBody:
+            description: Model schema, all columns are optional
+            required: true
+            content:
+              application/json:
+                schema:
+                  $ref: '#/components/schemas/{{self.__class__.__name__}}.put'
+          responses:
+            200:
+              description: Item changed
+              content:
+                application/json:
+                  schema:
+                    type: object
+                    properties:
+                      result:
+                        $ref: '#/components/schemas/{{self.__class__.__name__}}.put'
+            204:
+              description: Item changed, no content
+            400:
+              $ref: '#/components/responses/400'
+            401:
+              $ref: '#/components/responses/401'
+            404:
+              $ref: '#/components/responses/404'
+            422:
+              $ref: '#/components/responses/422'
+            500:
+              $ref: '#/components/responses/500'
+        """
+        return self.patch_headless(pk)
+
     def delete_headless(self, pk) -> Response:
         """
             Delete item from Model
@@ -1763,6 +1932,164 @@ class ModelRestApi(BaseModelApi):
         """
         return self.delete_headless(pk)
 
+    def bulk_delete_headless(self, **kwargs) -> Response:
+        """
+            Delete all items from Model that match the filters
+        """
+        try:
+            joined_filters = self._handle_bulk_filters_args(kwargs.get("rison", {}))
+        except FABException as e:
+            return self.response_400(message=str(e))
+        try:
+            if self._is_hook_overridden("pre_delete", "post_delete"):
+                _, items = self.datamodel.query(joined_filters)
+                for item in items:
+                    self.pre_delete(item)
+                self.datamodel.delete_all(items, raise_exception=True)
+                for item in items:
+                    self.post_delete(item)
+                count = len(items)
+            else:
+                count = self.datamodel.delete_where(
+                    joined_filters, raise_exception=True
+                )
+        except IntegrityError as e:
+            return self.response_422(message=str(e.orig))
+        return self.response(200, count=count)
+
+    @expose("/", methods=["DELETE"])
+    @protect()
+    @safe
+    @permission_name("bulk_delete")
+    @rison(bulk_schema)
+    def bulk_delete(self, **kwargs):
+        """Delete all items that match the filters
+        ---
+        delete:
+          description: >-
+            Delete all items that match the filters, using a single
+            statement when possible
+          parameters:
+          - in: query
+            name: q
+            content:
+              application/json:
+                schema:
+                  $ref: '#/components/schemas/bulk_schema'
+          responses:
+            200:
+              description: Items deleted
+              content:
+                application/json:
+                  schema:
+                    type: object
+                    properties:
+                      count:
+                        type: integer
+            400:
+              $ref: '#/components/responses/400'
+            401:
+              $ref: '#/components/responses/401'
+            422:
+              $ref: '#/components/responses/422'
+            500:
+              $ref: '#/components/responses/500'
+        """
+        return self.bulk_delete_headless(**kwargs)
+
+    def bulk_update_headless(self, **kwargs) -> Response:
+        """
+            Set the same values on all items from Model that match the filters
+        """
+        if not request.is_json or not isinstance(request.json, dict):
+            return self.response(400, **{"message": "Request is not JSON"})
+        data = request.json
+        invalid_columns = [
+            col
+            for col in data
+            if col not in self.edit_columns or self.datamodel.is_relation(col)
+        ]
+        if not data or invalid_columns:
+            return self.response_400(
+                message=f"Invalid bulk update columns: {invalid_columns}"
+            )
+        errors = self.edit_model_schema.validate(data, partial=True)
+        if errors:
+            return self.response_422(message=errors)
+        values = {
+            col: self.edit_model_schema.fields[col].deserialize(value)
+            for col, value in data.items()
+        }
+        try:
+            joined_filters = self._handle_bulk_filters_args(kwargs.get("rison", {}))
+        except FABException as e:
+            return self.response_400(message=str(e))
+        try:
+            if self._is_hook_overridden("pre_update", "post_update"):
+                _, items = self.datamodel.query(joined_filters)
+                for item in items:
+                    for col, value in values.items():
+                        setattr(item, col, value)
+                    self.pre_update(item)
+                self.datamodel.edit_all(items, raise_exception=True)
+                for item in items:
+                    self.post_update(item)
+                count = len(items)
+            else:
+                count = self.datamodel.update_where(
+                    joined_filters, values, raise_exception=True
+                )
+        except IntegrityError as e:
+            return self.response_422(message=str(e.orig))
+        return self.response(200, count=count)
+
+    @expose("/", methods=["PATCH"])
+    @protect()
+    @safe
+    @permission_name("bulk_update")
+    @rison(bulk_schema)
+    def bulk_update(self, **kwargs):
+        """Set values on all items that match the filters
+        ---
+        patch:
+          description: >-
+            Set the same values on all items that match the filters,
+            using a single statement when possible
+          parameters:
+          - in: query
+            name: q
+            content:
+              application/json:
+                schema:
+                  $ref: '#/components/schemas/bulk_schema'
+          requestBody:
+            description: Model schema, only non relation columns are allowed
+            required: true
+            content:
+              application/json:
+                schema:
+                  $ref: '#/components/schemas/{{self.__class__.__name__}}.put'
+          responses:
+            200:
+              description: Items changed
+              content:
+                application/json:
+                  schema:
+                    type: object
+                    properties:
+                      count:
+                        type: integer
+            400:
+              $ref: '#/components/responses/400'
+            401:
+              $ref: '#/components/responses/401'
+            422:
+              $ref: '#/components/responses/422'
+            500:
+              $ref: '#/components/responses/500'
+        """
+        return self.bulk_update_headless(**kwargs)
+
     """
     ------------------------------------------------
                 HELPER FUNCTIONS
@@ -1823,6 +2150,119 @@ class ModelRestApi(BaseModelApi):
         self._filters.rest_add_filters(rison_args.get(API_FILTERS_RIS_KEY, []))
         return self._filters.get_joined_filters(self._base_filters)
 
+    def _is_hook_overridden(self, *names: str) -> bool:
+        return any(
+            getattr(self.__class__, name) is not getattr(ModelRestApi, name)
+            for name in names
+        )
+
+    def _get_query_key(
+        self, name: str, filters: Filters, *args: Hashable
+    ) -> Optional[Tuple[Hashable, ...]]:
+        """
+            Returns a hashable key that identifies a query for the current
+            user roles, or None if the query results can't be shared
+
+        :param name: The name of the endpoint
+        :param filters: The joined filters (base filters included)
+        :param args: The other hashable query arguments
+        :return: A tuple or None
+        """
+        filters_key = filters.get_normalized_key()
+        if filters_key is None:
+            return None
+        return (
+            (name, filters_key)
+            + args
+            + (self.appbuilder.sm.get_user_roles_fingerprint(),)
+        )
+
+    def _get_cache_generation_names(self) -> List[str]:
+        """
+            Returns the generation names of the model and of the related
+            models that show up on the list and show columns
+        """
+        models = [self.datamodel.obj]
+        for col in self.list_select_columns + self.show_select_columns:
+            col = get_column_root_relation(col)
+            if self.datamodel.is_relation(col):
+                models.append(self.datamodel.get_related_model(col))
+        return sorted(set(get_model_generation_name(model) for model in models))
+
+    def _get_shared_result(
+        self, query_key: Tuple[Hashable, ...], coalesce: bool, func: Callable, *args
+    ) -> Any:
+        """
+            Computes a result that may be shared with other requests,
+            using the cache backend and coalescing identical concurrent
+            calls when enabled. The result must not be mutated
+        """
+        cache_key = None
+        if self.cache_backend is not None:
+            generations = tuple(
+                self.cache_backend.get_generation(name)
+                for name in self._cache_generation_names
+            )
+            cache_key = (
+                f"{self.__class__.__module__}.{self.__class__.__name__}",
+                generations,
+            ) + query_key
+            result = self.cache_backend.get(cache_key)
+            if result is not None:
+                return result
+        if coalesce:
+            result = self.list_query_single_flight.do(query_key, func, *args)
+        else:
+            result = func(*args)
+        if cache_key is not None and result is not None:
+            self.cache_backend.set(cache_key, result, timeout=self.cache_timeout)
+        return result
+
+    def _get_item_result(
+        self, pk: Any, show_model_schema: Schema
+    ) -> Optional[Dict[str, Any]]:
+        item = self.datamodel.get(pk, self._base_filters, self.show_select_columns)
+        if not item:
+            return None
+        return show_model_schema.dump(item, many=False)
+
+    def _get_list_result(
+        self,
+        filters: Filters,
+        order_column: Any,
+        order_direction: Any,
+        page: Optional[int],
+        page_size: Optional[int],
+        list_model_schema: Schema,
+    ) -> Dict[str, Any]:
+        count, lst = self.datamodel.query(
+            filters,
+            order_column,
+            order_direction,
+            page=page,
+            page_size=page_size,
+            select_columns=self.list_select_columns,
+        )
+        return {
+            API_RESULT_RES_KEY: list_model_schema.dump(lst, many=True),
+            "ids": self.datamodel.get_keys(lst),
+            "count": count,
+        }
+
+    def _handle_bulk_filters_args(self, rison_args):
+        """
+            Bulk operations refuse to run without filters,
+            so that a missing argument never changes all items
+        """
+        filters = rison_args.get(API_FILTERS_RIS_KEY)
+        if not filters:
+            raise FABException("Bulk operations require filters")
+        joined_filters = self._handle_filters_args(rison_args)
+        # Filters that were not applied would widen the operation
+        if len(self._filters.filters) != len(filters):
+            raise FABException("Bulk operations require valid filters")
+        return joined_filters
+
     def _description_columns_json(self, cols=None):
         """
             Prepares dict with col descriptions to be JSON serializable
@@ -96,6 +96,23 @@ get_list_schema = {
     },
 }
 
+bulk_schema = {
+    "type": "object",
+    "properties": {
+        API_FILTERS_RIS_KEY: dict(
+            get_list_schema["properties"][API_FILTERS_RIS_KEY], minItems=1
+        )
+    },
+    "required": [API_FILTERS_RIS_KEY],
+}
+
+get_chart_data_schema = {
+    "type": "object",
+    "properties": {
+        API_FILTERS_RIS_KEY: get_list_schema["properties"][API_FILTERS_RIS_KEY]
+    },
+}
+
 get_item_schema = {
     "type": "object",
     "properties": {
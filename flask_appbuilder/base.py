@@ -143,6 +143,7 @@ class AppBuilder(object):
         self.static_url_path = static_url_path
         self.app = app
         self.update_perms = update_perms
+        self.read_replica_router = None
 
         if app is not None:
             self.init_app(app, session)
@@ -199,6 +200,7 @@ class AppBuilder(object):
 
         self._addon_managers = app.config["ADDON_MANAGERS"]
         self.session = session
+        self._init_read_replica(app, session)
         self.sm = self.security_manager_class(self)
         self.bm = BabelManager(self)
         self.openapi_manager = OpenApiManager(self)
@@ -214,6 +216,24 @@ class AppBuilder(object):
             self.post_init()
         self._init_extension(app)
 
+    def _init_read_replica(self, app, session):
+        replica_uri = app.config.get("FAB_READ_REPLICA_DATABASE_URI")
+        if not replica_uri or session is None:
+            return
+        from sqlalchemy import create_engine
+        from flask_appbuilder.models.sqla.routing import ReadReplicaRouter
+
+        if self.read_replica_router is not None:
+            self.read_replica_router.dispose()
+        self.read_replica_router = ReadReplicaRouter(
+            session,
+            create_engine(
+                replica_uri, **app.config.get("FAB_READ_REPLICA_ENGINE_OPTIONS", {})
+            ),
+            read_your_writes_window=app.config.get("FAB_READ_REPLICA_WRITE_WINDOW"),
+        )
+        app.teardown_appcontext(self.read_replica_router.remove)
+
     def _init_extension(self, app):
         app.appbuilder = self
         if not hasattr(app, "extensions"):
@@ -1,19 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from inspect import isclass
 import json
 import logging
 import re
+import threading
+import time
 
 from flask import (
     abort,
     Blueprint,
+    copy_current_request_context,
     current_app,
     flash,
+    g,
     render_template,
     request,
     session,
     url_for,
 )
+from sqlalchemy.orm import scoped_session
 
 from ._compat import as_unicode
 from .actions import ActionItem
@@ -30,6 +36,37 @@ from .widgets import FormWidget, ListWidget, SearchWidget, ShowWidget
 
 log = logging.getLogger(__name__)
 
+_related_views_executors = {}
+_related_views_executors_lock = threading.Lock()
+
+
+def _get_related_views_executor(max_workers):
+    """
+        Returns the thread pool shared by all views to render related
+        views concurrently, one per max_workers
+    """
+    with _related_views_executors_lock:
+        executor = _related_views_executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="fab-related-views"
+            )
+            _related_views_executors[max_workers] = executor
+        return executor
+
+
+class _RenderedWidget(object):
+    """
+        A related view widget rendered by a worker thread, while the
+        objects it shows were still bound to the worker's session
+    """
+
+    def __init__(self, html):
+        self.html = html
+
+    def __call__(self, **kwargs):
+        return self.html
+
 
 def expose(url="/", methods=("GET",)):
     """
@@ -833,6 +870,7 @@ class BaseCRUDView(BaseModelView):
                 self.validators_columns,
                 self.add_form_extra_fields,
                 self.add_form_query_rel_fields,
+                related_url_func=self._get_related_url_func("add"),
             )
         if not self.edit_form:
             self.edit_form = conv.create_form(
@@ -842,8 +880,20 @@ class BaseCRUDView(BaseModelView):
                 self.validators_columns,
                 self.edit_form_extra_fields,
                 self.edit_form_query_rel_fields,
+                related_url_func=self._get_related_url_func("edit"),
             )
 
+    def _get_related_url_func(self, form_name):
+        """
+            Returns a function that returns the URL of the endpoint that
+            pages and searches the choices of a related column on the
+            add or edit form, or None when there's no such endpoint.
+            Override it to load related selects from your own endpoint
+
+            :param form_name: "add" or "edit"
+        """
+        return None
+
     def _init_titles(self):
         """
             Init Titles if not defined
@@ -932,6 +982,7 @@ class BaseCRUDView(BaseModelView):
         order_direction="",
         page=None,
         page_size=None,
+        query_results=None,
     ):
 
         fk = related_view.datamodel.get_related_fk(self.datamodel.obj)
@@ -963,32 +1014,112 @@ class BaseCRUDView(BaseModelView):
             order_direction=order_direction,
             page=page,
             page_size=page_size,
+            query_results=query_results,
         )
 
     def _get_related_views_widgets(
         self, item, orders=None, pages=None, page_sizes=None, widgets=None, **args
     ):
         """
+            Related views with the same model and foreign key are rendered
+            together, sharing the results of identical queries. When the
+            FAB_RELATED_VIEWS_PARALLEL config key is set, each group is
+            rendered concurrently on a thread pool of
+            FAB_RELATED_VIEWS_MAX_WORKERS threads, with its own session.
+            Those widgets are rendered by the workers.
+
             :return:
                 Returns a dict with 'related_views' key with a list of
                 Model View widgets
         """
         widgets = widgets or {}
-        widgets["related_views"] = []
-        for view in self._related_views:
-            if orders.get(view.__class__.__name__):
-                order_column, order_direction = orders.get(view.__class__.__name__)
+        groups = {}
+        for index, view in enumerate(self._related_views):
+            fk = view.datamodel.get_related_fk(self.datamodel.obj)
+            groups.setdefault((view.datamodel.obj, fk), []).append((index, view))
+        if (
+            current_app.config.get("FAB_RELATED_VIEWS_PARALLEL", False)
+            and len(groups) > 1
+            and all(
+                self._is_related_view_concurrent(view) for view in self._related_views
+            )
+        ):
+            max_workers = current_app.config.get("FAB_RELATED_VIEWS_MAX_WORKERS", 4)
+            executor = _get_related_views_executor(max_workers)
+            g_values = dict(g.__dict__)
+            # Loads an expired item on this thread's session,
+            # the workers only read its primary key
+            pk = self.datamodel.get_pk_value(item)
+
+            def get_group_widgets(group):
+                # The request context copy has its own app context and session,
+                # widgets are rendered before the session is removed
+                g.__dict__.update(g_values)
+                widgets = self._get_related_views_group_widgets(
+                    item, group, orders, pages, page_sizes
+                )
+                return {
+                    index: _RenderedWidget(widget(pk=pk))
+                    for index, widget in widgets.items()
+                }
+
+            # Each group needs its own copy of the request context
+            futures = [
+                executor.submit(copy_current_request_context(get_group_widgets), group)
+                for group in groups.values()
+            ]
+            results = [future.result() for future in futures]
+        else:
+            results = [
+                self._get_related_views_group_widgets(
+                    item, group, orders, pages, page_sizes
+                )
+                for group in groups.values()
+            ]
+        related_views = {}
+        for result in results:
+            related_views.update(result)
+        widgets["related_views"] = [
+            related_views[index] for index in range(len(self._related_views))
+        ]
+        return widgets
+
+    def _is_related_view_concurrent(self, view):
+        """
+            Returns True if the related view can be queried from another
+            thread, its datamodel uses a scoped session or none at all
+        """
+        session = getattr(view.datamodel, "session", None)
+        return session is None or isinstance(session, scoped_session)
+
+    def _get_related_views_group_widgets(self, item, group, orders, pages, page_sizes):
+        """
+            Returns a dict of the related views indexes and their widgets,
+            for related views with the same model and foreign key
+        """
+        query_results = {}
+        widgets = {}
+        for index, view in group:
+            name = view.__class__.__name__
+            if orders.get(name):
+                order_column, order_direction = orders.get(name)
             else:
                 order_column, order_direction = "", ""
-            widgets["related_views"].append(
-                self._get_related_view_widget(
-                    item,
-                    view,
-                    order_column,
-                    order_direction,
-                    page=pages.get(view.__class__.__name__),
-                    page_size=page_sizes.get(view.__class__.__name__),
-                )
+            start = time.perf_counter()
+            widgets[index] = self._get_related_view_widget(
+                item,
+                view,
+                order_column,
+                order_direction,
+                page=pages.get(name),
+                page_size=page_sizes.get(name),
+                query_results=query_results,
+            )
+            log.debug(
+                "Related view %s of %s took %.1fms",
+                name,
+                self.__class__.__name__,
+                (time.perf_counter() - start) * 1000,
             )
         return widgets
 
@@ -1008,6 +1139,7 @@ class BaseCRUDView(BaseModelView):
         page=None,
         page_size=None,
         widgets=None,
+        query_results=None,
         **args,
     ):
 
@@ -1018,12 +1150,13 @@ class BaseCRUDView(BaseModelView):
         if not order_column and self.base_order:
             order_column, order_direction = self.base_order
         joined_filters = filters.get_joined_filters(self._base_filters)
-        count, lst = self.datamodel.query(
+        count, lst = self._query_list(
             joined_filters,
             order_column,
             order_direction,
-            page=page,
-            page_size=page_size,
+            page,
+            page_size,
+            query_results,
         )
         pks = self.datamodel.get_keys(lst)
 
@@ -1046,6 +1179,41 @@ class BaseCRUDView(BaseModelView):
         )
         return widgets
 
+    def _query_list(
+        self,
+        filters,
+        order_column,
+        order_direction,
+        page,
+        page_size,
+        query_results=None,
+    ):
+        """
+            Queries a page of items. Given a query_results dict, the
+            result is shared with other views querying the same model
+            with the same filters, order and page
+        """
+        key = None
+        if query_results is not None:
+            filters_key = filters.get_normalized_key()
+            if filters_key is not None:
+                key = (
+                    self.datamodel.obj,
+                    filters_key,
+                    order_column,
+                    order_direction,
+                    page,
+                    page_size,
+                )
+                if key in query_results:
+                    return query_results[key]
+        result = self.datamodel.query(
+            filters, order_column, order_direction, page=page, page_size=page_size
+        )
+        if key is not None:
+            query_results[key] = result
+        return result
+
     def _get_show_widget(
         self, pk, item, widgets=None, actions=None, show_fieldsets=None
     ):
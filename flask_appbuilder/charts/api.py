@@ -0,0 +1,251 @@
+import hashlib
+import logging
+
+from flask import request, Response, stream_with_context
+from flask.json import dumps
+from flask_babel import get_locale
+
+from .views import DirectByChartMixin, GroupByChartMixin
+from .._compat import as_unicode
+from ..api import BaseModelApi, expose, rison, safe
+from ..api.schemas import get_chart_data_schema
+from ..const import API_FILTERS_RES_KEY, API_FILTERS_RIS_KEY, API_RESULT_RES_KEY
+from ..exceptions import FABException
+from ..security.decorators import permission_name, protect
+
+log = logging.getLogger(__name__)
+
+
+class ChartRestApi(GroupByChartMixin, BaseModelApi):
+    """
+        Exposes the data of GroupByChartView like definitions as JSON,
+        for charts rendered by the client::
+
+            class CountryStatsChartApi(ChartRestApi):
+                resource_name = "countrystatschart"
+                datamodel = SQLAInterface(CountryStats)
+                definitions = [
+                    {
+                        "group": "country",
+                        "series": [(aggregate_avg, "population")],
+                    }
+                ]
+
+            appbuilder.add_api(CountryStatsChartApi)
+
+        ``GET /api/v1/countrystatschart/_info`` returns the definitions and
+        the search filters, ``GET /api/v1/countrystatschart/<index>``
+        returns the columns and rows of a definition, filtered by the
+        same rison filters as ModelRestApi.
+
+        Responses have an ETag, a request with a matching If-None-Match
+        header gets a 304. Cached chart data (see cache_backend) is
+        validated without serializing it. Results with more than
+        stream_threshold rows are streamed
+    """
+
+    stream_threshold = 10000
+    """ Results with more rows are streamed, None disables streaming """
+    stream_chunk_size = 1000
+    """ Number of rows serialized on each streamed chunk """
+
+    _apispec_parameter_schemas = {"get_chart_data_schema": get_chart_data_schema}
+
+    def __init__(self, **kwargs):
+        super(ChartRestApi, self).__init__(**kwargs)
+        self._init_definitions()
+
+    def _init_properties(self):
+        super(ChartRestApi, self)._init_properties()
+        self._filters = self.datamodel.get_filters(
+            search_columns=self.search_columns, search_filters=self.search_filters
+        )
+
+    def _handle_filters_args(self, rison_args):
+        self._filters.clear_filters()
+        self._filters.rest_add_filters(rison_args.get(API_FILTERS_RIS_KEY, []))
+        return self._filters.get_joined_filters(self._base_filters)
+
+    def _get_columns(self, group):
+        return group.to_json([], self.label_columns)["cols"]
+
+    def _get_rows(self, group, data):
+        return [
+            [cell["v"] for cell in row["c"]]
+            for row in group.to_json(data, self.label_columns)["rows"]
+        ]
+
+    def _stream_chart_data(self, head, group, data):
+        """
+            Yields the JSON response body, serializing
+            stream_chunk_size rows at a time
+        """
+        yield dumps(head)[:-1] + f', "{API_RESULT_RES_KEY}": ['
+        for start in range(0, len(data), self.stream_chunk_size):
+            rows = self._get_rows(group, data[start : start + self.stream_chunk_size])
+            yield ("," if start else "") + dumps(rows)[1:-1]
+        yield "]}"
+
+    @expose("/_info", methods=["GET"])
+    @protect()
+    @safe
+    @permission_name("info")
+    def info(self, **kwargs):
+        """Get the chart definitions and the search filters
+        ---
+        get:
+          description: >-
+            Get the chart definitions, with their index, label and columns,
+            and the possible search filters
+          responses:
+            200:
+              description: Chart definitions
+              content:
+                application/json:
+                  schema:
+                    type: object
+                    properties:
+                      definitions:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            index:
+                              type: integer
+                            label:
+                              type: string
+                            columns:
+                              type: array
+                              items:
+                                type: object
+                      filters:
+                        type: object
+            401:
+              $ref: '#/components/responses/401'
+            500:
+              $ref: '#/components/responses/500'
+        """
+        definitions = [
+            {
+                "index": index,
+                "label": as_unicode(definition["label"]),
+                "columns": self._get_columns(self.get_group_by_class(definition)),
+            }
+            for index, definition in enumerate(self.definitions)
+        ]
+        search_filters = dict()
+        dict_filters = self._filters.get_search_filters()
+        for col in self.search_columns:
+            search_filters[col] = [
+                {"name": as_unicode(flt.name), "operator": flt.arg_name}
+                for flt in dict_filters[col]
+            ]
+        return self.response(
+            200, **{"definitions": definitions, API_FILTERS_RES_KEY: search_filters}
+        )
+
+    @expose("/<int:definition_index>", methods=["GET"])
+    @protect()
+    @safe
+    @permission_name("get")
+    @rison(get_chart_data_schema)
+    def get(self, definition_index, **kwargs):
+        """Get the data of a chart definition
+        ---
+        get:
+          description: >-
+            Get the grouped and aggregated series of a chart definition
+          parameters:
+          - in: path
+            schema:
+              type: integer
+            name: definition_index
+          - in: query
+            name: q
+            content:
+              application/json:
+                schema:
+                  $ref: '#/components/schemas/get_chart_data_schema'
+          responses:
+            200:
+              description: Chart data
+              content:
+                application/json:
+                  schema:
+                    type: object
+                    properties:
+                      label:
+                        type: string
+                      columns:
+                        description: >-
+                          The id, label and type of the group
+                          column and of each serie
+                        type: array
+                        items:
+                          type: object
+                      result:
+                        description: >-
+                          A row for each group, with the group
+                          value followed by the series values
+                        type: array
+                        items:
+                          type: array
+                          items: {}
+            304:
+              description: Not modified, matches If-None-Match
+            400:
+              $ref: '#/components/responses/400'
+            401:
+              $ref: '#/components/responses/401'
+            404:
+              $ref: '#/components/responses/404'
+            500:
+              $ref: '#/components/responses/500'
+        """
+        if definition_index >= len(self.definitions):
+            return self.response_404()
+        definition = self.definitions[definition_index]
+        try:
+            filters = self._handle_filters_args(kwargs.get("rison", {}))
+        except FABException as e:
+            return self.response_400(message=str(e))
+        order_column, order_direction = definition["group"], "asc"
+        # check if order_column may be database ordered
+        if not self.datamodel.get_order_columns_list([order_column]):
+            order_column, order_direction = "", ""
+        with self.datamodel.read_only():
+            version, data = self.get_chart_data_entry(
+                definition, filters, order_column, order_direction
+            )
+        etag = None
+        if version is not None:
+            etag = hashlib.sha1(f"{version}:{get_locale()}".encode()).hexdigest()
+        group = self.get_group_by_class(definition)
+        head = {
+            "label": as_unicode(definition["label"]),
+            "columns": self._get_columns(group),
+        }
+        if etag is not None and etag in request.if_none_match:
+            response = Response(status=304)
+        elif self.stream_threshold is not None and len(data) > self.stream_threshold:
+            response = Response(
+                stream_with_context(self._stream_chart_data(head, group, data)),
+                mimetype="application/json",
+            )
+        else:
+            head[API_RESULT_RES_KEY] = self._get_rows(group, data)
+            response = self.response(200, **head)
+            if etag is None:
+                response.add_etag()
+        if etag is not None:
+            response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+class DirectByChartRestApi(DirectByChartMixin, ChartRestApi):
+    """
+        Exposes the data of DirectByChartView like definitions as JSON,
+        including their downsampling, same endpoints as ChartRestApi
+    """
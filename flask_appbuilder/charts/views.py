@@ -1,13 +1,19 @@
+import hashlib
 import logging
+import threading
+import time
 
+from flask import current_app
 from flask_babel import lazy_gettext
 
 from .jsontools import dict_to_json
 from .widgets import ChartWidget, DirectChartWidget
 from ..baseviews import BaseModelView, expose
-from ..models.group import DirectProcessData, GroupByProcessData
+from ..models.cache import get_model_generation_name
+from ..models.group import DirectProcessData, GroupByProcessData, lttb, time_buckets
 from ..security.decorators import has_access
 from ..urltools import get_filter_args
+from ..utils.base import get_column_root_relation
 from ..widgets import SearchWidget
 
 log = logging.getLogger(__name__)
@@ -66,7 +72,12 @@ class BaseChartView(BaseModelView):
         return self._get_chart_widget(**kwargs).get("chart")
 
 
-class GroupByChartView(BaseChartView):
+class GroupByChartMixin(object):
+    """
+        Chart data queries of grouped and aggregated definitions,
+        shared by GroupByChartView and ChartRestApi
+    """
+
     definitions = []
     """
         These charts can display multiple series,
@@ -108,13 +119,52 @@ class GroupByChartView(BaseChartView):
             ]
 
     """
-    chart_type = "ColumnChart"
-    chart_template = "appbuilder/general/charts/jsonchart.html"
-    chart_widget = DirectChartWidget
     ProcessClass = GroupByProcessData
 
-    def __init__(self, **kwargs):
-        super(GroupByChartView, self).__init__(**kwargs)
+    rollups = []
+    """
+        A list of Rollup tables to read definitions from,
+        when their group, series and filters are supported::
+
+            from flask_appbuilder.models.sqla.rollup import Rollup
+
+            stats_rollup = Rollup(CountryStats, ["country_id"], ["population"])
+
+            class CountryGroupByChartView(GroupByChartView):
+                datamodel = SQLAInterface(CountryStats)
+                rollups = [stats_rollup]
+    """
+    cache_backend = None
+    """
+        Set a cache backend to cache the chart data::
+
+            from flask_appbuilder.models.cache import MemoryCache
+
+            class MyChartView(GroupByChartView):
+                datamodel = SQLAInterface(MyModel)
+                cache_backend = MemoryCache(max_size=100)
+
+        Entries are keyed by definition, filters, order and user roles,
+        and are invalidated by any write made through an interface
+        on the model or on the related models used by the definitions.
+        Charts filtered by callable values (ex: the current user) are not cached
+    """
+    cache_timeout = None
+    """ Cache entries timeout in seconds, defaults to the backend default """
+    cache_stale_timeout = None
+    """
+        Seconds that expired entries are still served, while they are
+        refreshed on a background thread. Entries invalidated by writes
+        are always refreshed before responding, as with None, the default
+    """
+
+    def _init_definitions(self):
+        """
+            Setup the definitions labels and the chart data cache
+        """
+        self._cache_generation_names = self._get_cache_generation_names()
+        self._refreshing_keys = set()
+        self._refreshing_lock = threading.Lock()
         for definition in self.definitions:
             col = definition.get("group")
             # Setup labels
@@ -149,6 +199,182 @@ class GroupByChartView(BaseChartView):
             formatter = {}
         return self.ProcessClass([group_by], series, formatter)
 
+    def query_definition(self, definition, filters, order_column, order_direction):
+        """
+            Groups and aggregates a definition on the database, returns None
+            if it has to be processed in python, because of function or
+            property group bys, custom aggregations or datamodel support.
+            Reads from the first compatible rollup, if any.
+        """
+        for rollup in self.rollups:
+            rows = rollup.query_aggregate(
+                self.datamodel.get_read_session(),
+                definition["group"],
+                definition["series"],
+                filters,
+                order_column,
+                order_direction,
+            )
+            if rows is not None:
+                return rows
+        return self.datamodel.query_aggregate(
+            definition["group"],
+            definition["series"],
+            filters,
+            order_column,
+            order_direction,
+        )
+
+    def _get_cache_generation_names(self):
+        """
+            Returns the generation names of the model and of
+            the related models used by the definitions
+        """
+        models = [self.datamodel.obj]
+        for definition in self.definitions:
+            cols = [definition["group"]]
+            for serie in definition["series"]:
+                cols.append(serie[1] if isinstance(serie, tuple) else serie)
+            for col in cols:
+                col = get_column_root_relation(col)
+                if self.datamodel.is_relation(col):
+                    models.append(self.datamodel.get_related_model(col))
+        return sorted(set(get_model_generation_name(model) for model in models))
+
+    def _get_cache_timeout(self):
+        if self.cache_timeout is None:
+            return self.cache_backend.default_timeout
+        return self.cache_timeout
+
+    def _get_cache_key(self, definition, filters, order_column, order_direction):
+        """
+            Returns the chart data cache key, or None if it must not be cached
+        """
+        if self.cache_backend is None:
+            return None
+        index = next(
+            (i for i, item in enumerate(self.definitions) if item is definition), None
+        )
+        filters_key = filters.get_normalized_key()
+        if index is None or filters_key is None:
+            return None
+        return (
+            f"{self.__class__.__module__}.{self.__class__.__name__}",
+            index,
+            filters_key,
+            order_column,
+            order_direction,
+            self.appbuilder.sm.get_user_roles_fingerprint(),
+        )
+
+    def _query_chart_data(self, definition, filters, order_column, order_direction):
+        group = self.get_group_by_class(definition)
+        rows = self.query_definition(definition, filters, order_column, order_direction)
+        if rows is not None:
+            return group.format_rows(rows)
+        count, lst = self.datamodel.query(
+            filters=filters, order_column=order_column, order_direction=order_direction
+        )
+        return group.apply(lst, sort=order_column == "")
+
+    def _refresh_chart_data(self, key, *args):
+        """
+            Queries and caches the chart data, the generations are read
+            before querying so that concurrent writes make the entry stale
+        """
+        generations = tuple(
+            self.cache_backend.get_generation(name)
+            for name in self._cache_generation_names
+        )
+        created = time.time()
+        data = self._query_chart_data(*args)
+        timeout = self._get_cache_timeout()
+        if timeout and self.cache_stale_timeout is not None:
+            timeout += self.cache_stale_timeout
+        entry = (created, generations, data)
+        self.cache_backend.set(key, entry, timeout=timeout)
+        return entry
+
+    def _refresh_chart_data_async(self, key, *args):
+        with self._refreshing_lock:
+            if key in self._refreshing_keys:
+                return
+            self._refreshing_keys.add(key)
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._refresh_chart_data(key, *args)
+            except Exception as e:
+                log.error("Error refreshing chart data for %s: %s", key[0], e)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing_keys.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_chart_data(self, definition, filters, order_column, order_direction):
+        """
+            Returns the grouped and aggregated rows of a definition,
+            from the cache when a cache backend is set
+        """
+        return self.get_chart_data_entry(
+            definition, filters, order_column, order_direction
+        )[1]
+
+    def get_chart_data_entry(self, definition, filters, order_column, order_direction):
+        """
+            Same as get_chart_data, returns a tuple with the data version
+            and the data. The version is a string that changes with the
+            cache entry, or None when the data was not cached
+        """
+        args = (definition, filters, order_column, order_direction)
+        key = self._get_cache_key(*args)
+        if key is None:
+            return None, self._query_chart_data(*args)
+        entry = self.cache_backend.get(key)
+        if entry is not None:
+            created, generations, data = entry
+            age = time.time() - created
+            timeout = self._get_cache_timeout()
+            is_current = generations == tuple(
+                self.cache_backend.get_generation(name)
+                for name in self._cache_generation_names
+            )
+            if is_current and (not timeout or age < timeout):
+                return self._get_chart_data_version(key, entry), data
+            # Invalidated entries are never served
+            if (
+                is_current
+                and self.cache_stale_timeout is not None
+                and age < timeout + self.cache_stale_timeout
+            ):
+                self._refresh_chart_data_async(key, *args)
+                return self._get_chart_data_version(key, entry), data
+        entry = self._refresh_chart_data(key, *args)
+        return self._get_chart_data_version(key, entry), entry[2]
+
+    @staticmethod
+    def _get_chart_data_version(key, entry):
+        created, generations, data = entry
+        return hashlib.sha1(repr((key, created, generations)).encode()).hexdigest()
+
+
+class GroupByChartView(GroupByChartMixin, BaseChartView):
+    """
+        Displays charts with multiple series, grouped and aggregated
+        by definitions, see GroupByChartMixin.definitions
+    """
+
+    chart_type = "ColumnChart"
+    chart_template = "appbuilder/general/charts/jsonchart.html"
+    chart_widget = DirectChartWidget
+
+    def __init__(self, **kwargs):
+        super(GroupByChartView, self).__init__(**kwargs)
+        self._init_definitions()
+
     def _get_chart_widget(
         self,
         filters=None,
@@ -158,7 +384,7 @@ class GroupByChartView(BaseChartView):
         direct=None,
         height=None,
         definition="",
-        **args
+        **args,
     ):
 
         height = height or self.height
@@ -168,17 +394,13 @@ class GroupByChartView(BaseChartView):
         if not self.datamodel.get_order_columns_list([order_column]):
             order_column = ""
             order_direction = ""
-        count, lst = self.datamodel.query(
-            filters=joined_filters,
-            order_column=order_column,
-            order_direction=order_direction,
-        )
         if not definition:
             definition = self.definitions[0]
         group = self.get_group_by_class(definition)
-        value_columns = group.to_json(
-            group.apply(lst, sort=order_column == ""), self.label_columns
+        data = self.get_chart_data(
+            definition, joined_filters, order_column, order_direction
         )
+        value_columns = group.to_json(data, self.label_columns)
         widgets["chart"] = self.chart_widget(
             route_base=self.route_base,
             chart_title=self.chart_title,
@@ -187,7 +409,7 @@ class GroupByChartView(BaseChartView):
             height=height,
             value_columns=value_columns,
             modelview_name=self.__class__.__name__,
-            **args
+            **args,
         )
         return widgets
 
@@ -219,7 +441,60 @@ class GroupByChartView(BaseChartView):
         )
 
 
-class DirectByChartView(GroupByChartView):
+class DirectByChartMixin(GroupByChartMixin):
+    """
+        Chart data queries of direct definitions, with optional
+        downsampling, shared by DirectByChartView and DirectByChartRestApi
+    """
+
+    ProcessClass = DirectProcessData
+    downsample_max_points = 1000
+    """ The default maximum number of points of downsampled definitions """
+
+    def _query_chart_data(self, definition, filters, order_column, order_direction):
+        downsample = definition.get("downsample")
+        if not downsample:
+            return super(DirectByChartMixin, self)._query_chart_data(
+                definition, filters, order_column, order_direction
+            )
+        if downsample not in ("lttb", "bucket"):
+            raise ValueError(f"Unknown downsample method {downsample}")
+        group = self.get_group_by_class(definition)
+        group_by = definition["group"]
+        series = list(definition["series"])
+        max_points = definition.get("max_points", self.downsample_max_points)
+        bucket_size = definition.get("bucket_size")
+        rows = None
+        if downsample == "bucket":
+            rows = self.datamodel.query_time_buckets(
+                group_by, series, bucket_size, max_points, filters
+            )
+        if rows is None:
+            rows = self.datamodel.query_columns(
+                [group_by] + series, filters, group_by, "asc"
+            )
+            if rows is None:
+                count, lst = self.datamodel.query(filters=filters)
+                rows = group.get_rows(lst)
+            # Points without time can't be placed on the chart
+            rows = [row for row in rows if row[0] is not None]
+            if downsample == "bucket":
+                rows = list(time_buckets(rows, bucket_size, max_points))
+        return group.format_rows(lttb(rows, max_points))
+
+    def query_definition(self, definition, filters, order_column, order_direction):
+        group_by = definition["group"]
+        if not order_column:
+            order_column, order_direction = group_by, "asc"
+        return self.datamodel.query_columns(
+            [group_by] + list(definition["series"]),
+            filters,
+            order_column,
+            order_direction,
+        )
+
+
+class DirectByChartView(DirectByChartMixin, GroupByChartView):
     """
         Use this class to display charts with multiple series,
         based on columns or methods defined on models.
@@ -261,10 +536,24 @@ class DirectByChartView(GroupByChartView):
                     }
                 ]
 
+        Long time series can be downsampled per definition, so that at most
+        'max_points' (defaults to downsample_max_points) are sent::
+
+            {
+                'group': 'stat_date',
+                'series': ['unemployed_perc'],
+                'downsample': 'lttb' | 'bucket',
+                'max_points': 500,
+                'bucket_size': datetime.timedelta(hours=1),
+            }
+
+        :lttb: Keeps the points that best preserve the series shape,
+            with the Largest Triangle Three Buckets algorithm
+        :bucket: Averages the series on fixed width time buckets, on the
+            database when possible. 'bucket_size' defaults to the width
+            that splits the time range in 'max_points' buckets
     """
 
-    ProcessClass = DirectProcessData
-
 
 # -------------------------------------------------------
 # DEPRECATED SECTION
@@ -291,7 +580,7 @@ class BaseSimpleGroupByChartView(BaseChartView):  # pragma: no cover
         widgets=None,
         group_by=None,
         height=None,
-        **args
+        **args,
     ):
 
         height = height or self.height
@@ -310,7 +599,7 @@ class BaseSimpleGroupByChartView(BaseChartView):  # pragma: no cover
             height=height,
             value_columns=value_columns,
             modelview_name=self.__class__.__name__,
-            **args
+            **args,
         )
         return widgets
 
@@ -346,7 +635,7 @@ class BaseSimpleDirectChartView(BaseChartView):  # pragma: no cover
         widgets=None,
         direct=None,
         height=None,
-        **args
+        **args,
     ):
 
         height = height or self.height
@@ -370,7 +659,7 @@ class BaseSimpleDirectChartView(BaseChartView):  # pragma: no cover
             height=height,
             value_columns=value_columns,
             modelview_name=self.__class__.__name__,
-            **args
+            **args,
         )
         return widgets
 
@@ -430,7 +719,7 @@ class TimeChartView(BaseSimpleGroupByChartView):  # pragma: no cover
         group_by=None,
         period=None,
         height=None,
-        **args
+        **args,
     ):
 
         height = height or self.height
@@ -455,7 +744,7 @@ class TimeChartView(BaseSimpleGroupByChartView):  # pragma: no cover
             height=height,
             value_columns=value_columns,
             modelview_name=self.__class__.__name__,
-            **args
+            **args,
         )
         return widgets
 
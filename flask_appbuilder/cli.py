@@ -146,6 +146,25 @@ def create_db():
     click.echo(click.style("DB objects created", fg="green"))
 
 
+@fab.command("rollup-refresh")
+@click.option(
+    "--name", "-n", multiple=True, help="Rollup name to refresh, defaults to all"
+)
+@with_appcontext
+def rollup_refresh(name):
+    """
+        Rebuilds chart rollup tables from their models (SQLAlchemy specific).
+    """
+    from flask_appbuilder.models.sqla.rollup import get_rollups
+
+    session = current_app.appbuilder.get_session
+    for rollup in get_rollups():
+        if name and rollup.name not in name:
+            continue
+        rollup.refresh(session)
+        click.echo(click.style(f"Refreshed rollup {rollup.name}", fg="green"))
+
+
 @fab.command("version")
 @with_appcontext
 def version():
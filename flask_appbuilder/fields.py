@@ -2,11 +2,22 @@ from __future__ import unicode_literals
 
 import operator
 
+from flask import current_app
 from wtforms import widgets
 from wtforms.compat import string_types, text_type
 from wtforms.fields import Field, SelectField, SelectFieldBase
 from wtforms.validators import ValidationError
 
+from .fieldwidgets import Select2LazyWidget
+
+try:
+    from wtforms.fields.core import _unset_value as unset_value
+except ImportError:
+    from wtforms.utils import unset_value
+
+DEFAULT_RELATED_SELECT_THRESHOLD = 1000
+""" Default of FAB_RELATED_SELECT_THRESHOLD """
+
 
 class AJAXSelectField(Field):
     """
@@ -79,9 +90,21 @@ class AJAXSelectField(Field):
 class QuerySelectField(SelectFieldBase):
     """
         Based on WTForms QuerySelectField
+
+        :param query_func: Returns the objects to choose from
+        :param get_pk_func: Returns the primary key of an object
+        :param get_obj_func: Optional, returns the object of a submitted
+            primary key or None if it's not a valid choice. Submitted
+            values are then validated without loading all the objects
+        :param lazy_url_func: Optional, returns the URL of an endpoint
+            that pages and searches the choices. When there are more
+            choices than the FAB_RELATED_SELECT_THRESHOLD config key
+            they are loaded from it while the user types.
+            query_func must then accept a page_size keyword argument
     """
 
     widget = widgets.Select()
+    lazy_widget = Select2LazyWidget()
 
     def __init__(
         self,
@@ -92,11 +115,15 @@ class QuerySelectField(SelectFieldBase):
         get_label=None,
         allow_blank=False,
         blank_text="",
+        get_obj_func=None,
+        lazy_url_func=None,
         **kwargs
     ):
         super(QuerySelectField, self).__init__(label, validators, **kwargs)
         self.query_func = query_func
         self.get_pk_func = get_pk_func
+        self.get_obj_func = get_obj_func
+        self.lazy_url_func = lazy_url_func
 
         if get_label is None:
             self.get_label = lambda x: x
@@ -108,13 +135,33 @@ class QuerySelectField(SelectFieldBase):
         self.allow_blank = allow_blank
         self.blank_text = blank_text
         self._object_list = None
+        self._lazy = None
+        self._looked_up = list()
+
+    def _get_obj(self, pk):
+        obj = self.get_obj_func(pk)
+        if obj is not None:
+            self._looked_up.append(obj)
+        return obj
+
+    def _is_valid_choice(self, obj):
+        if self.get_obj_func is not None:
+            return any(obj is looked_up for looked_up in self._looked_up) or (
+                self._get_obj(text_type(self.get_pk_func(obj))) is not None
+            )
+        return any(obj == choice for pk, choice in self._get_object_list())
 
     def _get_data(self):
         if self._formdata is not None:
-            for pk, obj in self._get_object_list():
-                if pk == self._formdata:
+            if self.get_obj_func is not None:
+                obj = self._get_obj(self._formdata)
+                if obj is not None:
                     self._set_data(obj)
-                    break
+            else:
+                for pk, obj in self._get_object_list():
+                    if pk == self._formdata:
+                        self._set_data(obj)
+                        break
         return self._data
 
     def _set_data(self, data):
@@ -123,14 +170,59 @@ class QuerySelectField(SelectFieldBase):
 
     data = property(_get_data, _set_data)
 
+    def _set_object_list(self, objs):
+        self._object_list = list(
+            (text_type(self.get_pk_func(obj)), obj) for obj in objs
+        )
+
     def _get_object_list(self):
         if self._object_list is None:
-            objs = self.query_func()
-            self._object_list = list(
-                (text_type(self.get_pk_func(obj)), obj) for obj in objs
-            )
+            self._set_object_list(self.query_func())
         return self._object_list
 
+    def is_lazy(self):
+        """
+            Returns True when there are more choices than the
+            FAB_RELATED_SELECT_THRESHOLD, and they should be paged
+            from lazy_url_func. Otherwise they are loaded with the
+            same query
+        """
+        if self._lazy is None:
+            self._lazy = False
+            if self.lazy_url_func is not None and self._object_list is None:
+                threshold = current_app.config.get(
+                    "FAB_RELATED_SELECT_THRESHOLD", DEFAULT_RELATED_SELECT_THRESHOLD
+                )
+                if threshold:
+                    objs = self.query_func(page_size=threshold + 1)
+                    if len(objs) > threshold:
+                        self._lazy = True
+                    else:
+                        self._set_object_list(objs)
+        return self._lazy
+
+    def get_selected(self):
+        """
+            Returns a list of dicts with the id and text of the selected objects
+        """
+        data = self.data
+        if data is None:
+            return []
+        if not isinstance(data, list):
+            data = [data]
+        return [
+            {
+                "id": text_type(self.get_pk_func(obj)),
+                "text": text_type(self.get_label(obj)),
+            }
+            for obj in data
+        ]
+
+    def __call__(self, **kwargs):
+        if self.is_lazy():
+            return self.lazy_widget(self, **kwargs)
+        return super(QuerySelectField, self).__call__(**kwargs)
+
     def iter_choices(self):
         if self.allow_blank:
             yield ("__None", self.blank_text, self.data is None)
@@ -149,10 +241,7 @@ class QuerySelectField(SelectFieldBase):
     def pre_validate(self, form):
         data = self.data
         if data is not None:
-            for pk, obj in self._get_object_list():
-                if data == obj:
-                    break
-            else:
+            if not self._is_valid_choice(data):
                 raise ValidationError(self.gettext("Not a valid choice"))
         elif self._formdata or not self.allow_blank:
             raise ValidationError(self.gettext("Not a valid choice"))
@@ -168,6 +257,7 @@ class QuerySelectMultipleField(QuerySelectField):
     """
 
     widget = widgets.Select(multiple=True)
+    lazy_widget = Select2LazyWidget(multiple=True)
 
     def __init__(self, label=None, validators=None, default=None, **kwargs):
         if default is None:
@@ -185,7 +275,16 @@ class QuerySelectMultipleField(QuerySelectField):
 
     def _get_data(self):
         formdata = self._formdata
-        if formdata is not None:
+        if formdata is not None and self.get_obj_func is not None:
+            data = []
+            for pk in formdata:
+                obj = self._get_obj(pk)
+                if obj is None:
+                    self._invalid_formdata = True
+                else:
+                    data.append(obj)
+            self._set_data(data)
+        elif formdata is not None:
             data = []
             for pk, obj in self._get_object_list():
                 if not formdata:
@@ -208,19 +307,32 @@ class QuerySelectMultipleField(QuerySelectField):
         for pk, obj in self._get_object_list():
             yield (pk, self.get_label(obj), obj in self.data)
 
+    def process(self, formdata, data=unset_value):
+        super(QuerySelectMultipleField, self).process(formdata, data)
+        # The lazy widget submits the primary keys joined by commas
+        if formdata and "_%s-lazy" % self.name in formdata and self._formdata:
+            self._formdata = set(
+                pk for value in self._formdata for pk in value.split(",") if pk
+            )
+
     def process_formdata(self, valuelist):
         self._formdata = set(valuelist)
 
     def pre_validate(self, form):
+        # Looking up the submitted primary keys flags the invalid ones
+        data = self.data
         if self._invalid_formdata:
             raise ValidationError(self.gettext("Not a valid choice"))
-        elif self.data:
-            obj_list = list(x[1] for x in self._get_object_list())
+        elif data:
             if not isinstance(self.data, list):
                 self.data = [self.data]
-            for v in self.data:
-                if v not in obj_list:
-                    raise ValidationError(self.gettext("Not a valid choice"))
+            if self.get_obj_func is not None:
+                valid = all(self._is_valid_choice(v) for v in self.data)
+            else:
+                obj_list = list(x[1] for x in self._get_object_list())
+                valid = all(v in obj_list for v in self.data)
+            if not valid:
+                raise ValidationError(self.gettext("Not a valid choice"))
 
 
 class EnumField(SelectField):
@@ -1,3 +1,5 @@
+import json
+
 from flask_babel import lazy_gettext as _
 from wtforms import widgets
 from wtforms.widgets import html_params, HTMLString
@@ -137,6 +139,57 @@ class Select2SlaveAJAXWidget(object):
         )
 
 
+class Select2LazyWidget(object):
+    """
+        Select2 that pages and searches its choices from the field's
+        lazy_url_func endpoint, used by QuerySelectField and
+        QuerySelectMultipleField when there are too many choices
+    """
+
+    data_template = "<input %(text)s />%(marker)s"
+
+    def __init__(self, multiple=False, page_size=25, style=None):
+        self.multiple = multiple
+        self.page_size = page_size
+        self.style = style or u"width:250px"
+
+    def __call__(self, field, **kwargs):
+        kwargs.setdefault("id", field.id)
+        if "name_" in kwargs:
+            field.name = kwargs.pop("name_")
+        kwargs.setdefault("name", field.name)
+        kwargs.setdefault("style", self.style)
+        kwargs["class"] = u"my_select2_lazy"
+        items = field.get_selected()
+        marker = ""
+        if self.multiple:
+            selected = items
+            kwargs["multiple"] = True
+            marker = "<input %s />" % html_params(
+                type="hidden", name="_%s-lazy" % field.name, value=1
+            )
+        else:
+            selected = items[0] if items else None
+        return HTMLString(
+            self.data_template
+            % {
+                "text": html_params(
+                    type="hidden",
+                    value=",".join(item["id"] for item in items),
+                    endpoint=field.lazy_url_func(),
+                    page_size=self.page_size,
+                    data_selected=json.dumps(selected),
+                    data_placeholder=_("Select Value"),
+                    data_allow_clear=json.dumps(
+                        bool(getattr(field, "allow_blank", True))
+                    ),
+                    **kwargs
+                ),
+                "marker": marker,
+            }
+        )
+
+
 class Select2Widget(widgets.Select):
     extra_classes = None
 
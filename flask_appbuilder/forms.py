@@ -115,6 +115,7 @@ class GeneralModelConverter(object):
 
     def __init__(self, datamodel):
         self.datamodel = datamodel
+        self.related_url_func = None
 
     @staticmethod
     def _get_validators(col_name, validators_columns):
@@ -129,20 +130,69 @@ class GeneralModelConverter(object):
         return label_columns.get(col_name, "")
 
     def _get_related_query_func(self, col_name, filter_rel_fields):
-        if filter_rel_fields:
-            if col_name in filter_rel_fields:
-                datamodel = self.datamodel.get_related_interface(col_name)
-                filters = datamodel.get_filters().add_filter_list(
-                    filter_rel_fields[col_name]
-                )
-                return lambda: datamodel.query(filters)[1]
-        return lambda: self.datamodel.get_related_interface(col_name).query()[1]
+        """
+            Returns a function that queries the choices of a related
+            column, up to page_size of them when given
+        """
+        if filter_rel_fields and col_name in filter_rel_fields:
+            datamodel = self.datamodel.get_related_interface(col_name)
+            filters = datamodel.get_filters().add_filter_list(
+                filter_rel_fields[col_name]
+            )
+        else:
+            datamodel = filters = None
+
+        def query_func(page_size=None):
+            _datamodel = datamodel or self.datamodel.get_related_interface(col_name)
+            if not page_size:
+                return _datamodel.query(filters)[1]
+            return _datamodel.query(filters, page=0, page_size=page_size)[1]
+
+        return query_func
 
     def _get_related_pk_func(self, col_name):
         return lambda obj: self.datamodel.get_related_interface(col_name).get_pk_value(
             obj
         )
 
+    def _get_related_obj_func(self, col_name, filter_rel_fields):
+        """
+            Returns a function that gets a choice of a related column
+            by its submitted primary key, or None if it's not a choice
+        """
+        if self.datamodel.get_related_interface(col_name).is_pk_composite():
+            return None
+
+        def get_obj_func(pk):
+            datamodel = self.datamodel.get_related_interface(col_name)
+            filters = None
+            if filter_rel_fields and col_name in filter_rel_fields:
+                filters = datamodel.get_filters().add_filter_list(
+                    filter_rel_fields[col_name]
+                )
+            if datamodel.is_integer(datamodel.get_pk_name()):
+                try:
+                    pk = int(pk)
+                except ValueError:
+                    return None
+            try:
+                obj = datamodel.get(pk, filters)
+            except Exception as e:
+                log.warning("Error getting related %s %s: %s", col_name, pk, e)
+                return None
+            # Only the text of the primary key is a valid choice
+            if obj is None or str(datamodel.get_pk_value(obj)) != str(pk):
+                return None
+            return obj
+
+        return get_obj_func
+
+    def _get_related_lazy_url_func(self, col_name):
+        related_url_func = self.related_url_func
+        if related_url_func is None:
+            return None
+        return lambda: related_url_func(col_name)
+
     def _convert_many_to_one(
         self,
         col_name,
@@ -171,6 +221,8 @@ class GeneralModelConverter(object):
             description=description,
             query_func=query_func,
             get_pk_func=get_pk_func,
+            get_obj_func=self._get_related_obj_func(col_name, filter_rel_fields),
+            lazy_url_func=self._get_related_lazy_url_func(col_name),
             allow_blank=allow_blank,
             validators=lst_validators,
             widget=Select2Widget(extra_classes=extra_classes),
@@ -194,6 +246,8 @@ class GeneralModelConverter(object):
             description=description,
             query_func=query_func,
             get_pk_func=get_pk_func,
+            get_obj_func=self._get_related_obj_func(col_name, filter_rel_fields),
+            lazy_url_func=self._get_related_lazy_url_func(col_name),
             allow_blank=allow_blank,
             validators=lst_validators,
             widget=Select2ManyWidget(),
@@ -273,6 +327,7 @@ class GeneralModelConverter(object):
         validators_columns=None,
         extra_fields=None,
         filter_rel_fields=None,
+        related_url_func=None,
     ):
         """
             Converts a model to a form given
@@ -297,12 +352,18 @@ class GeneralModelConverter(object):
 
             :param filter_rel_fields:
                 A filter to be applied on relationships
+            :param related_url_func:
+                Optional, returns the URL of an endpoint that pages and
+                searches the choices of a related column name. Related
+                columns with more choices than the FAB_RELATED_SELECT_THRESHOLD
+                config key are loaded from it
         """
         label_columns = label_columns or {}
         inc_columns = inc_columns or []
         description_columns = description_columns or {}
         validators_columns = validators_columns or {}
         extra_fields = extra_fields or {}
+        self.related_url_func = related_url_func
         form_props = {}
         for col_name in inc_columns:
             if col_name in extra_fields:
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 import datetime
 from functools import reduce
 import logging
@@ -168,6 +169,31 @@ class BaseInterface(object):
     ):
         pass
 
+    def query_aggregate(
+        self, group_by, aggregates, filters=None, order_column="", order_direction=""
+    ):
+        """
+            Groups and aggregates on the database, returns None
+            when it's not supported, so callers process items instead
+        """
+        return None
+
+    def query_columns(self, columns, filters=None, order_column="", order_direction=""):
+        """
+            Returns rows with just columns values, returns None
+            when it's not supported, so callers process items instead
+        """
+        return None
+
+    def query_time_buckets(
+        self, time_column, columns, bucket_size=None, max_points=1000, filters=None
+    ):
+        """
+            Averages columns on fixed width time buckets on the database,
+            returns None when it's not supported, so callers process items instead
+        """
+        return None
+
     def is_image(self, col_name):
         return False
 
@@ -306,6 +332,21 @@ class BaseInterface(object):
         """
         pass
 
+    def get_many(self, pks):
+        """
+            return the records from a list of keys, keys
+            that don't exist are skipped
+        """
+        return [item for item in (self.get(pk) for pk in pks) if item is not None]
+
+    @contextmanager
+    def read_only(self):
+        """
+            Marks the enclosed operations as read only, interfaces
+            may route them to a read replica
+        """
+        yield
+
     def get_related_model(self, prop):
         raise NotImplementedError
 
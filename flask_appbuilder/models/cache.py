@@ -0,0 +1,348 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+import uuid
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+_backends = weakref.WeakSet()
+""" private set of live cache backends, to propagate generation bumps """
+
+
+def get_model_generation_name(model: type) -> str:
+    """
+        Returns the generation counter name for a model class
+    """
+    return f"{model.__module__}.{model.__name__}"
+
+
+def bump_model_generation(model: type) -> None:
+    """
+        Invalidates all cached results that depend on a model, on every
+        live cache backend. Interfaces call it after each successful write,
+        call it yourself if you change data without using an interface.
+
+    :param model: The model class that changed
+    """
+    name = get_model_generation_name(model)
+    for backend in list(_backends):
+        try:
+            backend.bump_generation(name)
+        except Exception as e:
+            log.error("Error bumping cache generation for %s: %s", name, e)
+
+
+class BaseCacheBackend(object):
+    """
+        Base class for result cache backends. Values are invalidated
+        by expiration or by per model generation counters, that are
+        part of the keys built by the cache users
+    """
+
+    default_timeout = 300
+    """ Default entry timeout in seconds, use 0 for no expiration """
+
+    def __init__(self, default_timeout: Optional[int] = None) -> None:
+        if default_timeout is not None:
+            self.default_timeout = default_timeout
+        _backends.add(self)
+
+    def _get_expiration(self, timeout: Optional[int]) -> float:
+        timeout = self.default_timeout if timeout is None else timeout
+        if not timeout:
+            return 0
+        return time.time() + timeout
+
+    def get(self, key: Hashable) -> Any:
+        """
+            Returns the cached value for key or None if it does not exist
+            or it has expired
+        """
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, timeout: Optional[int] = None) -> None:
+        """
+            Caches value for key
+
+        :param timeout: Timeout in seconds, defaults to default_timeout
+        """
+        raise NotImplementedError
+
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def get_generation(self, name: str) -> int:
+        """
+            Returns the current value of a generation counter
+        """
+        raise NotImplementedError
+
+    def bump_generation(self, name: str) -> int:
+        """
+            Changes a generation counter, so that keys built
+            with its previous value are never used again
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCacheBackend):
+    """
+        Thread safe in process LRU cache, evicts the least recently
+        used entry when max_size is reached
+    """
+
+    max_size = 1000
+
+    def __init__(
+        self, max_size: Optional[int] = None, default_timeout: Optional[int] = None
+    ) -> None:
+        super().__init__(default_timeout=default_timeout)
+        if max_size is not None:
+            self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires and expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, timeout: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries[key] = (self._get_expiration(timeout), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump_generation(self, name: str) -> int:
+        with self._lock:
+            generation = self._generations.get(name, 0) + 1
+            self._generations[name] = generation
+        return generation
+
+
+class FileSystemCache(BaseCacheBackend):
+    """
+        Pickles entries to files on a directory, can be shared by all the
+        processes of the same host. Generation counters are also kept
+        on the directory, so they survive restarts
+    """
+
+    threshold = 1000
+    """ Maximum number of entries before pruning """
+    lock_timeout = 10
+    """
+        Seconds after which a generation lock left by another process is broken,
+        on platforms without fcntl
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        threshold: Optional[int] = None,
+        default_timeout: Optional[int] = None,
+    ) -> None:
+        super().__init__(default_timeout=default_timeout)
+        if threshold is not None:
+            self.threshold = threshold
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _hash(value: Any) -> str:
+        return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+    def _get_filename(self, key: Hashable) -> str:
+        return os.path.join(self.cache_dir, self._hash(key))
+
+    def _get_generation_filename(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"generation-{self._hash(name)}")
+
+    def _list_entries(self):
+        return [
+            os.path.join(self.cache_dir, filename)
+            for filename in os.listdir(self.cache_dir)
+            if not filename.startswith(("generation-", "."))
+        ]
+
+    def _write(self, filename: str, content: bytes) -> None:
+        fd, tmp_filename = tempfile.mkstemp(dir=self.cache_dir, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_filename, filename)
+        except Exception:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
+    def _prune(self) -> None:
+        entries = self._list_entries()
+        if len(entries) <= self.threshold:
+            return
+        now = time.time()
+        remaining = []
+        for filename in entries:
+            try:
+                with open(filename, "rb") as f:
+                    expires = pickle.load(f)
+                if expires and expires < now:
+                    os.remove(filename)
+                else:
+                    remaining.append((os.path.getmtime(filename), filename))
+            except (IOError, OSError, EOFError, pickle.UnpicklingError):
+                continue
+        remaining.sort()
+        for _, filename in remaining[: max(len(remaining) - self.threshold, 0)]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def get(self, key: Hashable) -> Any:
+        filename = self._get_filename(key)
+        try:
+            with open(filename, "rb") as f:
+                expires = pickle.load(f)
+                if expires and expires < time.time():
+                    os.remove(filename)
+                    return None
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (IOError, OSError, EOFError, pickle.UnpicklingError) as e:
+            log.warning("Error reading cache file %s: %s", filename, e)
+            return None
+
+    def set(self, key: Hashable, value: Any, timeout: Optional[int] = None) -> None:
+        content = pickle.dumps(self._get_expiration(timeout)) + pickle.dumps(value)
+        try:
+            self._write(self._get_filename(key), content)
+            self._prune()
+        except (IOError, OSError) as e:
+            log.warning("Error writing cache file: %s", e)
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            os.remove(self._get_filename(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for filename in self._list_entries():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def get_generation(self, name: str) -> int:
+        try:
+            with open(self._get_generation_filename(name), "r") as f:
+                return int(f.read() or 0)
+        except (IOError, OSError, ValueError):
+            return 0
+
+    @contextmanager
+    def _lock(self, filename: str):
+        """
+            Holds a lock shared by all processes. Uses flock when available,
+            which the system releases if the process dies, otherwise
+            a lock file created exclusively
+        """
+        lock_filename = f"{filename}.lock"
+        if fcntl is not None:
+            with open(lock_filename, "a") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return
+        while True:
+            try:
+                os.close(os.open(lock_filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    age = time.time() - os.path.getmtime(lock_filename)
+                except OSError:
+                    # Released meanwhile
+                    continue
+                if age > self.lock_timeout:
+                    self._break_lock(lock_filename)
+                    continue
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_filename)
+            except OSError:
+                pass
+
+    def _break_lock(self, lock_filename: str) -> None:
+        """
+            Breaks a stale lock file. It's renamed to a unique name first,
+            so only one of the waiters that found it stale can break it
+        """
+        stale_filename = f"{lock_filename}.{uuid.uuid4().hex}"
+        try:
+            os.rename(lock_filename, stale_filename)
+        except OSError:
+            # Broken or released by another waiter
+            return
+        try:
+            age = time.time() - os.path.getmtime(stale_filename)
+            if age <= self.lock_timeout:
+                # Another waiter broke it and took the lock meanwhile
+                os.link(stale_filename, lock_filename)
+        except OSError:
+            pass
+        finally:
+            os.remove(stale_filename)
+
+    def bump_generation(self, name: str) -> int:
+        filename = self._get_generation_filename(name)
+        # Concurrent bumps must not write the same generation
+        with self._lock(filename):
+            generation = self.get_generation(name) + 1
+            self._write(filename, str(generation).encode("utf-8"))
+        return generation
@@ -1,6 +1,8 @@
 import copy
+import datetime
+import enum
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Type
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Type
 
 from .._compat import as_unicode
 from ..exceptions import (
@@ -13,6 +15,28 @@ log = logging.getLogger(__name__)
 map_args_filter = {}
 """ private map for arg_name and child Filter classes """
 
+_NOT_NORMALIZABLE = object()
+
+
+def _normalize_filter_value(value: Any) -> Any:
+    if value is None or isinstance(
+        value, (str, int, float, bool, datetime.date, datetime.time, enum.Enum)
+    ):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_normalize_filter_value(item) for item in value)
+        if _NOT_NORMALIZABLE in items:
+            return _NOT_NORMALIZABLE
+        return items if not isinstance(value, (set, frozenset)) else frozenset(items)
+    if isinstance(value, dict):
+        items = tuple(
+            (key, _normalize_filter_value(item)) for key, item in value.items()
+        )
+        if any(item is _NOT_NORMALIZABLE for _, item in items):
+            return _NOT_NORMALIZABLE
+        return tuple(sorted(items, key=repr))
+    return _NOT_NORMALIZABLE
+
 
 class BaseFilter(object):
     """
@@ -212,6 +236,10 @@ class Filters(object):
                     if filter.arg_name == opr:
                         self.add_filter(col, filter, value)
                         break
+                else:
+                    raise InvalidOperationFilterFABException(
+                        f"Filter operation: {opr} not allowed on column: {col}"
+                    )
             else:
                 raise InvalidOperationFilterFABException(
                     f"Filter operation: {opr} not allowed on column: {col}"
@@ -290,6 +318,30 @@ class Filters(object):
             for flt, value in zip(self.filters, self.values)
         ]
 
+    def get_normalized_key(self) -> Optional[Tuple[Hashable, ...]]:
+        """
+            Returns a hashable and order independent representation of
+            the active filters, usable as part of a cache or coalescing key.
+            Returns None if some filter value can't be safely normalized
+            (callables or arbitrary objects), so it must not be shared
+
+        :return: A tuple of (column name, filter class, value) or None
+        """
+        key = []
+        for flt, value in zip(self.filters, self.values):
+            _value = _normalize_filter_value(value)
+            if _value is _NOT_NORMALIZABLE:
+                return None
+            flt_class = flt.__class__
+            key.append(
+                (
+                    flt.column_name,
+                    f"{flt_class.__module__}.{flt_class.__name__}",
+                    _value,
+                )
+            )
+        return tuple(sorted(key, key=repr))
+
     def apply_all(self, query):
         for flt, value in zip(self.filters, self.values):
             query = flt.apply(query, value)
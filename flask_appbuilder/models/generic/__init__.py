@@ -1,10 +1,20 @@
 __author__ = "dpgaspar"
 
+import bisect
+from contextlib import contextmanager
 from datetime import date, datetime
+import heapq
+from itertools import islice
+import logging
 import operator
 import os
+import threading
+import time
 
 from ..._compat import with_metaclass
+from ...utils.rwlock import ReadWriteLock
+
+log = logging.getLogger(__name__)
 
 # --------------------------------------
 #        Exceptions
@@ -22,12 +32,16 @@ class GenericColumn(object):
     primary_key = None
     unique = None
     nullable = None
+    index = None
 
-    def __init__(self, col_type, primary_key=False, unique=False, nullable=False):
+    def __init__(
+        self, col_type, primary_key=False, unique=False, nullable=False, index=False
+    ):
         self.col_type = col_type
         self.primary_key = primary_key
         self.unique = unique
         self.nullable = nullable
+        self.index = index
 
     def check_type(self, value):
         return isinstance(value, self.col_type)
@@ -109,6 +123,198 @@ class GenericModel(with_metaclass(MetaGenericModel, object)):
         return str
 
 
+class _SortedIndex(object):
+    """
+        Positions of the items of a store list sorted by a column value,
+        lowered when lower is set. Items without value, or with a value
+        that can't be lowered, are kept apart on nones.
+        Catches up with the items appended to the list on each update.
+    """
+
+    def __init__(self, items, col_name, lower=False):
+        self.items = items
+        self.col_name = col_name
+        self.lower = lower
+        self.size = 0
+        self.keys = list()
+        self.positions = list()
+        self.nones = list()
+        self.types = set()
+        self.valid = True
+
+    def _get_key(self, item):
+        value = getattr(item, self.col_name)
+        if self.lower:
+            return value.lower() if isinstance(value, str) else None
+        return value
+
+    def update(self):
+        """
+            Indexes the items appended since the last update,
+            invalidates the index if their values can't be ordered
+        """
+        size = len(self.items)
+        if not self.valid or size == self.size:
+            return
+        new = list()
+        for position in range(self.size, size):
+            key = self._get_key(self.items[position])
+            if key is None:
+                self.nones.append(position)
+            else:
+                self.types.add(type(key))
+                new.append((key, position))
+        try:
+            if len(new) * 8 < len(self.keys):
+                for key, position in new:
+                    i = bisect.bisect_right(self.keys, key)
+                    self.keys.insert(i, key)
+                    self.positions.insert(i, position)
+            elif new:
+                get_key = operator.itemgetter(0)
+                new.sort(key=get_key)
+                merged = list(
+                    heapq.merge(zip(self.keys, self.positions), new, key=get_key)
+                )
+                self.keys = [key for key, position in merged]
+                self.positions = [position for key, position in merged]
+        except TypeError:
+            self.valid = False
+        self.size = size
+
+    def get_range(self, operation, value):
+        """
+            Returns the start and end of the positions whose
+            key matches the operation, or None if not supported
+        """
+        keys = self.keys
+        if operation == "equal":
+            return bisect.bisect_left(keys, value), bisect.bisect_right(keys, value)
+        if operation == "greater":
+            return bisect.bisect_right(keys, value), len(keys)
+        if operation == "smaller":
+            return 0, bisect.bisect_left(keys, value)
+        if operation == "starts_with":
+            if not value:
+                return 0, len(keys)
+            if ord(value[-1]) == 0x10FFFF:
+                return None
+            # All keys starting with value sort before its successor
+            successor = value[:-1] + chr(ord(value[-1]) + 1)
+            return bisect.bisect_left(keys, value), bisect.bisect_left(keys, successor)
+        return None
+
+    def ordered(self, reverse=False):
+        """
+            Yields the positions in the same order as GenericSession._order_by
+        """
+        if not reverse:
+            yield from self.nones
+            yield from self.positions
+            return
+        # Descending, keeping equal keys on their insertion order
+        keys, positions = self.keys, self.positions
+        end = len(keys)
+        while end:
+            start = bisect.bisect_left(keys, keys[end - 1], 0, end)
+            yield from positions[start:end]
+            end = start
+        yield from self.nones
+
+
+class GenericQuery(object):
+    """
+        A query of a GenericSession, returned by GenericSession.query.
+
+        Queries are immutable, filters, order_by, offset and limit return
+        a new query with their own state, so that many threads can build
+        and run queries on the same session. all and get run the session's
+        all and get with the query's state.
+    """
+
+    __slots__ = (
+        "session",
+        "model_cls",
+        "filters_cmd",
+        "order_by_cmd",
+        "offset_",
+        "limit_",
+    )
+
+    def __init__(
+        self, session, model_cls, filters_cmd=(), order_by_cmd=None, offset_=0, limit_=0
+    ):
+        self.session = session
+        self.model_cls = model_cls
+        self.filters_cmd = tuple(filters_cmd)
+        self.order_by_cmd = order_by_cmd
+        self.offset_ = offset_
+        self.limit_ = limit_
+
+    @property
+    def query_class(self):
+        return self.model_cls._name if self.model_cls is not None else ""
+
+    def _replace(self, **kwargs):
+        state = {
+            "filters_cmd": self.filters_cmd,
+            "order_by_cmd": self.order_by_cmd,
+            "offset_": self.offset_,
+            "limit_": self.limit_,
+        }
+        state.update(kwargs)
+        return GenericQuery(self.session, self.model_cls, **state)
+
+    def _filter(self, filter_func, col_name, value):
+        return self._replace(
+            filters_cmd=self.filters_cmd + ((filter_func, col_name, value),)
+        )
+
+    def order_by(self, order_cmd):
+        return self._replace(order_by_cmd=order_cmd)
+
+    def offset(self, offset=0):
+        return self._replace(offset_=offset)
+
+    def limit(self, limit=0):
+        return self._replace(limit_=limit)
+
+    def starts_with(self, col_name, value):
+        return self._filter(self.session._starts_with, col_name, value)
+
+    def greater(self, col_name, value):
+        return self._filter(self.session._greater, col_name, value)
+
+    def smaller(self, col_name, value):
+        return self._filter(self.session._smaller, col_name, value)
+
+    def ilike(self, col_name, value):
+        return self._filter(self.session._ilike, col_name, value)
+
+    def like(self, col_name, value):
+        return self._filter(self.session._like, col_name, value)
+
+    def not_like(self, col_name, value):
+        return self._filter(self.session._not_like, col_name, value)
+
+    def equal(self, col_name, value):
+        return self._filter(self.session._equal, col_name, value)
+
+    def not_equal(self, col_name, value):
+        return self._filter(self.session._not_equal, col_name, value)
+
+    def scalar(self):
+        return self.session.scalar()
+
+    def all(self):
+        with self.session.use_query(self):
+            return self.session.all()
+
+    def get(self, pk):
+        with self.session.use_query(self):
+            return self.session.get(pk)
+
+
 class GenericSession(object):
     """
         This class is a base, you should subclass it
@@ -118,59 +324,225 @@ class GenericSession(object):
 
         **GenericSession** will implement filter and orders
         based on your data generation on the **all** method.
+
+        Items are looked up by primary key on a hash map, and columns
+        declared with index=True get a sorted index, used to order and
+        to filter by equal, greater, smaller and starts with::
+
+            class MyGenericModel(GenericModel):
+                id = GenericColumn(int, primary_key=True)
+                name = GenericColumn(str, index=True)
+
+        Indexes are dropped by delete_all and catch up with added
+        items on the next query.
+
+        query returns an immutable GenericQuery, and the store is guarded
+        by a reader/writer lock: add, delete_all and clear write, all and
+        get read. So a session can be shared by threads, subclasses that
+        change the store on all or get should hold the lock for writing.
     """
 
+    use_indexes = True
+    """ Set to False to always scan the store """
+
     def __init__(self):
-        self._order_by_cmd = None
-        self._filters_cmd = list()
         self.store = dict()
-        self.query_filters = list()
-        self.query_class = ""
-        self._offset = 0
-        self._limit = 0
+        self.lock = ReadWriteLock()
+        self._local = threading.local()
+        self._no_query = GenericQuery(self, None)
+        # Indexes are updated by readers, one at a time
+        self._index_lock = threading.Lock()
+        self._pk_indexes = dict()
+        self._sorted_indexes = dict()
 
     def clear(self):
         """
             Deletes the entire store
         """
-        self.store = dict()
+        with self.lock.write():
+            self.store = dict()
+            self._pk_indexes = dict()
+            self._sorted_indexes = dict()
 
     def delete_all(self, model_cls):
         """
             Deletes all objects of type model_cls
         """
-        self.store[model_cls._name] = []
+        with self.lock.write():
+            self.store[model_cls._name] = []
+            self._pk_indexes.pop(model_cls._name, None)
+            for key in [
+                key for key in self._sorted_indexes if key[0] == model_cls._name
+            ]:
+                del self._sorted_indexes[key]
+
+    # -----------------------------------------
+    #       The query being run by the thread
+    # -----------------------------------------
+
+    @contextmanager
+    def use_query(self, query):
+        """
+            Sets the query run by all and get on the current thread
+        """
+        previous = getattr(self._local, "query", None)
+        self._local.query = query
+        try:
+            yield
+        finally:
+            self._local.query = previous
+
+    @property
+    def current_query(self):
+        return getattr(self._local, "query", None) or self._no_query
+
+    @property
+    def query_class(self):
+        return self.current_query.query_class
+
+    @property
+    def _filters_cmd(self):
+        return self.current_query.filters_cmd
+
+    @property
+    def _order_by_cmd(self):
+        return self.current_query.order_by_cmd
+
+    @property
+    def _offset(self):
+        return self.current_query.offset_
+
+    @property
+    def _limit(self):
+        return self.current_query.limit_
+
+    # -----------------------------------------
+    #                 INDEXES
+    # -----------------------------------------
+
+    def _get_pk_index(self, model_name):
+        """
+            Returns a dict of the items by primary key value,
+            keeping the first item of repeated keys
+        """
+        with self._index_lock:
+            return self._update_pk_index(model_name)
+
+    def _update_pk_index(self, model_name):
+        items = self.store.get(model_name) or []
+        entry = self._pk_indexes.get(model_name)
+        if entry is None or entry[0] is not items or entry[1] > len(items):
+            entry = [items, 0, dict()]
+            self._pk_indexes[model_name] = entry
+        pk_index = entry[2]
+        try:
+            for item in islice(items, entry[1], None):
+                pk_index.setdefault(getattr(item, item.pk), item)
+        except TypeError:
+            # Unhashable keys
+            del self._pk_indexes[model_name]
+            return None
+        entry[1] = len(items)
+        return pk_index
+
+    def _get_sorted_index(self, model_name, col_name, lower=False):
+        """
+            Returns the sorted index of a column declared with index=True,
+            or None if there's none or its values can't be ordered
+        """
+        items = self.store.get(model_name)
+        if not items:
+            return None
+        column = items[0].properties.get(col_name)
+        if column is None or not column.index:
+            return None
+        key = (model_name, col_name, lower)
+        with self._index_lock:
+            index = self._sorted_indexes.get(key)
+            if index is None or index.items is not items or index.size > len(items):
+                index = _SortedIndex(items, col_name, lower)
+                self._sorted_indexes[key] = index
+            index.update()
+        return index if index.valid else None
+
+    _index_operations = {
+        "_equal": "equal",
+        "_greater": "greater",
+        "_smaller": "smaller",
+        "_starts_with": "starts_with",
+    }
+
+    def _get_index_range(self, filter_cmd):
+        """
+            Returns the index and the range of its positions that match
+            a filter command, or None if no index can answer it
+        """
+        func, col_name, value = filter_cmd
+        name = getattr(func, "__name__", "")
+        operation = self._index_operations.get(name)
+        # Overridden filters may match differently
+        if operation is None or getattr(func, "__func__", None) is not getattr(
+            GenericSession, name
+        ):
+            return None
+        if operation == "starts_with":
+            if not isinstance(value, str):
+                return None
+            index = self._get_sorted_index(self.query_class, col_name, lower=True)
+            # Items must start with every word, so with the longest
+            value = max(value.lower().split(" "), key=len)
+        else:
+            index = self._get_sorted_index(self.query_class, col_name)
+            if index is None:
+                return None
+            col_type = index.items[0].properties[col_name].col_type
+            # Same conversions as the filters, for columns of a single type
+            if not index.types <= {col_type} or (
+                issubclass(col_type, date) and col_type is not date
+            ):
+                return None
+            try:
+                if col_type is date:
+                    value = datetime.strptime(value, "%Y-%m-%d").date()
+                else:
+                    value = col_type(value)
+            except Exception:
+                # No item would match
+                return index, 0, 0
+        if index is None:
+            return None
+        index_range = index.get_range(operation, value)
+        if index_range is None:
+            return None
+        return (index,) + index_range
 
     def get(self, pk):
         """
             Returns the object for the key
             Override it for efficiency.
         """
-        for item in self.store.get(self.query_class):
-            # coverts pk value to correct type
-            pk = item.properties[item.pk].col_type(pk)
-            if getattr(item, item.pk) == pk:
-                return item
+        with self.lock.read():
+            items = self.store.get(self.query_class) or []
+            pk_index = None
+            if self.use_indexes and items:
+                pk_index = self._get_pk_index(self.query_class)
+            if pk_index is not None:
+                item = items[0]
+                return pk_index.get(item.properties[item.pk].col_type(pk))
+            for item in items:
+                # coverts pk value to correct type
+                pk = item.properties[item.pk].col_type(pk)
+                if getattr(item, item.pk) == pk:
+                    return item
 
     def query(self, model_cls):
         """
-            SQLAlchemy query like method
+            SQLAlchemy query like method, returns a GenericQuery
         """
-        self._filters_cmd = list()
-        self.query_filters = list()
-        self._order_by_cmd = None
-        self._offset = 0
-        self._limit = 0
-        self.query_class = model_cls._name
-        return self
+        return GenericQuery(self, model_cls)
 
-    def order_by(self, order_cmd):
-        self._order_by_cmd = order_cmd
-        return self
-
-    def _order_by(self, data, order_cmd):
-        col_name, direction = order_cmd.split()
-        reverse_flag = direction == "desc"
+    @staticmethod
+    def _get_order_key(col_name):
         # patched as suggested by:
         # http://stackoverflow.com/questions/18411560/python-sort-list-with-none-at-the-end
         # and
@@ -186,11 +558,35 @@ class GenericSession(object):
 
             this function tries to patch the issue
             """
-            op = operator.attrgetter(col_name)  # noqa
-            missing = getattr(data, col_name) is not None
-            return missing, getattr(data, col_name)
+            value = getattr(data, col_name)
+            return value is not None, value
+
+        return col_name_if_not_none
 
-        return sorted(data, key=col_name_if_not_none, reverse=reverse_flag)
+    def _order_by(self, data, order_cmd):
+        col_name, direction = order_cmd.split()
+        reverse_flag = direction == "desc"
+        return sorted(data, key=self._get_order_key(col_name), reverse=reverse_flag)
+
+    def _order_by_page(self, data, order_cmd, count, is_store):
+        """
+            Returns data ordered, or its first count items when count is
+            not None. Walks the column's sorted index when data is the
+            whole store, selects a page with a heap otherwise
+        """
+        if type(self)._order_by is not GenericSession._order_by:
+            return self._order_by(data, order_cmd)
+        col_name, direction = order_cmd.split()
+        reverse_flag = direction == "desc"
+        if is_store and self.use_indexes:
+            index = self._get_sorted_index(self.query_class, col_name)
+            if index is not None:
+                return [data[pos] for pos in islice(index.ordered(reverse_flag), count)]
+        if count is not None and count < len(data):
+            # Same as sorted(...)[:count], equal keys keep their order
+            select = heapq.nlargest if reverse_flag else heapq.nsmallest
+            return select(count, data, key=self._get_order_key(col_name))
+        return self._order_by(data, order_cmd)
 
     def scalar(self):
         return 0
@@ -199,10 +595,6 @@ class GenericSession(object):
     #           FUNCTIONS for FILTERS
     # -----------------------------------------
 
-    def starts_with(self, col_name, value):
-        self._filters_cmd.append((self._starts_with, col_name, value))
-        return self
-
     def _starts_with(self, item, col_name, value):
         lw_col = getattr(item, col_name)
         try:
@@ -218,10 +610,6 @@ class GenericSession(object):
 
         return col_name
 
-    def greater(self, col_name, value):
-        self._filters_cmd.append((self._greater, col_name, value))
-        return self
-
     def _greater(self, item, col_name, value):
         source_value = getattr(item, col_name)
 
@@ -243,10 +631,6 @@ class GenericSession(object):
             # when everything fails silently report False
             return False
 
-    def smaller(self, col_name, value):
-        self._filters_cmd.append((self._smaller, col_name, value))
-        return self
-
     def _smaller(self, item, col_name, value):
         source_value = getattr(item, col_name)
 
@@ -268,10 +652,6 @@ class GenericSession(object):
             # when everything fails silently report False
             return False
 
-    def ilike(self, col_name, value):
-        self._filters_cmd.append((self._ilike, col_name, value))
-        return self
-
     def _ilike(self, item, col_name, value):
         lw_col = getattr(item, col_name)
         try:
@@ -287,10 +667,6 @@ class GenericSession(object):
 
         return col_name
 
-    def like(self, col_name, value):
-        self._filters_cmd.append((self._like, col_name, value))
-        return self
-
     def _like(self, item, col_name, value):
         lw_col = getattr(item, col_name)
         lw_value_list = value.split(" ")
@@ -301,17 +677,9 @@ class GenericSession(object):
 
         return col_name
 
-    def not_like(self, col_name, value):
-        self._filters_cmd.append((self._not_like, col_name, value))
-        return self
-
     def _not_like(self, item, col_name, value):
         return value not in getattr(item, col_name)
 
-    def equal(self, col_name, value):
-        self._filters_cmd.append((self._equal, col_name, value))
-        return self
-
     def _equal(self, item, col_name, value):
         source_value = getattr(item, col_name)
 
@@ -333,51 +701,163 @@ class GenericSession(object):
             # when everything fails silently report False
             return False
 
-    def not_equal(self, col_name, value):
-        self._filters_cmd.append((self._not_equal, col_name, value))
-        return self
-
     def _not_equal(self, item, col_name, value):
         return not self._equal(item, col_name, value)
 
-    def offset(self, offset=0):
-        self._offset = offset
-        return self
-
-    def limit(self, limit=0):
-        self._limit = limit
-        return self
-
     def all(self):
         """
             SQLA like 'all' method, will populate all rows and apply all
             filters and orders to it.
         """
-        items = list()
-        if not self._filters_cmd:
-            items = self.store.get(self.query_class)
-        else:
-            for item in self.store.get(self.query_class):
-                tmp_flag = True
-                for filter_cmd in self._filters_cmd:
-                    if not filter_cmd[0](item, filter_cmd[1], filter_cmd[2]):
-                        tmp_flag = False
-                        break
-                if tmp_flag:
-                    items.append(item)
-        if self._order_by_cmd:
-            items = self._order_by(items, self._order_by_cmd)
-        total_length = len(items)
-        if self._limit != 0:
-            items = items[self._offset : self._offset + self._limit]
-        return total_length, items
+        with self.lock.read():
+            store_items = self.store.get(self.query_class) or []
+            items = store_items
+            filters_cmd = list(self._filters_cmd)
+            if self.use_indexes and filters_cmd:
+                # Scan only the items of the narrowest indexed filter
+                best = None
+                for filter_cmd in filters_cmd:
+                    index_range = self._get_index_range(filter_cmd)
+                    if index_range is None:
+                        continue
+                    index, start, end = index_range
+                    if best is None or end - start < best[3] - best[2]:
+                        best = (filter_cmd,) + index_range
+                if best is not None:
+                    filter_cmd, index, start, end = best
+                    # Several words are narrowed by the longest,
+                    # the filter still checks the others
+                    func, _, value = filter_cmd
+                    if func.__name__ != "_starts_with" or " " not in value:
+                        filters_cmd.remove(filter_cmd)
+                    items = [
+                        store_items[pos] for pos in sorted(index.positions[start:end])
+                    ]
+            if filters_cmd:
+                filtered_items = list()
+                for item in items:
+                    tmp_flag = True
+                    for filter_cmd in filters_cmd:
+                        if not filter_cmd[0](item, filter_cmd[1], filter_cmd[2]):
+                            tmp_flag = False
+                            break
+                    if tmp_flag:
+                        filtered_items.append(item)
+                items = filtered_items
+            total_length = len(items)
+            page_end = self._offset + self._limit if self._limit != 0 else None
+            if self._order_by_cmd:
+                items = self._order_by_page(
+                    items, self._order_by_cmd, page_end, items is store_items
+                )
+            if self._limit != 0:
+                items = items[self._offset : page_end]
+            if items is store_items:
+                # Readers must not see later writes
+                items = list(items)
+            return total_length, items
 
     def add(self, model):
-        model_cls_name = model._name
-        cls_list = self.store.get(model_cls_name)
-        if not cls_list:
-            self.store[model_cls_name] = []
-        self.store[model_cls_name].append(model)
+        with self.lock.write():
+            model_cls_name = model._name
+            cls_list = self.store.get(model_cls_name)
+            if not cls_list:
+                self.store[model_cls_name] = []
+            self.store[model_cls_name].append(model)
+
+
+class SnapshotGenericSession(GenericSession):
+    """
+        A GenericSession for data sources that are expensive to read,
+        like the output of a command. Implement load_snapshot to return
+        all the items, instead of rebuilding the store on all and get::
+
+            class ServiceSession(SnapshotGenericSession):
+                snapshot_ttl = 10
+
+                def load_snapshot(self):
+                    return [ServiceModel(**row) for row in read_services()]
+
+        The snapshot is loaded on the first query, and queries are
+        served from it for snapshot_ttl seconds. The first query after
+        that starts loading a new snapshot on a background thread, and
+        queries keep reading the last snapshot loaded without errors
+        until the new one replaces it.
+    """
+
+    snapshot_ttl = 5
+    """ Seconds a snapshot is served before it's refreshed """
+    refresh_in_background = True
+    """ Set to False to refresh expired snapshots on the querying thread """
+
+    def __init__(self):
+        super(SnapshotGenericSession, self).__init__()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_expires = None
+        self._refreshing = False
+
+    def load_snapshot(self):
+        """
+            Override it to return all the items of the data source
+        """
+        raise NotImplementedError
+
+    def refresh(self):
+        """
+            Loads a snapshot and replaces the store with it
+        """
+        # Reading the data source is the slow part, done without the lock
+        items = self.load_snapshot()
+        with self.lock.write():
+            self.clear()
+            for item in items:
+                self.add(item)
+        self._snapshot_expires = time.monotonic() + self.snapshot_ttl
+
+    def _refresh_last_good(self):
+        try:
+            self.refresh()
+        except Exception:
+            log.exception("Error loading %s snapshot", self.__class__.__name__)
+            # Keep serving the last snapshot, retry when it expires again
+            self._snapshot_expires = time.monotonic() + self.snapshot_ttl
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh_last_good()
+        finally:
+            self._refreshing = False
+
+    def _ensure_snapshot(self):
+        """
+            Loads the first snapshot, or refreshes an expired one
+        """
+        if self._snapshot_expires is None:
+            with self._snapshot_lock:
+                # There's nothing to serve yet, errors go to the caller
+                if self._snapshot_expires is None:
+                    self.refresh()
+            return
+        if time.monotonic() < self._snapshot_expires:
+            return
+        with self._snapshot_lock:
+            if self._refreshing or time.monotonic() < self._snapshot_expires:
+                return
+            if not self.refresh_in_background:
+                self._refresh_last_good()
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._refresh_in_background)
+        thread.daemon = True
+        thread.start()
+
+    def get(self, pk):
+        self._ensure_snapshot()
+        return super(SnapshotGenericSession, self).get(pk)
+
+    def all(self):
+        self._ensure_snapshot()
+        return super(SnapshotGenericSession, self).all()
 
 
 # -------------------------------------
@@ -394,12 +874,22 @@ class PSModel(GenericModel):
     CMD = GenericColumn(str)
 
 
-class PSSession(GenericSession):
+class PSSession(SnapshotGenericSession):
+    """
+        The processes of the host, like 'ps -ef', read from /proc.
+        Where there's no /proc the output of 'ps -ef' is parsed
+    """
+
+    proc_path = "/proc"
+    snapshot_ttl = 2
     regexp = (
         "(\w+) +(\w+) +(\w+) +(\w+) +(\w+:\w+|\w+) (\?|tty\w+) +(\w+:\w+:\w+) +(.+)\n"
     )
 
-    def add_object(self, line):
+    def parse_line(self, line):
+        """
+            Returns the PSModel of a 'ps -ef' output line, or None
+        """
         import re
 
         group = re.findall(self.regexp, line)
@@ -413,18 +903,100 @@ class PSSession(GenericSession):
             model.TTY = group[0][5]
             model.TIME = group[0][6]
             model.CMD = group[0][7]
-            self.add(model)
+            return model
 
-    def get(self, pk):
-        self.delete_all(PSModel())
-        out = os.popen("ps -p {0} -f".format(pk))
-        for line in out.readlines():
-            self.add_object(line)
-        return super(PSSession, self).get(pk)
+    def add_object(self, line):
+        model = self.parse_line(line)
+        if model:
+            self.add(model)
 
-    def all(self):
-        self.delete_all(PSModel())
-        out = os.popen("ps -ef")
-        for line in out.readlines():
-            self.add_object(line)
-        return super(PSSession, self).all()
+    def load_snapshot(self):
+        if not os.path.isdir(os.path.join(self.proc_path, "self")):
+            with os.popen("ps -ef") as out:
+                return [
+                    model for model in map(self.parse_line, out.readlines()) if model
+                ]
+        import pwd
+
+        clock_ticks = os.sysconf("SC_CLK_TCK")
+        with open(os.path.join(self.proc_path, "stat")) as f:
+            boot_time = next(
+                int(line.split()[1]) for line in f if line.startswith("btime ")
+            )
+        with open(os.path.join(self.proc_path, "uptime")) as f:
+            uptime = float(f.read().split()[0])
+        today = date.today()
+        users = dict()
+        items = list()
+        for name in os.listdir(self.proc_path):
+            if not name.isdigit():
+                continue
+            try:
+                model = self._read_process(
+                    os.path.join(self.proc_path, name), clock_ticks, uptime
+                )
+            except (OSError, ValueError, IndexError):
+                # The process ended while it was read
+                continue
+            uid = model.UID
+            if uid not in users:
+                try:
+                    users[uid] = pwd.getpwuid(uid).pw_name
+                except KeyError:
+                    users[uid] = str(uid)
+            model.UID = users[uid]
+            started = datetime.fromtimestamp(boot_time + model.STIME)
+            model.STIME = started.strftime(
+                "%H:%M" if started.date() == today else "%b%d"
+            )
+            items.append(model)
+        return items
+
+    @staticmethod
+    def _get_tty_name(tty_nr):
+        major = (tty_nr >> 8) & 0xFFF
+        minor = (tty_nr & 0xFF) | ((tty_nr >> 12) & 0xFFF00)
+        if 136 <= major <= 143:
+            return "pts/{0}".format((major - 136) * 256 + minor)
+        if major == 4:
+            return (
+                "tty{0}".format(minor) if minor < 64 else "ttyS{0}".format(minor - 64)
+            )
+        return "?"
+
+    def _read_process(self, path, clock_ticks, uptime):
+        """
+            Returns the PSModel of a /proc/<pid> directory, with the
+            effective uid on UID and the seconds after boot on STIME
+        """
+        with open(os.path.join(path, "stat"), "rb") as f:
+            stat = f.read().decode("utf-8", "replace")
+        # The command name may have spaces and parenthesis
+        comm = stat[stat.index("(") + 1 : stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2 :].split()
+        with open(os.path.join(path, "status"), "rb") as f:
+            uid = next(int(line.split()[2]) for line in f if line.startswith(b"Uid:"))
+        with open(os.path.join(path, "cmdline"), "rb") as f:
+            cmdline = f.read().rstrip(b"\0").replace(b"\0", b" ")
+        cpu_time = (int(fields[11]) + int(fields[12])) / clock_ticks
+        started = int(fields[19]) / clock_ticks
+        elapsed = uptime - started
+        days, seconds = divmod(int(cpu_time), 86400)
+        model = PSModel()
+        model.UID = uid
+        model.PID = int(os.path.basename(path))
+        model.PPID = int(fields[1])
+        # Percent of the CPU time since it started, capped like ps
+        model.C = min(int(cpu_time * 100 / elapsed), 99) if elapsed > 0 else 0
+        model.STIME = started
+        model.TTY = self._get_tty_name(int(fields[4]))
+        model.TIME = "{0}{1:02d}:{2:02d}:{3:02d}".format(
+            "{0}-".format(days) if days else "",
+            seconds // 3600,
+            seconds // 60 % 60,
+            seconds % 60,
+        )
+        model.CMD = (
+            cmdline.decode("utf-8", "replace") if cmdline else "[{0}]".format(comm)
+        )
+        return model
@@ -0,0 +1,339 @@
+from array import array
+from datetime import date, datetime
+import heapq
+import operator
+
+from . import GenericColumn, GenericSession
+
+_TYPECODES = {int: "q", float: "d"}
+""" Array type codes of the column types kept on typed arrays """
+
+_row_classes = dict()
+""" private cache of the row class of each model class """
+
+
+def get_row_class(model_cls):
+    """
+        Returns a subclass of model_cls that keeps
+        the column values on __slots__
+    """
+    model_cls = getattr(model_cls, "_model_class", model_cls)
+    row_cls = _row_classes.get(model_cls)
+    if row_cls is None:
+        row_cls = type(
+            model_cls.__name__, (model_cls,), {"__slots__": tuple(model_cls.columns)}
+        )
+        # The metaclass only collects the GenericColumns declared on the class
+        row_cls._model_class = model_cls
+        row_cls._col_defs = model_cls._col_defs
+        row_cls._name = model_cls._name
+        row_cls.properties = model_cls.properties
+        row_cls.columns = model_cls.columns
+        row_cls.pk = model_cls.pk
+        _row_classes[model_cls] = row_cls
+    return row_cls
+
+
+class Column(object):
+    """
+        The values of a column, on a typed array for int and float
+        columns, with None values flagged on nulls, or on a list.
+        Values of other types switch typed columns to a list
+    """
+
+    __slots__ = ("col_type", "typecode", "values", "nulls")
+
+    def __init__(self, col_type):
+        self.col_type = col_type
+        self.typecode = _TYPECODES.get(col_type)
+        self.values = array(self.typecode) if self.typecode else list()
+        self.nulls = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, position):
+        if self.nulls is not None and self.nulls[position]:
+            return None
+        return self.values[position]
+
+    def _to_list(self):
+        self.values = [self[position] for position in range(len(self.values))]
+        self.typecode = None
+        self.nulls = None
+
+    def append(self, value):
+        if self.typecode is None:
+            self.values.append(value)
+            return
+        if value is None:
+            if self.nulls is None:
+                self.nulls = bytearray(len(self.values))
+            self.nulls.append(1)
+            self.values.append(0)
+            return
+        if type(value) is not self.col_type:
+            self._to_list()
+            self.values.append(value)
+            return
+        try:
+            self.values.append(value)
+        except OverflowError:
+            self._to_list()
+            self.values.append(value)
+            return
+        if self.nulls is not None:
+            self.nulls.append(0)
+
+    def get_order_key(self):
+        """
+            Returns a position key that orders like GenericSession._order_by
+        """
+        if self.typecode is not None and self.nulls is None:
+            return self.values.__getitem__
+
+        def key(position):
+            value = self[position]
+            return value is not None, value
+
+        return key
+
+
+class ColumnStore(object):
+    """
+        The items of a model, kept column by column
+    """
+
+    def __init__(self, model_cls):
+        self.model_cls = getattr(model_cls, "_model_class", model_cls)
+        self.row_class = get_row_class(self.model_cls)
+        self.columns = {
+            col_name: Column(col_def.col_type)
+            for col_name, col_def in self.model_cls._col_defs.items()
+        }
+        self._setters = [
+            (getattr(self.row_class, col_name).__set__, column)
+            for col_name, column in self.columns.items()
+        ]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, item):
+        for col_name, column in self.columns.items():
+            value = getattr(item, col_name, None)
+            # Unset attributes read the class GenericColumn
+            if isinstance(value, GenericColumn):
+                value = None
+            column.append(value)
+        self.size += 1
+
+    def get_row(self, position):
+        """
+            Materializes the item at position
+        """
+        row = self.row_class.__new__(self.row_class)
+        for setter, column in self._setters:
+            setter(row, column[position])
+        return row
+
+
+class ColumnarGenericSession(GenericSession):
+    """
+        A GenericSession that keeps the added items column by column,
+        int and float columns on typed arrays and other columns on lists,
+        instead of one object per item. Filters are evaluated a column
+        at a time, and items are only materialized for the returned page,
+        as instances of a subclass of the model with __slots__.
+
+        Use it like GenericSession, values of a column should share the
+        column type to be kept on an array. Materialized items are
+        copies, changing them doesn't change the session.
+    """
+
+    def add(self, model):
+        with self.lock.write():
+            store = self.store.get(model._name)
+            if store is None:
+                store = self.store[model._name] = ColumnStore(model.__class__)
+            store.append(model)
+
+    def delete_all(self, model_cls):
+        """
+            Deletes all objects of type model_cls
+        """
+        with self.lock.write():
+            self.store.pop(model_cls._name, None)
+
+    def get(self, pk):
+        """
+            Returns the first object with the key, scanning the key column
+        """
+        with self.lock.read():
+            store = self.store.get(self.query_class)
+            if not store:
+                return None
+            pk_name = store.model_cls.pk
+            column = store.columns[pk_name]
+            pk = store.model_cls.properties[pk_name].col_type(pk)
+            if column.nulls is not None and pk == 0:
+                # None values are kept as 0 on the array
+                for position in range(store.size):
+                    if column[position] == pk:
+                        return store.get_row(position)
+                return None
+            try:
+                return store.get_row(column.values.index(pk))
+            except ValueError:
+                return None
+
+    # -----------------------------------------
+    #       FILTERS, a column at a time
+    # -----------------------------------------
+
+    @staticmethod
+    def _convert(source_value, value):
+        """
+            Converts a filter value like the GenericSession filters
+        """
+        # date has special constructor, tested only on sqlite
+        if isinstance(source_value, date):
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        # fallback to native python types
+        return type(source_value)(value)
+
+    def _column_compare(self, column, value, positions, compare):
+        if column.typecode is not None:
+            try:
+                value = column.col_type(value)
+            except Exception:
+                return list()
+            values, nulls = column.values, column.nulls
+            if nulls is None:
+                return [
+                    position
+                    for position in positions
+                    if compare(values[position], value)
+                ]
+            return [
+                position
+                for position in positions
+                if not nulls[position] and compare(values[position], value)
+            ]
+        # Converted values by source value type, None when conversion fails
+        converted = dict()
+        result = list()
+        for position in positions:
+            source_value = column[position]
+            if source_value is None:
+                continue
+            source_type = type(source_value)
+            if source_type in converted:
+                filter_value = converted[source_type]
+            else:
+                try:
+                    filter_value = self._convert(source_value, value)
+                except Exception:
+                    filter_value = None
+                converted[source_type] = filter_value
+            if filter_value is None:
+                continue
+            try:
+                if compare(source_value, filter_value):
+                    result.append(position)
+            except Exception:
+                continue
+        return result
+
+    def _column_equal(self, column, value, positions):
+        return self._column_compare(column, value, positions, operator.eq)
+
+    def _column_not_equal(self, column, value, positions):
+        equal = set(self._column_equal(column, value, positions))
+        return [position for position in positions if position not in equal]
+
+    def _column_greater(self, column, value, positions):
+        return self._column_compare(column, value, positions, operator.gt)
+
+    def _column_smaller(self, column, value, positions):
+        return self._column_compare(column, value, positions, operator.lt)
+
+    def _column_lowered(self, column, value, positions, match):
+        lw_value_list = value.lower().split(" ")
+        result = list()
+        for position in positions:
+            try:
+                lw_col = column[position].lower()
+            except Exception:
+                continue
+            if all(match(lw_col, lw_item) for lw_item in lw_value_list):
+                result.append(position)
+        return result
+
+    def _column_starts_with(self, column, value, positions):
+        return self._column_lowered(column, value, positions, str.startswith)
+
+    def _column_ilike(self, column, value, positions):
+        return self._column_lowered(column, value, positions, operator.contains)
+
+    def _column_like(self, column, value, positions):
+        value_list = value.split(" ")
+        return [
+            position
+            for position in positions
+            if all(item in column[position] for item in value_list)
+        ]
+
+    def _column_not_like(self, column, value, positions):
+        return [position for position in positions if value not in column[position]]
+
+    def _filter_positions(self, store, filter_cmd, positions):
+        func, col_name, value = filter_cmd
+        name = getattr(func, "__name__", "")
+        column_filter = getattr(self, "_column" + name, None)
+        # Custom or overridden filters are applied to materialized items
+        if column_filter is None or getattr(func, "__func__", None) is not getattr(
+            GenericSession, name, None
+        ):
+            get_row = store.get_row
+            return [
+                position
+                for position in positions
+                if func(get_row(position), col_name, value)
+            ]
+        return column_filter(store.columns[col_name], value, positions)
+
+    def all(self):
+        """
+            SQLA like 'all' method, filters and orders the item positions,
+            then materializes the requested page
+        """
+        with self.lock.read():
+            store = self.store.get(self.query_class)
+            if not store:
+                return 0, list()
+            positions = range(store.size)
+            for filter_cmd in self._filters_cmd:
+                positions = self._filter_positions(store, filter_cmd, positions)
+            total_length = len(positions)
+            page_end = self._offset + self._limit if self._limit != 0 else None
+            if self._order_by_cmd:
+                if type(self)._order_by is not GenericSession._order_by:
+                    items = self._order_by(
+                        [store.get_row(position) for position in positions],
+                        self._order_by_cmd,
+                    )
+                    return total_length, items[self._offset : page_end]
+                col_name, direction = self._order_by_cmd.split()
+                reverse_flag = direction == "desc"
+                key = store.columns[col_name].get_order_key()
+                if page_end is not None and page_end < total_length:
+                    # Same as sorted(...)[:page_end], equal keys keep their order
+                    select = heapq.nlargest if reverse_flag else heapq.nsmallest
+                    positions = select(page_end, positions, key=key)
+                else:
+                    positions = sorted(positions, key=key, reverse=reverse_flag)
+            if self._limit != 0:
+                positions = positions[self._offset : page_end]
+            return total_length, [store.get_row(position) for position in positions]
@@ -0,0 +1,533 @@
+from array import array
+import csv
+from datetime import date, datetime
+import heapq
+import io
+from itertools import islice
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from . import GenericSession
+
+log = logging.getLogger(__name__)
+
+_SIDECAR_HEADER = struct.Struct("<8sqq")
+""" Magic, size and mtime of the data file the sidecar index was built from """
+_SIDECAR_MAGIC = b"FABIDX01"
+
+_FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+_DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
+def _convert(col_type, value):
+    """
+        Converts a value read from a file to the column type,
+        returns None for missing values and failed conversions
+    """
+    if value is None or type(value) is col_type:
+        return value
+    try:
+        if issubclass(col_type, datetime):
+            for date_format in _DATETIME_FORMATS:
+                try:
+                    return datetime.strptime(value, date_format)
+                except ValueError:
+                    continue
+            return None
+        if issubclass(col_type, date):
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        if col_type is bool and isinstance(value, str):
+            return value.lower() in ("1", "true", "yes")
+        return col_type(value)
+    except Exception:
+        return None
+
+
+class DataFile(object):
+    """
+        A memory mapped CSV or JSONL file, with one item per row.
+        The offsets of the rows, and the rows sorted by each column that
+        is queried, are built on first use and saved on sidecar files
+        next to it, or on index_dir
+    """
+
+    def __init__(
+        self, model_cls, path, file_format=None, encoding="utf-8", index_dir=None
+    ):
+        if file_format is None:
+            file_format = _FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format not in ("csv", "jsonl"):
+            raise ValueError("Unknown file format for {0}".format(path))
+        self.model_cls = model_cls
+        self.path = path
+        self.file_format = file_format
+        self.encoding = encoding
+        self.index_dir = index_dir
+        self.header = None
+        self.offsets = array("q")
+        self._stat = None
+        self._data = b""
+        self._sorted = dict()
+        # Sorted indexes are built by readers, one at a time
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return len(self.offsets) - 1
+
+    def changed(self):
+        stat = os.stat(self.path)
+        return (stat.st_size, stat.st_mtime_ns) != self._stat
+
+    def open(self):
+        """
+            Maps the file, and loads or builds its offset index
+        """
+        stat = os.stat(self.path)
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._stat = (stat.st_size, stat.st_mtime_ns)
+        self._sorted = dict()
+        if stat.st_size:
+            with open(self.path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+        start = 0
+        if self.file_format == "csv":
+            start = self._next_record(0)
+            header = self._data[:start].decode(self.encoding).lstrip("\ufeff")
+            self.header = next(csv.reader(io.StringIO(header)), [])
+        offsets = self._load_sidecar(".idx")
+        if offsets is None:
+            offsets = self._build_offsets(start)
+            self._save_sidecar(".idx", offsets)
+        self.offsets = offsets
+
+    # -----------------------------------------
+    #              SIDECAR FILES
+    # -----------------------------------------
+
+    def _get_sidecar_path(self, suffix):
+        if self.index_dir:
+            return os.path.join(self.index_dir, os.path.basename(self.path) + suffix)
+        return self.path + suffix
+
+    def _load_sidecar(self, suffix):
+        try:
+            with open(self._get_sidecar_path(suffix), "rb") as f:
+                header = f.read(_SIDECAR_HEADER.size)
+                if len(header) != _SIDECAR_HEADER.size:
+                    return None
+                magic, size, mtime = _SIDECAR_HEADER.unpack(header)
+                if magic != _SIDECAR_MAGIC or (size, mtime) != self._stat:
+                    return None
+                values = array("q")
+                values.frombytes(f.read())
+                return values
+        except (OSError, ValueError):
+            return None
+
+    def _save_sidecar(self, suffix, values):
+        path = self._get_sidecar_path(suffix)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(_SIDECAR_HEADER.pack(_SIDECAR_MAGIC, *self._stat))
+                f.write(values.tobytes())
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            # Read only locations keep the index in memory
+            log.warning("Can't save index %s: %s", path, e)
+
+    # -----------------------------------------
+    #                  ROWS
+    # -----------------------------------------
+
+    def _next_record(self, pos):
+        """
+            Returns the start of the record after the one at pos,
+            CSV records continue on lines with open quotes
+        """
+        data, size = self._data, len(self._data)
+        quotes = 0
+        while pos < size:
+            end = data.find(b"\n", pos)
+            end = size if end == -1 else end + 1
+            if self.file_format == "csv":
+                quotes += data[pos:end].count(b'"')
+            pos = end
+            if not quotes % 2:
+                break
+        return pos
+
+    def _build_offsets(self, pos):
+        data, size = self._data, len(self._data)
+        offsets = array("q")
+        while pos < size:
+            end = self._next_record(pos)
+            # Skips blank lines
+            if data[pos:end].strip():
+                offsets.append(pos)
+            pos = end
+        offsets.append(size)
+        return offsets
+
+    def get_values(self, row):
+        """
+            Parses a row, returns a dict of its converted column values
+        """
+        raw = self._data[self.offsets[row] : self.offsets[row + 1]]
+        text = raw.decode(self.encoding).rstrip("\r\n")
+        if self.file_format == "csv":
+            return self._convert_record(next(csv.reader(io.StringIO(text)), []))
+        return self._convert_record(json.loads(text))
+
+    def _convert_record(self, record):
+        if self.file_format == "csv":
+            record = {name: value or None for name, value in zip(self.header, record)}
+        return {
+            col_name: _convert(col_def.col_type, record.get(col_name))
+            for col_name, col_def in self.model_cls.properties.items()
+        }
+
+    def iter_values(self):
+        """
+            Parses all the rows in order, reading the file
+            sequentially is faster than parsing each row
+        """
+        if not self.size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[0])
+            text = io.TextIOWrapper(f, encoding=self.encoding, newline="")
+            if self.file_format == "csv":
+                # Same blank lines as the offsets
+                records = (
+                    record
+                    for record in csv.reader(text)
+                    if record and (len(record) > 1 or record[0].strip())
+                )
+            else:
+                records = (json.loads(line) for line in text if line.strip())
+            for record in islice(records, self.size):
+                yield self._convert_record(record)
+
+    def get_item(self, row):
+        """
+            Parses a row into an instance of the model
+        """
+        return self.model_cls(**self.get_values(row))
+
+    # -----------------------------------------
+    #             SORTED INDEXES
+    # -----------------------------------------
+
+    def is_indexed(self, col_name):
+        col_def = self.model_cls.properties.get(col_name)
+        return col_def is not None and (col_def.primary_key or col_def.index)
+
+    def get_sorted(self, col_name):
+        """
+            Returns the rows ordered by the column,
+            rows with equal values keep their order
+        """
+        with self._lock:
+            rows = self._sorted.get(col_name)
+            if rows is None:
+                suffix = ".{0}.idx".format(col_name)
+                rows = self._load_sidecar(suffix)
+                if rows is None or len(rows) != self.size:
+                    keys = [
+                        _order_key(values[col_name]) for values in self.iter_values()
+                    ]
+                    rows = array("q", sorted(range(self.size), key=keys.__getitem__))
+                    self._save_sidecar(suffix, rows)
+                self._sorted[col_name] = rows
+            return rows
+
+    def get_key_func(self, col_name):
+        """
+            Returns the order key of a row's column value,
+            parsing each row once
+        """
+        keys = dict()
+
+        def key(row):
+            if row not in keys:
+                keys[row] = _order_key(self.get_values(row)[col_name])
+            return keys[row]
+
+        return key
+
+    @staticmethod
+    def _bisect(rows, key, value_key, right=False):
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = key(rows[middle])
+            if middle_key < value_key or (right and middle_key == value_key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_range(self, col_name, operation, value):
+        """
+            Returns the sorted index of the column and the range
+            of its rows that match the operation, or None if the
+            index can't answer it. Parses log(rows) rows
+        """
+        col_type = self.model_cls.properties[col_name].col_type
+        # Filters compare datetime columns with dates
+        if issubclass(col_type, datetime):
+            return None
+        rows = self.get_sorted(col_name)
+        try:
+            if col_type is date:
+                value = datetime.strptime(value, "%Y-%m-%d").date()
+            else:
+                value = col_type(value)
+        except Exception:
+            # No row would match
+            return rows, 0, 0
+        key = self.get_key_func(col_name)
+        value_key = _order_key(value)
+        if operation == "equal":
+            start = self._bisect(rows, key, value_key)
+            end = self._bisect(rows, key, value_key, right=True)
+        elif operation == "greater":
+            start = self._bisect(rows, key, value_key, right=True)
+            end = len(rows)
+        elif operation == "smaller":
+            # Rows without value are first, and never match
+            start = self._bisect(rows, key, (True,))
+            end = self._bisect(rows, key, value_key)
+        else:
+            return None
+        return rows, start, end
+
+    def get_ordered_page(self, col_name, reverse, start, stop):
+        """
+            Returns the rows of a page ordered by the column, like
+            sorted(rows, reverse=reverse)[start:stop]
+        """
+        rows = self.get_sorted(col_name)
+        size = len(rows)
+        stop = size if stop is None else min(stop, size)
+        if not reverse:
+            return rows[start:stop].tolist()
+        # Descending pages walk the runs of equal values backwards,
+        # keeping the order of the rows of each run
+        key = self.get_key_func(col_name)
+        page = list()
+        position = start
+        while position < stop:
+            value_key = key(rows[size - 1 - position])
+            run_start = self._bisect(rows, key, value_key)
+            run_end = self._bisect(rows, key, value_key, right=True)
+            first = size - run_end
+            page.extend(
+                rows[
+                    run_start
+                    + position
+                    - first : run_start
+                    + min(stop, size - run_start)
+                    - first
+                ]
+            )
+            position = size - run_start
+        return page
+
+
+def _order_key(value):
+    """ Orders None values first, like GenericSession """
+    return value is not None, value
+
+
+class FileGenericSession(GenericSession):
+    """
+        A read only GenericSession for large CSV or JSONL files, that
+        are memory mapped instead of loaded on the store::
+
+            session = FileGenericSession()
+            session.add_file(PersonModel, "/data/persons.csv")
+
+        CSV files have a header with the column names, JSONL files an
+        object per line. Values are converted to the column types,
+        empty CSV values are None.
+
+        The offsets of the rows are saved on a sidecar file on first
+        use, and the rows sorted by the primary key and by index=True
+        columns when they are first filtered or ordered by. Ordering
+        by those columns, equal, greater and smaller filters on them and
+        get only parse the requested rows, other filters and orders
+        parse every row. Sidecar files are rebuilt when the file changes,
+        set index_dir to keep them on a writable location.
+
+        Models without a file are kept on the store, like GenericSession.
+    """
+
+    index_dir = None
+    """ Directory for the sidecar index files, defaults to the files directory """
+
+    def __init__(self, index_dir=None):
+        super(FileGenericSession, self).__init__()
+        self.files = dict()
+        if index_dir:
+            self.index_dir = index_dir
+
+    def add_file(self, model_cls, path, file_format=None, encoding="utf-8"):
+        """
+            Serves the items of model_cls from a file
+
+            :param file_format: "csv" or "jsonl", defaults to the file extension
+        """
+        data_file = DataFile(
+            model_cls, path, file_format, encoding, index_dir=self.index_dir
+        )
+        with self.lock.write():
+            self.files[model_cls._name] = data_file
+
+    def _open(self, data_file):
+        if data_file.changed():
+            # Rows are read while holding the lock for reading
+            with self.lock.write():
+                if data_file.changed():
+                    data_file.open()
+
+    _file_operations = {"_equal": "equal", "_greater": "greater", "_smaller": "smaller"}
+
+    def _get_file_range(self, data_file, filter_cmd):
+        func, col_name, value = filter_cmd
+        name = getattr(func, "__name__", "")
+        operation = self._file_operations.get(name)
+        # Overridden filters may match differently
+        if (
+            operation is None
+            or getattr(func, "__func__", None) is not getattr(GenericSession, name)
+            or not data_file.is_indexed(col_name)
+        ):
+            return None
+        return data_file.get_range(col_name, operation, value)
+
+    def get(self, pk):
+        data_file = self.files.get(self.query_class)
+        if data_file is None:
+            return super(FileGenericSession, self).get(pk)
+        self._open(data_file)
+        with self.lock.read():
+            pk_name = data_file.model_cls.pk
+            index_range = data_file.get_range(pk_name, "equal", pk)
+            if index_range is None:
+                pk = _convert(data_file.model_cls.properties[pk_name].col_type, pk)
+                for row in range(data_file.size):
+                    item = data_file.get_item(row)
+                    if getattr(item, pk_name) == pk:
+                        return item
+                return None
+            rows, start, end = index_range
+            if start < end:
+                # Equal keys keep the file order, the first row is the first
+                return data_file.get_item(rows[start])
+            return None
+
+    def all(self):
+        """
+            SQLA like 'all' method, parses the rows the query needs
+        """
+        data_file = self.files.get(self.query_class)
+        if data_file is None:
+            return super(FileGenericSession, self).all()
+        self._open(data_file)
+        with self.lock.read():
+            # The rows parsed by this query
+            items = dict()
+
+            def get_item(row):
+                if row not in items:
+                    items[row] = data_file.get_item(row)
+                return items[row]
+
+            rows = None
+            filters_cmd = list(self._filters_cmd)
+            if self.use_indexes and filters_cmd:
+                # Scan only the rows of the narrowest indexed filter
+                best = None
+                for filter_cmd in filters_cmd:
+                    index_range = self._get_file_range(data_file, filter_cmd)
+                    if index_range is None:
+                        continue
+                    if best is None or (
+                        index_range[2] - index_range[1] < best[3] - best[2]
+                    ):
+                        best = (filter_cmd,) + index_range
+                if best is not None:
+                    filter_cmd, sorted_rows, start, end = best
+                    filters_cmd.remove(filter_cmd)
+                    rows = sorted(sorted_rows[start:end])
+            if filters_cmd:
+                if rows is None:
+                    candidates = enumerate(
+                        data_file.model_cls(**values)
+                        for values in data_file.iter_values()
+                    )
+                else:
+                    candidates = ((row, data_file.get_item(row)) for row in rows)
+                filtered_rows = list()
+                for row, item in candidates:
+                    if all(
+                        func(item, col_name, value)
+                        for func, col_name, value in filters_cmd
+                    ):
+                        items[row] = item
+                        filtered_rows.append(row)
+                rows = filtered_rows
+            total_length = data_file.size if rows is None else len(rows)
+            page_end = self._offset + self._limit if self._limit != 0 else None
+            if self._order_by_cmd:
+                col_name, direction = self._order_by_cmd.split()
+                reverse_flag = direction == "desc"
+                if rows is None:
+                    rows = range(data_file.size)
+                if type(self)._order_by is not GenericSession._order_by:
+                    ordered = self._order_by(
+                        [get_item(row) for row in rows], self._order_by_cmd
+                    )
+                    if self._limit != 0:
+                        ordered = ordered[self._offset : page_end]
+                    return total_length, ordered
+                if (
+                    isinstance(rows, range)
+                    and self.use_indexes
+                    and data_file.is_indexed(col_name)
+                ):
+                    start = self._offset if self._limit != 0 else 0
+                    page = data_file.get_ordered_page(
+                        col_name, reverse_flag, start, page_end
+                    )
+                    return total_length, [get_item(row) for row in page]
+                if isinstance(rows, range):
+                    key = [
+                        _order_key(values[col_name])
+                        for values in data_file.iter_values()
+                    ].__getitem__
+                else:
+
+                    def key(row):
+                        return _order_key(getattr(get_item(row), col_name))
+
+                if page_end is not None and page_end < len(rows):
+                    # Same as sorted(...)[:page_end], equal keys keep their order
+                    select = heapq.nlargest if reverse_flag else heapq.nsmallest
+                    rows = select(page_end, rows, key=key)
+                else:
+                    rows = sorted(rows, key=key, reverse=reverse_flag)
+            elif rows is None:
+                rows = range(data_file.size)
+            if self._limit != 0:
+                rows = rows[self._offset : page_end]
+            return total_length, [get_item(row) for row in rows]
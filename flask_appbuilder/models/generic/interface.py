@@ -80,4 +80,4 @@ class GenericInterface(BaseInterface):
 
     def get(self, id, filters=None):
         # TODO: need to implement filters!
-        return self.session.get(id)
+        return self.session.query(self.obj).get(id)
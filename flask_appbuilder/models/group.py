@@ -1,63 +1,393 @@
 from __future__ import unicode_literals
 
+from array import array
 import calendar
 import datetime
 from functools import reduce
 from itertools import groupby
 import logging
+import math
+from operator import attrgetter, methodcaller
 
 from flask_appbuilder._compat import as_unicode
 from flask_babel import lazy_gettext as _
 
 from .. import const as c
 
+try:
+    import numpy
+
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
 log = logging.getLogger(__name__)
 
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+class Reducer(object):
+    """
+        Mergeable aggregation protocol, used by the aggregation functions
+        to compute all series of a group in a single pass::
+
+            state = reducer.init()
+            for value in values:
+                state = reducer.step(state, value)
+            value = reducer.finalize(reducer.merge(state, other_state))
 
-def aggregate(label=""):
+        Partial states computed on chunks, threads or processes
+        are combined with merge.
+    """
+
+    steps_items = False
+    """ If True step receives the items, instead of their column values """
+
+    def init(self):
+        """
+            Returns the initial state
+        """
+        raise NotImplementedError
+
+    def step(self, state, value):
+        """
+            Returns the state after adding value
+        """
+        raise NotImplementedError
+
+    def merge(self, state, other):
+        """
+            Returns the combination of two partial states
+        """
+        raise NotImplementedError
+
+    def finalize(self, state):
+        """
+            Returns the aggregated value for the state
+        """
+        return state
+
+
+class CountReducer(Reducer):
+    steps_items = True
+
+    def init(self):
+        return 0
+
+    def step(self, state, value):
+        return state + 1
+
+    def merge(self, state, other):
+        return state + other
+
+
+class SumReducer(Reducer):
+    def init(self):
+        return 0
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return state + value
+
+    def merge(self, state, other):
+        return state + other
+
+
+class AvgReducer(Reducer):
+    def init(self):
+        return 0, 0
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return state[0] + value, state[1] + 1
+
+    def merge(self, state, other):
+        return state[0] + other[0], state[1] + other[1]
+
+    def finalize(self, state):
+        try:
+            return state[0] / state[1]
+        except Exception:
+            log.warning(c.LOGMSG_WAR_DBI_AVG_ZERODIV)
+            return 0.0
+
+
+class MinReducer(Reducer):
+    def init(self):
+        return None
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        if state is None or value < state:
+            return value
+        return state
+
+    def merge(self, state, other):
+        if other is None:
+            return state
+        return self.step(state, other)
+
+
+class MaxReducer(MinReducer):
+    def step(self, state, value):
+        if value is None:
+            return state
+        if state is None or value > state:
+            return value
+        return state
+
+
+class StddevReducer(Reducer):
+    """
+        Sample standard deviation, using Welford's online algorithm
+        and Chan's formula to merge partial states
+    """
+
+    def init(self):
+        return 0, 0.0, 0.0
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        count, mean, m2 = state
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        return count, mean, m2 + delta * (value - mean)
+
+    def merge(self, state, other):
+        count = state[0] + other[0]
+        if not count:
+            return state
+        delta = other[1] - state[1]
+        mean = state[1] + delta * other[0] / count
+        m2 = state[2] + other[2] + delta * delta * state[0] * other[0] / count
+        return count, mean, m2
+
+    def finalize(self, state):
+        if state[0] < 2:
+            return 0.0
+        return math.sqrt(state[2] / (state[0] - 1))
+
+
+class PercentileReducer(Reducer):
+    """
+        Approximate percentile. Values are kept as weighted centroids,
+        compressed to about compression centroids of equal weight once
+        there are twice as many. Results are exact until the first
+        compression, and interpolated linearly between centroids.
+
+        :param percentile: The percentile to compute, from 0 to 100
+        :param compression: The number of centroids to keep
+    """
+
+    def __init__(self, percentile, compression=100):
+        if not 0 <= percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.compression = compression
+
+    def init(self):
+        return []
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        state.append((value, 1))
+        if len(state) >= 2 * self.compression:
+            state[:] = self._compress(state)
+        return state
+
+    def merge(self, state, other):
+        return self._compress(state + other)
+
+    def _compress(self, centroids):
+        centroids = sorted(centroids)
+        if len(centroids) <= self.compression:
+            return centroids
+        bin_weight = sum(weight for _, weight in centroids) / self.compression
+        result = []
+        total = weight_sum = 0
+        for value, weight in centroids:
+            if weight_sum and weight_sum + weight > bin_weight:
+                result.append((total / weight_sum, weight_sum))
+                total = weight_sum = 0
+            total += value * weight
+            weight_sum += weight
+        result.append((total / weight_sum, weight_sum))
+        return result
+
+    def finalize(self, state):
+        if not state:
+            return None
+        centroids = sorted(state)
+        rank = (sum(weight for _, weight in centroids) - 1) * self.percentile / 100
+        # Each centroid is centered on the mean rank of its values
+        previous_value = previous_rank = None
+        seen = 0
+        for value, weight in centroids:
+            center = seen + (weight - 1) / 2
+            if center >= rank:
+                if previous_rank is None or center == previous_rank:
+                    return value
+                fraction = (rank - previous_rank) / (center - previous_rank)
+                return previous_value + (value - previous_value) * fraction
+            previous_value, previous_rank = value, center
+            seen += weight
+        return previous_value
+
+
+class _FunctionReducer(Reducer):
+    """
+        Mergeable wrapper for aggregation functions without a reducer,
+        collects the group items and calls the function on finalize
+    """
+
+    steps_items = True
+
+    def __init__(self, func, col):
+        self.func = func
+        self.col = col
+
+    def init(self):
+        return []
+
+    def step(self, state, value):
+        state.append(value)
+        return state
+
+    def merge(self, state, other):
+        return state + other
+
+    def finalize(self, state):
+        return self.func(state, self.col)
+
+
+def get_reducer(aggregate_func, col=""):
+    """
+        Returns the Reducer for an aggregation function
+    """
+    reducer = getattr(aggregate_func, "_reducer", None)
+    if reducer is None:
+        return _FunctionReducer(aggregate_func, col)
+    return reducer
+
+
+def reduce_items(aggregate_func, items, col):
+    """
+        Aggregates items in a single pass with the function's reducer,
+        items can be any iterable
+    """
+    reducer = aggregate_func._reducer
+    state = reducer.init()
+    if reducer.steps_items:
+        for item in items:
+            state = reducer.step(state, item)
+    else:
+        for item in items:
+            state = reducer.step(state, getattr(item, col))
+    return reducer.finalize(state)
+
+
+def aggregate(label="", reducer=None):
     """
         Use this decorator to set a label for your aggregation functions on charts.
 
         :param label:
             The label to complement with the column
+        :param reducer:
+            Optional Reducer, so that the function is computed in
+            the same pass as the other series
     """
 
     def wrap(f):
         f._label = label
+        if reducer is not None:
+            f._reducer = reducer
         return f
 
     return wrap
 
 
-@aggregate(_("Count of"))
+@aggregate(_("Count of"), reducer=CountReducer())
 def aggregate_count(items, col):
     """
         Function to use on Group by Charts.
         accepts a list and returns the count of the list's items
     """
-    return len(list(items))
+    return reduce_items(aggregate_count, items, col)
 
 
-@aggregate(_("Sum of"))
+@aggregate(_("Sum of"), reducer=SumReducer())
 def aggregate_sum(items, col):
     """
         Function to use on Group by Charts.
         accepts a list and returns the sum of the list's items
     """
-    return sum(getattr(item, col) for item in items)
+    return reduce_items(aggregate_sum, items, col)
 
 
-@aggregate(_("Avg. of"))
+@aggregate(_("Avg. of"), reducer=AvgReducer())
 def aggregate_avg(items, col):
     """
         Function to use on Group by Charts.
         accepts a list and returns the average of the list's items
     """
-    try:
-        return aggregate_sum(items, col) / aggregate_count(items, col)
-    except Exception:
-        log.warning(c.LOGMSG_WAR_DBI_AVG_ZERODIV)
-        return 0.0
+    return reduce_items(aggregate_avg, items, col)
+
+
+@aggregate(_("Min. of"), reducer=MinReducer())
+def aggregate_min(items, col):
+    """
+        Function to use on Group by Charts.
+        accepts a list and returns the minimum of the list's items
+    """
+    return reduce_items(aggregate_min, items, col)
+
+
+@aggregate(_("Max. of"), reducer=MaxReducer())
+def aggregate_max(items, col):
+    """
+        Function to use on Group by Charts.
+        accepts a list and returns the maximum of the list's items
+    """
+    return reduce_items(aggregate_max, items, col)
+
+
+@aggregate(_("Std. dev. of"), reducer=StddevReducer())
+def aggregate_stddev(items, col):
+    """
+        Function to use on Group by Charts.
+        accepts a list and returns the sample standard deviation
+        of the list's items
+    """
+    return reduce_items(aggregate_stddev, items, col)
+
+
+def aggregate_percentile(percentile, compression=100):
+    """
+        Returns an approximate percentile function to use on Group by Charts::
+
+            series = [(aggregate_percentile(90), "response_time")]
+
+        :param percentile:
+            The percentile to compute, from 0 to 100
+        :param compression:
+            The number of centroids to keep, more are more accurate
+    """
+
+    @aggregate(
+        _("P%(percentile)s of", percentile=percentile),
+        reducer=PercentileReducer(percentile, compression),
+    )
+    def aggregate_percentile_func(items, col):
+        return reduce_items(aggregate_percentile_func, items, col)
+
+    aggregate_percentile_func.__name__ = "aggregate_p{0}".format(percentile)
+    return aggregate_percentile_func
 
 
 class BaseGroupBy(object):
@@ -83,12 +413,38 @@ class BaseGroupBy(object):
         self.aggregate_func = aggregate_func
         self.aggregate_col = aggregate_col
 
-    def apply(self, data):
+    def apply(self, data, sort=True):
         """
             Override this to implement you own new filters
+
+            :param data: An iterable of model items
+            :param sort: If False data is aggregated as it is iterated,
+                keeping only a state per group, for streamed items
         """
         pass
 
+    def _group(self, data, sort=True):
+        """
+            Returns the (group, aggregated value) pairs sorted by group
+        """
+        if sort:
+            data = sorted(data, key=self.get_group_col)
+            return [
+                (grouped, self.aggregate_func(items, self.aggregate_col))
+                for (grouped, items) in groupby(data, self.get_group_col)
+            ]
+        reducer = get_reducer(self.aggregate_func, self.aggregate_col)
+        states = dict()
+        for item in data:
+            grouped = self.get_group_col(item)
+            state = states[grouped] if grouped in states else reducer.init()
+            if not reducer.steps_items:
+                item = getattr(item, self.aggregate_col)
+            states[grouped] = reducer.step(state, item)
+        return [
+            (grouped, reducer.finalize(states[grouped])) for grouped in sorted(states)
+        ]
+
     def get_group_col(self, item):
         return getattr(item, self.column_name)
 
@@ -130,26 +486,18 @@ class GroupByCol(BaseGroupBy):
             )
         return json_data
 
-    def apply(self, data):
-        data = sorted(data, key=self.get_group_col)
+    def apply(self, data, sort=True):
         return [
-            [
-                self.get_format_group_col(grouped),
-                self.aggregate_func(items, self.aggregate_col),
-            ]
-            for (grouped, items) in groupby(data, self.get_group_col)
+            [self.get_format_group_col(grouped), aggregate_value]
+            for (grouped, aggregate_value) in self._group(data, sort)
         ]
 
 
 class GroupByDateYear(BaseGroupBy):
-    def apply(self, data):
-        data = sorted(data, key=self.get_group_col)
+    def apply(self, data, sort=True):
         return [
-            [
-                self.get_format_group_col(grouped),
-                self.aggregate_func(items, self.aggregate_col),
-            ]
-            for (grouped, items) in groupby(data, self.get_group_col)
+            [self.get_format_group_col(grouped), aggregate_value]
+            for (grouped, aggregate_value) in self._group(data, sort)
         ]
 
     def get_group_col(self, item):
@@ -159,14 +507,10 @@ class GroupByDateYear(BaseGroupBy):
 
 
 class GroupByDateMonth(BaseGroupBy):
-    def apply(self, data):
-        data = sorted(data, key=self.get_group_col)
+    def apply(self, data, sort=True):
         return [
-            [
-                self.get_format_group_col(grouped),
-                self.aggregate_func(items, self.aggregate_col),
-            ]
-            for (grouped, items) in groupby(data, self.get_group_col)
+            [self.get_format_group_col(grouped), aggregate_value]
+            for (grouped, aggregate_value) in self._group(data, sort)
             if grouped
         ]
 
@@ -245,6 +589,14 @@ class BaseProcessData(object):
     def apply(self, data):
         pass
 
+    def format_rows(self, rows):
+        """
+            Formats the group column of rows that were already grouped
+            and aggregated by the datamodel, returns the same structure
+            as apply
+        """
+        return [[self.format_columns(row[0])] + list(row[1:]) for row in rows]
+
     def to_dict(self, data):
         ret = []
         for item in data:
@@ -316,38 +668,428 @@ class BaseProcessData(object):
 
 
 class DirectProcessData(BaseProcessData):
-    def apply(self, data, sort=True):
+    def get_rows(self, data, sort=True):
+        """
+            Returns the group and series values of each item, not formatted
+        """
         group_by = self.group_bys_cols[0]
         if sort:
             data = sorted(data, key=self.attrgetter(group_by))
-        result = []
-        for item in data:
-            result_item = [self.format_columns(self.attrgetter(group_by)(item))]
-            for aggr_by_col in self.aggr_by_cols:
-                result_item.append(self.attrgetter(aggr_by_col)(item))
-            result.append(result_item)
-        return result
+        getters = [self.attrgetter(col) for col in [group_by] + self.aggr_by_cols]
+        return [[getter(item) for getter in getters] for item in data]
+
+    def apply(self, data, sort=True):
+        return self.format_rows(self.get_rows(data, sort=sort))
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _to_seconds(value):
+    """
+        Returns a number for a date, datetime or number value
+    """
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            return value.timestamp()
+        return (value - _EPOCH).total_seconds()
+    if isinstance(value, datetime.date):
+        return (value - _EPOCH.date()).days * 86400
+    return value
+
+
+def _from_seconds(seconds, like):
+    """
+        Returns seconds with the type of the value like
+    """
+    if isinstance(like, datetime.datetime):
+        return _EPOCH + datetime.timedelta(seconds=seconds)
+    if isinstance(like, datetime.date):
+        return _EPOCH.date() + datetime.timedelta(seconds=seconds)
+    return seconds
+
+
+def _average(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+
+def get_bucket_size(start, end, max_points):
+    """
+        Returns the whole seconds width that splits the range
+        from start to end in at most max_points buckets
+
+        :param start: The first value, in seconds
+        :param end: The last value, in seconds
+    """
+    return int((end - start) // max(max_points, 1)) + 1
+
+
+def time_buckets(rows, bucket_size=None, max_points=1000):
+    """
+        Averages rows on fixed width buckets, rows must be
+        ordered by their first value, a date, datetime or number.
+        Rows are consumed and yielded in streaming.
+
+        :param rows: An iterable of [x, y1, y2, ...]
+        :param bucket_size: The buckets width, in seconds or a timedelta.
+            If None rows must be a list, and the width splits
+            their range in max_points buckets
+        :return: A generator of [bucket start, avg y1, avg y2, ...]
+    """
+    if isinstance(bucket_size, datetime.timedelta):
+        bucket_size = bucket_size.total_seconds()
+    if not bucket_size:
+        if not rows:
+            return
+        start, end = _to_seconds(rows[0][0]), _to_seconds(rows[-1][0])
+        bucket_size = get_bucket_size(start, end, max_points)
+    current = None
+    bucket = []
+    for row in rows:
+        start = _to_seconds(row[0]) // bucket_size * bucket_size
+        if start != current and bucket:
+            yield [_from_seconds(current, bucket[0][0])] + [
+                _average(values) for values in list(zip(*bucket))[1:]
+            ]
+            bucket = []
+        current = start
+        bucket.append(row)
+    if bucket:
+        yield [_from_seconds(current, bucket[0][0])] + [
+            _average(values) for values in list(zip(*bucket))[1:]
+        ]
+
+
+def _triangle_area(a, b, c):
+    """
+        Sum of the triangle areas of all series of point b,
+        for the previous point a and the next bucket average c
+    """
+    ax, bx, cx = _to_seconds(a[0]), _to_seconds(b[0]), c[0]
+    area = 0
+    for ay, by, cy in zip(a[1:], b[1:], c[1:]):
+        if ay is None or by is None or cy is None:
+            continue
+        area += abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+    return area
+
+
+def _select_point(bucket, previous, next_point):
+    return max(bucket, key=lambda row: _triangle_area(previous, row, next_point))
+
+
+def _bucket_average(bucket):
+    return [_average([_to_seconds(row[0]) for row in bucket])] + [
+        _average(values) for values in list(zip(*bucket))[1:]
+    ]
+
+
+def lttb(rows, max_points, count=None):
+    """
+        Largest Triangle Three Buckets downsampling, keeps the visual shape
+        of the series with at most max_points rows. Rows must be ordered by
+        their first value, a date, datetime or number. With multiple series
+        each bucket keeps the row with the largest sum of areas.
+
+        Only two buckets are kept in memory, so rows can be streamed
+        when their count is given.
+
+        :param rows: An iterable of [x, y1, y2, ...]
+        :param max_points: The maximum number of rows to return, at least 3
+        :param count: The number of rows, required when rows is not a list
+        :return: A generator of the selected rows
+    """
+    if count is None:
+        count = len(rows)
+    rows = iter(rows)
+    if count <= max_points or max_points < 3:
+        yield from rows
+        return
+    every = (count - 2) / (max_points - 2)
+    previous = next(rows, None)
+    if previous is None:
+        return
+    yield previous
+    held = pending = None
+    current = []
+    current_bucket = 0
+    for index, row in enumerate(rows, 1):
+        # Hold a row back, the last one is always kept
+        if held is not None:
+            bucket = min(math.ceil((index - 1) / every) - 1, max_points - 3)
+            if bucket != current_bucket and current:
+                if pending:
+                    previous = _select_point(
+                        pending, previous, _bucket_average(current)
+                    )
+                    yield previous
+                pending, current, current_bucket = current, [], bucket
+            current.append(held)
+        held = row
+    if held is None:
+        return
+    last = [_to_seconds(held[0])] + list(held[1:])
+    if pending:
+        next_point = _bucket_average(current) if current else last
+        previous = _select_point(pending, previous, next_point)
+        yield previous
+    if current:
+        yield _select_point(current, previous, last)
+    yield held
 
 
 class GroupByProcessData(BaseProcessData):
     """
         Groups by data by chosen columns (property group_bys_cols).
+        All series of a group are computed on a single pass
+        with the aggregation functions reducers.
 
         :data: A list of objects
         :sort: boolean, if true python will sort the data
         :return: A List of lists with group column and aggregation
     """
 
+    def get_reducers(self):
+        return [get_reducer(aggr[0], aggr[1]) for aggr in self.aggr_by_cols]
+
+    def _get_steps(self, reducers):
+        return [
+            (i, reducer.step, None if reducer.steps_items else attrgetter(aggr[1]))
+            for i, (reducer, aggr) in enumerate(zip(reducers, self.aggr_by_cols))
+        ]
+
+    def reduce(self, items, reducers):
+        """
+            Steps all reducers over items in a single pass
+
+            :return: A list with the partial state for each serie
+        """
+        states = [reducer.init() for reducer in reducers]
+        steps = self._get_steps(reducers)
+        for item in items:
+            for i, step, get in steps:
+                states[i] = step(states[i], item if get is None else get(item))
+        return states
+
     def apply(self, data, sort=True):
         if sort:
             data = sorted(data, key=self.attrgetter(*self.group_bys_cols))
+        reducers = self.get_reducers()
         result = []
         for (grouped, items) in groupby(
             data, key=self.attrgetter(*self.group_bys_cols)
         ):
-            items = list(items)
             result_item = [self.format_columns(grouped)]
-            for aggr_by_col in self.aggr_by_cols:
-                result_item.append(aggr_by_col[0](items, aggr_by_col[1]))
+            for reducer, state in zip(reducers, self.reduce(items, reducers)):
+                result_item.append(reducer.finalize(state))
             result.append(result_item)
         return result
+
+    def apply_partial(self, data):
+        """
+            Groups and reduces data without finalizing the series,
+            so that results of data chunks can be merged.
+            Group values must be hashable.
+
+            :return: A dict with the partial states for each group
+        """
+        reducers = self.get_reducers()
+        get_group = self.attrgetter(*self.group_bys_cols)
+        steps = self._get_steps(reducers)
+        partial = {}
+        for item in data:
+            group = get_group(item)
+            states = partial.get(group)
+            if states is None:
+                states = partial[group] = [reducer.init() for reducer in reducers]
+            for i, step, get in steps:
+                states[i] = step(states[i], item if get is None else get(item))
+        return partial
+
+    def merge_partials(self, *partials):
+        """
+            Merges the results of apply_partial
+        """
+        reducers = self.get_reducers()
+        result = {}
+        for partial in partials:
+            for group, states in partial.items():
+                if group not in result:
+                    result[group] = list(states)
+                    continue
+                result[group] = [
+                    reducer.merge(state, other)
+                    for reducer, state, other in zip(reducers, result[group], states)
+                ]
+        return result
+
+    def finalize_partial(self, partial, sort=True):
+        """
+            Returns the same result as apply for a
+            result of apply_partial or merge_partials
+        """
+        reducers = self.get_reducers()
+        groups = sorted(partial) if sort else list(partial)
+        return [
+            [self.format_columns(group)]
+            + [
+                reducer.finalize(state)
+                for reducer, state in zip(reducers, partial[group])
+            ]
+            for group in groups
+        ]
+
+
+def _get_attr_getter(item, attr):
+    """
+        Returns a fast getter with the same resolution
+        as BaseProcessData.resolve_attr has for item
+    """
+    if hasattr(item, attr) and hasattr(getattr(item, attr), "__call__"):
+        return methodcaller(attr)
+    # attrgetter also resolves inner obj attrs
+    return attrgetter(attr)
+
+
+def _get_typecode(values):
+    """
+        Returns the array typecode for values,
+        or None if they are not all plain numbers
+    """
+    types = set(map(type, values))
+    if types <= {int, bool}:
+        if _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+            return "q"
+        return None
+    if types <= {int, bool, float}:
+        return "d"
+    return None
+
+
+class ColumnarGroupByProcessData(GroupByProcessData):
+    """
+        Same as GroupByProcessData, but each group by and series attribute
+        is extracted once per item into typed columns. Items get an integer
+        group code, the codes are sorted and split, and the builtin
+        aggregations are reduced vectorized with NumPy when it's installed,
+        or accumulated on array module columns otherwise.
+
+        Custom aggregation functions and non numeric columns are reduced
+        by calling the aggregation function with each group's items.
+        Enable it on your chart views with::
+
+            class MyChartView(GroupByChartView):
+                ProcessClass = ColumnarGroupByProcessData
+    """
+
+    use_numpy = _has_numpy
+    """ Use NumPy for the reductions, defaults to True if it's installed """
+
+    reducers = {
+        aggregate_count: "count",
+        aggregate_sum: "sum",
+        aggregate_avg: "mean",
+        aggregate_min: "min",
+        aggregate_max: "max",
+    }
+    """ Maps aggregation functions to their vectorized reductions """
+
+    def _get_group_getter(self, item):
+        getters = [_get_attr_getter(item, col) for col in self.group_bys_cols]
+        if len(getters) == 1:
+            return getters[0]
+        return lambda obj: tuple(getter(obj) for getter in getters)
+
+    def apply(self, data, sort=True):
+        data = data if isinstance(data, list) else list(data)
+        if not data:
+            return []
+        keys = list(map(self._get_group_getter(data[0]), data))
+        codes_by_key = {}
+        try:
+            codes = [codes_by_key.setdefault(key, len(codes_by_key)) for key in keys]
+        except TypeError:
+            # Unhashable group values
+            return super(ColumnarGroupByProcessData, self).apply(data, sort=sort)
+        groups = list(codes_by_key)
+        reduce_column = self._reduce_numpy if self.use_numpy else self._reduce_array
+        context = {}
+        columns = []
+        for aggr_func, aggr_col in self.aggr_by_cols:
+            reducer = self.reducers.get(aggr_func)
+            values = typecode = None
+            if reducer and reducer != "count":
+                values = list(map(_get_attr_getter(data[0], aggr_col), data))
+                typecode = _get_typecode(values)
+            if reducer and (reducer == "count" or typecode):
+                columns.append(
+                    reduce_column(
+                        reducer, codes, len(groups), values, typecode, context
+                    )
+                )
+                continue
+            if "members" not in context:
+                context["members"] = [[] for _ in groups]
+                for code, item in zip(codes, data):
+                    context["members"][code].append(item)
+            columns.append([aggr_func(items, aggr_col) for items in context["members"]])
+        ranks = range(len(groups))
+        if sort:
+            ranks = sorted(ranks, key=groups.__getitem__)
+        return [
+            [self.format_columns(groups[code])] + [column[code] for column in columns]
+            for code in ranks
+        ]
+
+    @staticmethod
+    def _reduce_array(reducer, codes, size, values, typecode, context):
+        if "counts" not in context:
+            counts = array("q", bytes(8 * size))
+            for code in codes:
+                counts[code] += 1
+            context["counts"] = counts
+        counts = context["counts"]
+        if reducer == "count":
+            return counts.tolist()
+        column = array(typecode, values)
+        if reducer in ("min", "max"):
+            func = min if reducer == "min" else max
+            result = [None] * size
+            for code, value in zip(codes, column):
+                current = result[code]
+                result[code] = value if current is None else func(current, value)
+            return result
+        sums = [0] * size
+        for code, value in zip(codes, column):
+            sums[code] += value
+        if reducer == "mean":
+            return [total / count for total, count in zip(sums, counts)]
+        return sums
+
+    @classmethod
+    def _reduce_numpy(cls, reducer, codes, size, values, typecode, context):
+        if "order" not in context:
+            codes_array = numpy.fromiter(codes, dtype=numpy.intp, count=len(codes))
+            counts = numpy.bincount(codes_array, minlength=size)
+            # sort by group code and split on each group's first position
+            context["order"] = numpy.argsort(codes_array, kind="stable")
+            context["counts"] = counts
+            context["starts"] = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+        counts = context["counts"]
+        if reducer == "count":
+            return counts.tolist()
+        dtype = numpy.int64 if typecode == "q" else numpy.float64
+        column = numpy.fromiter(values, dtype=dtype, count=len(values))
+        if reducer in ("sum", "mean") and typecode == "q":
+            # Sums that may not fit an int64 are accumulated as python ints
+            bound = max(-int(column.min()), int(column.max()))
+            if bound * int(counts.max()) > _INT64_MAX:
+                return cls._reduce_array(reducer, codes, size, values, typecode, {})
+        column = column[context["order"]]
+        if reducer == "mean":
+            return (numpy.add.reduceat(column, context["starts"]) / counts).tolist()
+        ufunc = {"sum": numpy.add, "min": numpy.minimum, "max": numpy.maximum}[reducer]
+        return ufunc.reduceat(column, context["starts"]).tolist()
@@ -1,6 +1,7 @@
 import logging
 import sys
 
+from mongoengine.base import BaseList
 from mongoengine.fields import (
     BooleanField,
     DateTimeField,
@@ -16,15 +17,32 @@ from mongoengine.fields import (
 
 from . import filters
 from ..base import BaseInterface
+from ..group import (
+    aggregate_avg,
+    aggregate_count,
+    aggregate_max,
+    aggregate_min,
+    aggregate_sum,
+)
 from ..._compat import as_unicode
 from ...const import (
     LOGMSG_ERR_DBI_ADD_GENERIC,
     LOGMSG_ERR_DBI_DEL_GENERIC,
     LOGMSG_ERR_DBI_EDIT_GENERIC,
 )
+from ...utils.base import get_column_leaf, get_column_root_relation, is_column_dotted
 
 log = logging.getLogger(__name__)
 
+_mongo_aggregates = {
+    aggregate_count: lambda field: {"$sum": 1},
+    aggregate_sum: lambda field: {"$sum": field},
+    aggregate_avg: lambda field: {"$avg": field},
+    aggregate_min: lambda field: {"$min": field},
+    aggregate_max: lambda field: {"$max": field},
+}
+""" The builtin aggregate functions that can be done on the database """
+
 
 def _include_filters(obj):
     for key in filters.__all__:
@@ -49,6 +67,12 @@ class MongoEngineInterface(BaseInterface):
         """
         return self.obj.__name__
 
+    query_facet = False
+    """
+        Set to True to get the count and the page of paginated
+        queries on a single aggregation, with $facet
+    """
+
     def query(
         self,
         filters=None,
@@ -56,8 +80,23 @@ class MongoEngineInterface(BaseInterface):
         order_direction="",
         page=None,
         page_size=None,
+        select_columns=None,
+        select_related=None,
     ):
-
+        """
+            Returns the results for a model query, applies filters,
+            sorting and pagination
+
+            :param select_columns: A List of columns to be specifically
+                loaded, supports dotted notation for references. Documents
+                are loaded with just these fields when they are all fields
+            :param select_related: A List of reference columns whose
+                documents are fetched with a single query each,
+                defaults to the references of select_columns, or to all
+                references when select_columns is not given
+            :return: A tuple with the query count (non paginated)
+                and the results
+        """
         # base query : all objects
         objs = self.obj.objects
 
@@ -65,9 +104,6 @@ class MongoEngineInterface(BaseInterface):
         if filters:
             objs = filters.apply_all(objs)
 
-        # get the count of all items, either filtered or unfiltered
-        count = objs.count()
-
         # order the data
         if order_column != "":
             if hasattr(getattr(self.obj, order_column), "_col_name"):
@@ -77,16 +113,202 @@ class MongoEngineInterface(BaseInterface):
             else:
                 objs = objs.order_by("+{0}".format(order_column))
 
+        only_columns = self._get_only_columns(select_columns)
+        if only_columns:
+            objs = objs.only(*only_columns)
+
         if page_size is None:  # error checking and warnings
+            # get the count of all items, either filtered or unfiltered
+            count = objs.count()
             if page is not None:
                 log.error("Attempting to get page %s but page_size is undefined" % page)
             if count > 100:
                 log.warn("Retrieving %s %s items from DB" % (count, str(self.obj)))
+            result = list(objs)
         else:  # get data segment for paginated page
             offset = (page or 0) * page_size
-            objs = objs[offset : offset + page_size]
+            if self.query_facet:
+                count, result = self._query_facet(objs, offset, page_size, only_columns)
+            else:
+                count = objs.count()
+                result = list(objs[offset : offset + page_size])
+
+        if select_related is None:
+            if select_columns:
+                select_related = [
+                    get_column_root_relation(col) for col in select_columns
+                ]
+            else:
+                select_related = self.get_columns_list()
+        self._prefetch_related(result, select_related, select_columns)
+        return count, result
+
+    def _is_plain_field(self, col_name):
+        return col_name in self.obj._fields and not self.is_relation(col_name)
+
+    def query_aggregate(
+        self, group_by, aggregates, filters=None, order_column="", order_direction=""
+    ):
+        """
+            Groups by a field and aggregates on the database, with a
+            $match, $group and $sort aggregation pipeline. Only the builtin
+            aggregate_count, aggregate_sum, aggregate_avg, aggregate_min
+            and aggregate_max over numeric fields are supported
+
+            :param group_by: The field name to group by
+            :param aggregates: A list of tuples [(<AGGR FUNC>, <COLNAME>), ...]
+            :param filters: A Filter class that contains all filters to apply
+            :param order_column: name of the column to order, only the group
+                by field is supported
+            :param order_direction: the direction to order <'asc'|'desc'>
+            :return: A list of lists with the group value followed by the
+                aggregations, ordered by the group value. None if the group by,
+                the order or any of the aggregations can't be done on the database
+        """
+        if not self._is_plain_field(group_by) or order_column not in ("", group_by):
+            return None
+        group = {"_id": "${0}".format(self.obj._fields[group_by].db_field)}
+        for i, aggregate in enumerate(aggregates):
+            if (
+                not isinstance(aggregate, tuple)
+                or len(aggregate) != 2
+                or aggregate[0] not in _mongo_aggregates
+            ):
+                return None
+            aggregate_func, col_name = aggregate
+            if aggregate_func is aggregate_count:
+                field = None
+            elif self.is_integer(col_name) or self.is_float(col_name):
+                field = "${0}".format(self.obj._fields[col_name].db_field)
+            else:
+                return None
+            group["a{0}".format(i)] = _mongo_aggregates[aggregate_func](field)
+        objs = self.obj.objects
+        if filters:
+            objs = filters.apply_all(objs)
+        # The queryset adds the filters $match
+        pipeline = [
+            {"$group": group},
+            {"$sort": {"_id": -1 if order_direction == "desc" else 1}},
+        ]
+        field = self.obj._fields[group_by]
+        result = []
+        for row in objs.aggregate(pipeline):
+            value = row["_id"]
+            result.append(
+                [None if value is None else field.to_python(value)]
+                + [row["a{0}".format(i)] for i in range(len(aggregates))]
+            )
+        return result
 
-        return count, objs
+    def query_columns(self, columns, filters=None, order_column="", order_direction=""):
+        """
+            Returns just the values of columns, without loading documents
+
+            :param columns: A list of field names
+            :param filters: A Filter class that contains all filters to apply
+            :param order_column: name of the column to order
+            :param order_direction: the direction to order <'asc'|'desc'>
+            :return: A list of lists with the values, None if any of the
+                columns is not a plain field
+        """
+        if not all(self._is_plain_field(col_name) for col_name in columns):
+            return None
+        objs = self.obj.objects
+        if filters:
+            objs = filters.apply_all(objs)
+        if order_column:
+            objs = objs.order_by(
+                "{0}{1}".format("-" if order_direction == "desc" else "+", order_column)
+            )
+        if len(columns) == 1:
+            return [[value] for value in objs.scalar(*columns)]
+        return [list(row) for row in objs.scalar(*columns)]
+
+    def _get_only_columns(self, select_columns):
+        """
+            Returns the fields to load for select_columns,
+            or None when they are not all fields, like methods
+        """
+        if not select_columns:
+            return None
+        only_columns = [self.get_pk_name()]
+        for column in select_columns:
+            root = get_column_root_relation(column)
+            if root not in self.obj._fields:
+                return None
+            if is_column_dotted(column) and not self.is_relation(root):
+                return None
+            if root not in only_columns:
+                only_columns.append(root)
+        return only_columns
+
+    def _query_facet(self, objs, offset, page_size, only_columns):
+        """
+            Returns the count and the page of a queryset
+            from a single aggregation
+        """
+        page_pipeline = [{"$skip": offset}, {"$limit": page_size}]
+        if only_columns:
+            page_pipeline.append(
+                {
+                    "$project": {
+                        self.obj._fields[col_name].db_field: 1
+                        for col_name in only_columns
+                    }
+                }
+            )
+        facet = {"$facet": {"count": [{"$count": "count"}], "page": page_pipeline}}
+        result = next(iter(objs.aggregate([facet])), {})
+        count = result["count"][0]["count"] if result.get("count") else 0
+        return count, [self.obj._from_son(son) for son in result.get("page", [])]
+
+    def _prefetch_related(self, items, relations, select_columns=None):
+        """
+            Fetches the referenced documents of items with a single $in
+            query for each relation, instead of one query for each
+            document when they are first read
+        """
+        for relation in set(relations):
+            if not self.is_relation(relation):
+                continue
+            field = self.obj._fields[relation]
+            many = self.is_relation_many_to_many(relation)
+            if isinstance(field, ListField) and not many:
+                continue
+            refs = [item._data.get(relation) for item in items]
+            ids = set()
+            for ref in refs:
+                for value in (ref or []) if many else [ref]:
+                    ref_id = getattr(value, "id", None)
+                    # Documents are already loaded
+                    if ref_id is not None and not hasattr(value, "_data"):
+                        ids.add(ref_id)
+            if not ids:
+                continue
+            related_objs = self.get_related_model(relation).objects(pk__in=list(ids))
+            leaf_columns = [
+                get_column_leaf(col)
+                for col in select_columns or []
+                if is_column_dotted(col) and get_column_root_relation(col) == relation
+            ]
+            if leaf_columns and relation not in (select_columns or []):
+                related_objs = related_objs.only(*leaf_columns)
+            related = {doc.pk: doc for doc in related_objs}
+            for item, ref in zip(items, refs):
+                if many and ref:
+                    values = BaseList(
+                        [
+                            related.get(getattr(value, "id", None), value)
+                            for value in ref
+                        ],
+                        item,
+                        relation,
+                    )
+                    values._dereferenced = True
+                    item._data[relation] = values
+                elif ref is not None:
+                    item._data[relation] = related.get(getattr(ref, "id", None), ref)
 
     def is_object_id(self, col_name):
         try:
@@ -319,10 +541,11 @@ class MongoEngineInterface(BaseInterface):
     def get_pk_name(self):
         return "id"
 
-    def get(self, id, filters=None):
+    def get(self, id, filters=None, select_columns=None):
+        objs = self.obj.objects
         if filters:
-            objs = self.obj.objects
             objs = filters.apply_all(objs)
-            return objs(pk=id).first()
-
-        return self.obj.objects(pk=id).first()
+        only_columns = self._get_only_columns(select_columns)
+        if only_columns:
+            objs = objs.only(*only_columns)
+        return objs(pk=id).first()
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
+from contextlib import contextmanager
+import datetime
 import logging
 import sys
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
+from flask import current_app, has_app_context
 import sqlalchemy as sa
 from sqlalchemy import asc, desc
 from sqlalchemy.exc import IntegrityError
@@ -17,9 +31,22 @@ from sqlalchemy_utils.types.uuid import UUIDType
 
 
 from . import filters, Model
+from .routing import ReadReplicaRouter
 from ..base import BaseInterface
+from ..cache import bump_model_generation
 from ..filters import Filters
-from ..group import GroupByCol, GroupByDateMonth, GroupByDateYear
+from ..group import (
+    aggregate_avg,
+    aggregate_count,
+    aggregate_max,
+    aggregate_min,
+    aggregate_sum,
+    BaseGroupBy,
+    get_bucket_size,
+    GroupByCol,
+    GroupByDateMonth,
+    GroupByDateYear,
+)
 from ..mixins import FileColumn, ImageColumn
 from ..._compat import as_unicode
 from ...const import (
@@ -45,6 +72,101 @@ def _is_sqla_type(model: Model, sa_type: Type[TypeEngine]) -> bool:
     )
 
 
+def _get_column_kinds(sa_type: TypeEngine) -> FrozenSet[str]:
+    kinds = set()
+    if isinstance(sa_type, ImageColumn):
+        kinds.add("image")
+    if isinstance(sa_type, FileColumn):
+        kinds.add("file")
+    if _is_sqla_type(sa_type, sa.types.String) or sa_type.__class__ == UUIDType:
+        kinds.add("string")
+    for kind, kind_type in (
+        ("text", sa.types.Text),
+        ("binary", sa.types.LargeBinary),
+        ("integer", sa.types.Integer),
+        ("numeric", sa.types.Numeric),
+        ("float", sa.types.Float),
+        ("boolean", sa.types.Boolean),
+        ("date", sa.types.Date),
+        ("datetime", sa.types.DateTime),
+        ("enum", sa.types.Enum),
+    ):
+        if _is_sqla_type(sa_type, kind_type):
+            kinds.add(kind)
+    return frozenset(kinds)
+
+
+_sql_aggregates = {
+    aggregate_count: lambda column: sa.func.count(),
+    aggregate_sum: sa.func.sum,
+    aggregate_avg: sa.func.avg,
+    aggregate_min: sa.func.min,
+    aggregate_max: sa.func.max,
+}
+""" The builtin aggregate functions that can be done on the database """
+
+
+class ColumnInfo(object):
+    """
+        Immutable metadata for one model column or relation, built
+        once by SQLAInterface so that the is_* predicates do not
+        inspect mappers and column types on every call
+    """
+
+    __slots__ = (
+        "name",
+        "kinds",
+        "nullable",
+        "unique",
+        "pk",
+        "fk",
+        "max_length",
+        "enum_class",
+        "relation_direction",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kinds: FrozenSet[str] = frozenset(),
+        nullable: bool = False,
+        unique: bool = False,
+        pk: bool = False,
+        fk: bool = False,
+        max_length: int = -1,
+        enum_class: Optional[type] = None,
+        relation_direction: Optional[str] = None,
+    ) -> None:
+        for key, value in (
+            ("name", name),
+            ("kinds", kinds),
+            ("nullable", nullable),
+            ("unique", unique),
+            ("pk", pk),
+            ("fk", fk),
+            ("max_length", max_length),
+            ("enum_class", enum_class),
+            ("relation_direction", relation_direction),
+        ):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, key: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.name!r}, kinds={sorted(self.kinds)}, "
+            f"relation_direction={self.relation_direction!r})"
+        )
+
+    @property
+    def is_relation(self) -> bool:
+        return self.relation_direction is not None
+
+
 class SQLAInterface(BaseInterface):
     """
     SQLAModel
@@ -57,6 +179,7 @@ class SQLAInterface(BaseInterface):
         _include_filters(self)
         self.list_columns = dict()
         self.list_properties = dict()
+        self._columns_info: Dict[str, ColumnInfo] = dict()
         self.session = session
         # Collect all SQLA columns and properties
         for prop in sa.orm.class_mapper(obj).iterate_properties:
@@ -75,6 +198,39 @@ class SQLAInterface(BaseInterface):
         """
         return self.obj.__name__
 
+    @property
+    def read_replica_router(self) -> Optional[ReadReplicaRouter]:
+        """
+            Returns the app's read replica router, if configured
+            for this interface's session
+        """
+        if not has_app_context():
+            return None
+        appbuilder = getattr(current_app, "appbuilder", None)
+        router = getattr(appbuilder, "read_replica_router", None)
+        if router is None or router.primary_session is not self.session:
+            return None
+        return router
+
+    @contextmanager
+    def read_only(self):
+        router = self.read_replica_router
+        if router is None:
+            yield
+            return
+        with router.read_only():
+            yield
+
+    def get_read_session(self) -> SessionBase:
+        """
+            Returns the session to use for reads, the replica session
+            when routing is configured and allowed, the primary otherwise
+        """
+        router = self.read_replica_router
+        if router is None:
+            return self.session
+        return router.get_session(self.obj)
+
     @staticmethod
     def is_model_already_joined(query: Query, model: Type[Model]) -> bool:
         return model in [mapper.class_ for mapper in query._join_entities]
@@ -420,7 +576,7 @@ class SQLAInterface(BaseInterface):
         """
         if not self.session:
             raise InterfaceQueryWithoutSession()
-        query = self.session.query(self.obj)
+        query = self.get_read_session().query(self.obj)
 
         count = self.query_count(query, filters, select_columns)
         query = self.apply_all(
@@ -442,28 +598,294 @@ class SQLAInterface(BaseInterface):
                 return count, query_results
         return count, result
 
+    def iter_query(
+        self,
+        filters: Optional[Filters] = None,
+        order_column: str = "",
+        order_direction: str = "",
+        select_columns: Optional[List[str]] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[Model]:
+        """
+        Iterates over the results of a model query without loading them all,
+        rows are fetched and streamed from the database chunk_size at a time.
+        Applies the same filters, joins and column selection as query
+
+        :param filters: A Filter class that contains all filters to apply
+        :param order_column: name of the column to order
+        :param order_direction: the direction to order <'asc'|'desc'>
+        :param select_columns: A List of columns to be specifically selected
+        on the query. Supports dotted notation.
+        :param chunk_size: The number of rows to fetch at a time
+        :return: A generator of model items
+        """
+        if not self.session:
+            raise InterfaceQueryWithoutSession()
+        if select_columns and self.exists_col_to_many(select_columns):
+            # Eager loaded collections span several rows, so chunks of rows
+            # would split them, page through the items instead
+            results = self._iter_query_pages(
+                filters, order_column, order_direction, select_columns, chunk_size
+            )
+        else:
+            query = self.apply_all(
+                self.get_read_session().query(self.obj),
+                filters,
+                order_column,
+                order_direction,
+                select_columns=select_columns,
+            )
+            # yield_per also sets stream_results, for server side cursors
+            results = query.yield_per(chunk_size)
+        for item in results:
+            if hasattr(item, self.obj.__name__):
+                yield getattr(item, self.obj.__name__)
+            else:
+                yield item
+
+    def _iter_query_pages(
+        self,
+        filters: Optional[Filters],
+        order_column: str,
+        order_direction: str,
+        select_columns: List[str],
+        page_size: int,
+    ) -> Iterator[Model]:
+        if not order_column and not self.is_pk_composite():
+            # pages need a stable order
+            order_column, order_direction = self.get_pk_name(), "asc"
+        page = 0
+        while True:
+            items = self.apply_all(
+                self.get_read_session().query(self.obj),
+                filters,
+                order_column,
+                order_direction,
+                page,
+                page_size,
+                select_columns,
+            ).all()
+            yield from items
+            if len(items) < page_size:
+                return
+            page += 1
+
+    def _query_group(self, group: BaseGroupBy, filters: Optional[Filters]) -> List:
+        # Rows are streamed and aggregated as they arrive, keeping only
+        # a state per group, so group columns need not be sortable by
+        # the database
+        return group.apply(self.iter_query(filters), sort=False)
+
+    def query_aggregate(
+        self,
+        group_by: str,
+        aggregates: List[Tuple[Any, str]],
+        filters: Optional[Filters] = None,
+        order_column: str = "",
+        order_direction: str = "",
+    ) -> Optional[List[List[Any]]]:
+        """
+        Groups by a column and aggregates on the database, with a single
+        GROUP BY query. Only the builtin aggregate_count, aggregate_sum,
+        aggregate_avg, aggregate_min and aggregate_max over numeric columns
+        are supported. Null values are skipped, as python aggregations do
+
+        :param group_by: The column name to group by
+        :param aggregates: A list of tuples [(<AGGR FUNC>, <COLNAME>), ...]
+        :param filters: A Filter class that contains all filters to apply
+        :param order_column: name of the column to order, only the group
+            by column is supported
+        :param order_direction: the direction to order <'asc'|'desc'>
+        :return: A list of lists with the group value followed by the
+            aggregations, ordered by the group value. None if the group by,
+            the order or any of the aggregations can't be done on the database
+        """
+        if group_by not in self.list_columns or order_column not in ("", group_by):
+            return None
+        sql_aggregates = []
+        for aggregate in aggregates:
+            if (
+                not isinstance(aggregate, tuple)
+                or len(aggregate) != 2
+                or aggregate[0] not in _sql_aggregates
+            ):
+                return None
+            aggregate_func, col_name = aggregate
+            if aggregate_func is not aggregate_count and not (
+                self.is_integer(col_name) or self.is_numeric(col_name)
+            ):
+                return None
+            sql_aggregates.append(
+                _sql_aggregates[aggregate_func](getattr(self.obj, col_name, None))
+            )
+        group_column = getattr(self.obj, group_by)
+        query = self._apply_inner_all(
+            self.get_read_session().query(self.obj), filters, aliases_mapping={}
+        )
+        query = (
+            query.with_entities(group_column, *sql_aggregates)
+            .group_by(group_column)
+            .order_by(
+                group_column.desc() if order_direction == "desc" else group_column
+            )
+        )
+        return [
+            [row[0]]
+            + [
+                self._get_aggregate_value(aggregate_func, col_name, value)
+                for (aggregate_func, col_name), value in zip(aggregates, row[1:])
+            ]
+            for row in query
+        ]
+
+    def _get_aggregate_value(
+        self, aggregate_func: Callable, col_name: str, value: Any
+    ) -> Any:
+        """
+        Returns the value of a database aggregation as its python
+        aggregation returns it. Some databases sum and average integers
+        as decimals, and the sum and average of no values are zero
+        """
+        if aggregate_func is aggregate_count:
+            return value
+        if value is None:
+            return {aggregate_sum: 0, aggregate_avg: 0.0}.get(aggregate_func)
+        if self.is_float(col_name) or (
+            aggregate_func is aggregate_avg and self.is_integer(col_name)
+        ):
+            return float(value)
+        if self.is_integer(col_name):
+            return int(value)
+        return value
+
+    def query_columns(
+        self,
+        columns: List[str],
+        filters: Optional[Filters] = None,
+        order_column: str = "",
+        order_direction: str = "",
+    ) -> Optional[List[List[Any]]]:
+        """
+        Returns just the values of columns, without loading model items
+
+        :param columns: A list of column names
+        :param filters: A Filter class that contains all filters to apply
+        :param order_column: name of the column to order
+        :param order_direction: the direction to order <'asc'|'desc'>
+        :return: A list of lists with the values, None if any of the
+            columns is not a plain model column
+        """
+        if any(col_name not in self.list_columns for col_name in columns):
+            return None
+        query = self._apply_inner_all(
+            self.get_read_session().query(self.obj),
+            filters,
+            order_column,
+            order_direction,
+            aliases_mapping={},
+        )
+        query = query.with_entities(
+            *[getattr(self.obj, col_name) for col_name in columns]
+        )
+        return [list(row) for row in query]
+
+    def _get_epoch_expression(self, column: Any) -> Optional[Any]:
+        """
+        Returns an integer expression with the seconds since the epoch
+        of a date or datetime column, or None for unsupported dialects
+        """
+        bind = self.get_read_session().get_bind(mapper=sa.inspect(self.obj))
+        dialect = bind.dialect.name
+        if dialect == "sqlite":
+            return sa.cast(sa.func.strftime("%s", column), sa.Integer)
+        if dialect == "postgresql":
+            return sa.cast(sa.extract("epoch", column), sa.BigInteger)
+        if dialect == "mysql":
+            return sa.func.timestampdiff(sa.text("SECOND"), "1970-01-01", column)
+        return None
+
+    def query_time_buckets(
+        self,
+        time_column: str,
+        columns: List[str],
+        bucket_size: Union[int, datetime.timedelta, None] = None,
+        max_points: int = 1000,
+        filters: Optional[Filters] = None,
+    ) -> Optional[List[List[Any]]]:
+        """
+        Averages numeric columns on fixed width buckets of a date or
+        datetime column, with a single GROUP BY query
+
+        :param time_column: The date or datetime column name
+        :param columns: A list of numeric column names
+        :param bucket_size: The buckets width, in seconds or a timedelta.
+            Defaults to the width that splits the time range in max_points
+        :param max_points: The number of buckets when bucket_size is not given
+        :param filters: A Filter class that contains all filters to apply
+        :return: A list of lists with the bucket start and the averages,
+            ordered by bucket. None if the columns or the database
+            are not supported
+        """
+        if time_column not in self.list_columns or not (
+            self.is_date(time_column) or self.is_datetime(time_column)
+        ):
+            return None
+        for col_name in columns:
+            if col_name not in self.list_columns or not (
+                self.is_integer(col_name) or self.is_numeric(col_name)
+            ):
+                return None
+        epoch = self._get_epoch_expression(getattr(self.obj, time_column))
+        if epoch is None:
+            return None
+        query = self._apply_inner_all(
+            self.get_read_session().query(self.obj), filters, aliases_mapping={}
+        )
+        if isinstance(bucket_size, datetime.timedelta):
+            bucket_size = bucket_size.total_seconds()
+        if not bucket_size:
+            start, end = query.with_entities(
+                sa.func.min(epoch), sa.func.max(epoch)
+            ).one()
+            if start is None:
+                return []
+            bucket_size = get_bucket_size(start, end, max_points)
+        bucket_size = max(int(bucket_size), 1)
+        # SQL modulo truncates, floor to the bucket start also before the epoch
+        bucket = (epoch - (epoch % bucket_size + bucket_size) % bucket_size).label(
+            "bucket"
+        )
+        query = (
+            query.with_entities(
+                bucket,
+                *[sa.func.avg(getattr(self.obj, col_name)) for col_name in columns],
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        epoch_start = datetime.datetime(1970, 1, 1)
+        if self.is_date(time_column):
+            epoch_start = epoch_start.date()
+        result = []
+        for row in query:
+            if row[0] is None:
+                continue
+            result.append(
+                [epoch_start + datetime.timedelta(seconds=int(row[0]))]
+                + [None if value is None else float(value) for value in row[1:]]
+            )
+        return result
+
     def query_simple_group(
         self, group_by="", aggregate_func=None, aggregate_col=None, filters=None
     ):
-        query = self.session.query(self.obj)
-        query = self._get_base_query(query=query, filters=filters)
-        query_result = query.all()
-        group = GroupByCol(group_by, "Group by")
-        return group.apply(query_result)
+        return self._query_group(GroupByCol(group_by, "Group by"), filters)
 
     def query_month_group(self, group_by="", filters=None):
-        query = self.session.query(self.obj)
-        query = self._get_base_query(query=query, filters=filters)
-        query_result = query.all()
-        group = GroupByDateMonth(group_by, "Group by Month")
-        return group.apply(query_result)
+        return self._query_group(GroupByDateMonth(group_by, "Group by Month"), filters)
 
     def query_year_group(self, group_by="", filters=None):
-        query = self.session.query(self.obj)
-        query = self._get_base_query(query=query, filters=filters)
-        query_result = query.all()
-        group_year = GroupByDateYear(group_by, "Group by Year")
-        return group_year.apply(query_result)
+        return self._query_group(GroupByDateYear(group_by, "Group by Year"), filters)
 
     """
     -----------------------------------------
@@ -471,150 +893,111 @@ class SQLAInterface(BaseInterface):
     -----------------------------------------
     """
 
+    def _build_column_info(self, col_name: str) -> ColumnInfo:
+        prop = self.list_properties.get(col_name)
+        if isinstance(prop, sa.orm.properties.RelationshipProperty):
+            direction = prop.direction.name
+            nullable = False
+            if direction == "MANYTOONE":
+                nullable = bool(self.get_relation_fk(col_name).nullable)
+            return ColumnInfo(col_name, nullable=nullable, relation_direction=direction)
+        col = self.list_columns.get(col_name)
+        if col is None:
+            return ColumnInfo(col_name)
+        kinds = _get_column_kinds(col.type)
+        max_length = -1
+        if "enum" not in kinds:
+            max_length = getattr(col.type, "length", None) or -1
+        return ColumnInfo(
+            col_name,
+            kinds=kinds,
+            nullable=bool(col.nullable),
+            unique=col.unique is True,
+            pk=bool(col.primary_key),
+            fk=bool(col.foreign_keys),
+            max_length=max_length,
+            enum_class=getattr(col.type, "enum_class", None),
+        )
+
+    def get_column_info(self, col_name: str) -> ColumnInfo:
+        """
+            Returns the immutable metadata descriptor for a column or relation,
+            it's built on first use and reused afterwards. Unknown names get
+            an empty descriptor, so all predicates are False for them
+
+        :param col_name: The column or relation name
+        """
+        info = self._columns_info.get(col_name)
+        if info is None:
+            info = self._build_column_info(col_name)
+            self._columns_info[col_name] = info
+        return info
+
     def is_image(self, col_name: str) -> bool:
-        try:
-            return isinstance(self.list_columns[col_name].type, ImageColumn)
-        except KeyError:
-            return False
+        return "image" in self.get_column_info(col_name).kinds
 
     def is_file(self, col_name: str) -> bool:
-        try:
-            return isinstance(self.list_columns[col_name].type, FileColumn)
-        except KeyError:
-            return False
+        return "file" in self.get_column_info(col_name).kinds
 
     def is_string(self, col_name: str) -> bool:
-        try:
-            return (
-                _is_sqla_type(self.list_columns[col_name].type, sa.types.String)
-                or self.list_columns[col_name].type.__class__ == UUIDType
-            )
-        except KeyError:
-            return False
+        return "string" in self.get_column_info(col_name).kinds
 
     def is_text(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Text)
-        except KeyError:
-            return False
+        return "text" in self.get_column_info(col_name).kinds
 
     def is_binary(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.LargeBinary)
-        except KeyError:
-            return False
+        return "binary" in self.get_column_info(col_name).kinds
 
     def is_integer(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Integer)
-        except KeyError:
-            return False
+        return "integer" in self.get_column_info(col_name).kinds
 
     def is_numeric(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Numeric)
-        except KeyError:
-            return False
+        return "numeric" in self.get_column_info(col_name).kinds
 
     def is_float(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Float)
-        except KeyError:
-            return False
+        return "float" in self.get_column_info(col_name).kinds
 
     def is_boolean(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Boolean)
-        except KeyError:
-            return False
+        return "boolean" in self.get_column_info(col_name).kinds
 
     def is_date(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Date)
-        except KeyError:
-            return False
+        return "date" in self.get_column_info(col_name).kinds
 
     def is_datetime(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.DateTime)
-        except KeyError:
-            return False
+        return "datetime" in self.get_column_info(col_name).kinds
 
     def is_enum(self, col_name: str) -> bool:
-        try:
-            return _is_sqla_type(self.list_columns[col_name].type, sa.types.Enum)
-        except KeyError:
-            return False
+        return "enum" in self.get_column_info(col_name).kinds
 
     def is_relation(self, col_name: str) -> bool:
-        try:
-            return isinstance(
-                self.list_properties[col_name], sa.orm.properties.RelationshipProperty
-            )
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).is_relation
 
     def is_relation_many_to_one(self, col_name: str) -> bool:
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == "MANYTOONE"
-            return False
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).relation_direction == "MANYTOONE"
 
     def is_relation_many_to_many(self, col_name: str) -> bool:
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == "MANYTOMANY"
-            return False
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).relation_direction == "MANYTOMANY"
 
     def is_relation_one_to_one(self, col_name: str) -> bool:
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == "ONETOONE"
-            return False
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).relation_direction == "ONETOONE"
 
     def is_relation_one_to_many(self, col_name: str) -> bool:
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == "ONETOMANY"
-            return False
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).relation_direction == "ONETOMANY"
 
     def is_nullable(self, col_name: str) -> bool:
-        if self.is_relation_many_to_one(col_name):
-            col = self.get_relation_fk(col_name)
-            return col.nullable
-        try:
-            return self.list_columns[col_name].nullable
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).nullable
 
     def is_unique(self, col_name: str) -> bool:
-        try:
-            return self.list_columns[col_name].unique is True
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).unique
 
     def is_pk(self, col_name: str) -> bool:
-        try:
-            return self.list_columns[col_name].primary_key
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).pk
 
     def is_pk_composite(self) -> bool:
         return len(self.obj.__mapper__.primary_key) > 1
 
     def is_fk(self, col_name: str) -> bool:
-        try:
-            return self.list_columns[col_name].foreign_keys
-        except KeyError:
-            return False
+        return self.get_column_info(col_name).fk
 
     def is_property(self, col_name: str) -> bool:
         return hasattr(getattr(self.obj, col_name), "fget")
@@ -626,16 +1009,7 @@ class SQLAInterface(BaseInterface):
         return self.is_property(col_name) or self.is_function(col_name)
 
     def get_max_length(self, col_name: str) -> int:
-        try:
-            if self.is_enum(col_name):
-                return -1
-            col = self.list_columns[col_name]
-            if col.type.length:
-                return col.type.length
-            else:
-                return -1
-        except Exception:
-            return -1
+        return self.get_column_info(col_name).max_length
 
     """
     -------------------------------
@@ -647,6 +1021,7 @@ class SQLAInterface(BaseInterface):
         try:
             self.session.add(item)
             self.session.commit()
+            bump_model_generation(self.obj)
             self.message = (as_unicode(self.add_row_message), "success")
             return True
         except IntegrityError as e:
@@ -669,8 +1044,12 @@ class SQLAInterface(BaseInterface):
 
     def edit(self, item: Model, raise_exception: bool = False) -> bool:
         try:
-            self.session.merge(item)
+            # Items loaded by this session just need a flush of their changes,
+            # merge would cascade through all their loaded relations
+            if item not in self.session:
+                self.session.merge(item)
             self.session.commit()
+            bump_model_generation(self.obj)
             self.message = (as_unicode(self.edit_row_message), "success")
             return True
         except IntegrityError as e:
@@ -696,6 +1075,7 @@ class SQLAInterface(BaseInterface):
             self._delete_files(item)
             self.session.delete(item)
             self.session.commit()
+            bump_model_generation(self.obj)
             self.message = (as_unicode(self.delete_row_message), "success")
             return True
         except IntegrityError as e:
@@ -716,18 +1096,21 @@ class SQLAInterface(BaseInterface):
                 raise e
             return False
 
-    def delete_all(self, items: List[Model]) -> bool:
+    def delete_all(self, items: List[Model], raise_exception: bool = False) -> bool:
         try:
             for item in items:
                 self._delete_files(item)
                 self.session.delete(item)
             self.session.commit()
+            bump_model_generation(self.obj)
             self.message = (as_unicode(self.delete_row_message), "success")
             return True
         except IntegrityError as e:
             self.message = (as_unicode(self.delete_integrity_error_message), "warning")
             log.warning(LOGMSG_WAR_DBI_DEL_INTEGRITY.format(str(e)))
             self.session.rollback()
+            if raise_exception:
+                raise e
             return False
         except Exception as e:
             self.message = (
@@ -736,8 +1119,218 @@ class SQLAInterface(BaseInterface):
             )
             log.exception(LOGMSG_ERR_DBI_DEL_GENERIC.format(str(e)))
             self.session.rollback()
+            if raise_exception:
+                raise e
+            return False
+
+    def edit_all(self, items: List[Model], raise_exception: bool = False) -> bool:
+        """
+        Commits changes made to several items on a single transaction
+        """
+        try:
+            for item in items:
+                if item not in self.session:
+                    self.session.merge(item)
+            self.session.commit()
+            bump_model_generation(self.obj)
+            self.message = (as_unicode(self.edit_row_message), "success")
+            return True
+        except IntegrityError as e:
+            self.message = (as_unicode(self.edit_integrity_error_message), "warning")
+            log.warning(LOGMSG_WAR_DBI_EDIT_INTEGRITY.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
+            return False
+        except Exception as e:
+            self.message = (
+                as_unicode(self.general_error_message + " " + str(sys.exc_info()[0])),
+                "danger",
+            )
+            log.exception(LOGMSG_ERR_DBI_EDIT_GENERIC.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
             return False
 
+    def _is_delete_cascaded(self) -> bool:
+        """
+        Bulk statements skip the file cleanup and the relationship cascades
+        made by the ORM, returns True if deleting from this model needs them
+        """
+        if self.get_file_column_list() or self.get_image_column_list():
+            return True
+        for relation in sa.inspect(self.obj).relationships:
+            if relation.cascade.delete:
+                return True
+            if (
+                relation.direction.name in ("ONETOMANY", "MANYTOMANY")
+                and not relation.passive_deletes
+            ):
+                return True
+        return False
+
+    def _get_bulk_query(self, filters: Optional[Filters]) -> Optional[Query]:
+        """
+        Returns a query with filters applied usable on a bulk UPDATE or DELETE.
+        Filters that need joins are applied on a primary key subquery.
+        Returns None if that is not possible (composite primary keys)
+        """
+        query = self.session.query(self.obj)
+        if not filters:
+            return query
+        if not any(
+            is_column_dotted(flt.column_name)
+            or self.is_relation_many_to_many(flt.column_name)
+            or self.is_relation_one_to_many(flt.column_name)
+            for flt in filters.filters
+        ):
+            return filters.apply_all(query)
+        if self.is_pk_composite():
+            return None
+        pk = self.get_pk()
+        pk_subquery = filters.apply_all(self.session.query(pk)).subquery()
+        # Select from the derived table, some backends refuse a subquery
+        # on the same table that is being changed
+        return query.filter(pk.in_(sa.select([pk_subquery.c[pk.key]])))
+
+    def delete_where(
+        self, filters: Optional[Filters], raise_exception: bool = False
+    ) -> Optional[int]:
+        """
+        Deletes all the rows that match filters, using a single DELETE statement
+        when possible. Models with file or image columns, or with relations
+        that the ORM cascades to, delete each item on the ORM instead.
+
+        :param filters: A Filters class instance
+        :param raise_exception: Raise exceptions instead of returning None
+        :return: The number of deleted rows, None on error
+        """
+        try:
+            query = (
+                None if self._is_delete_cascaded() else self._get_bulk_query(filters)
+            )
+            if query is None:
+                items = self.apply_filters(self.session.query(self.obj), filters).all()
+                for item in items:
+                    self._delete_files(item)
+                    self.session.delete(item)
+                count = len(items)
+            else:
+                count = query.delete(synchronize_session=False)
+            self.session.commit()
+            bump_model_generation(self.obj)
+            self.message = (as_unicode(self.delete_row_message), "success")
+            return count
+        except IntegrityError as e:
+            self.message = (as_unicode(self.delete_integrity_error_message), "warning")
+            log.warning(LOGMSG_WAR_DBI_DEL_INTEGRITY.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
+            return None
+        except Exception as e:
+            self.message = (
+                as_unicode(self.general_error_message + " " + str(sys.exc_info()[0])),
+                "danger",
+            )
+            log.exception(LOGMSG_ERR_DBI_DEL_GENERIC.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
+            return None
+
+    def update_where(
+        self,
+        filters: Optional[Filters],
+        values: Dict[str, Any],
+        raise_exception: bool = False,
+    ) -> Optional[int]:
+        """
+        Sets values on all the rows that match filters, using a single
+        UPDATE statement when possible. Values with relations are set
+        on each item by the ORM instead.
+
+        :param filters: A Filters class instance
+        :param values: A dict with column names and their new values
+        :param raise_exception: Raise exceptions instead of returning None
+        :return: The number of changed rows, None on error
+        """
+        try:
+            query = None
+            if not any(self.is_relation(key) for key in values):
+                query = self._get_bulk_query(filters)
+            if query is None:
+                items = self.apply_filters(self.session.query(self.obj), filters).all()
+                for item in items:
+                    for key, value in values.items():
+                        setattr(item, key, value)
+                count = len(items)
+            else:
+                count = query.update(values, synchronize_session=False)
+            self.session.commit()
+            bump_model_generation(self.obj)
+            self.message = (as_unicode(self.edit_row_message), "success")
+            return count
+        except IntegrityError as e:
+            self.message = (as_unicode(self.edit_integrity_error_message), "warning")
+            log.warning(LOGMSG_WAR_DBI_EDIT_INTEGRITY.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
+            return None
+        except Exception as e:
+            self.message = (
+                as_unicode(self.general_error_message + " " + str(sys.exc_info()[0])),
+                "danger",
+            )
+            log.exception(LOGMSG_ERR_DBI_EDIT_GENERIC.format(str(e)))
+            self.session.rollback()
+            if raise_exception:
+                raise e
+            return None
+
+    def get_many(self, ids: List[Any]) -> List[Model]:
+        """
+        Returns the items for a list of primary keys on a single query,
+        on the same order. Keys that don't exist are skipped
+
+        :param ids: A list of primary keys, tuples for composite keys
+        """
+        if not ids:
+            return []
+        pk_names = self.get_pk_name()
+        if self.is_pk_composite():
+            criteria = sa.or_(
+                *[
+                    sa.and_(
+                        *[
+                            getattr(self.obj, pk_name) == value
+                            for pk_name, value in zip(pk_names, _id)
+                        ]
+                    )
+                    for _id in ids
+                ]
+            )
+        else:
+            criteria = getattr(self.obj, pk_names).in_(ids)
+        items = {
+            self._get_pk_key(item): item
+            for item in self.session.query(self.obj).filter(criteria)
+        }
+        return [
+            items[self._get_pk_key(_id)]
+            for _id in ids
+            if self._get_pk_key(_id) in items
+        ]
+
+    def _get_pk_key(self, item_or_id: Any) -> Any:
+        if isinstance(item_or_id, self.obj):
+            item_or_id = self.get_pk_value(item_or_id)
+        if isinstance(item_or_id, (list, tuple)):
+            return tuple(str(value) for value in item_or_id)
+        return str(item_or_id)
+
     """
     -----------------------
      FILE HANDLING METHODS
@@ -930,7 +1523,7 @@ class SQLAInterface(BaseInterface):
                 _filters.add_filter(_pk, self.FilterEqual, _id)
         else:
             _filters.add_filter(pk, self.FilterEqual, id)
-        query = self.session.query(self.obj)
+        query = self.get_read_session().query(self.obj)
         item = self.apply_all(
             query, _filters, select_columns=select_columns
         ).one_or_none()
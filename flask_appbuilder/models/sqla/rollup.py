@@ -0,0 +1,357 @@
+from decimal import Decimal
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm.session import Session as SessionBase
+
+from . import Model
+from .interface import SQLAInterface
+from ..filters import Filters
+from ..group import aggregate_avg, aggregate_count, aggregate_sum
+
+log = logging.getLogger(__name__)
+
+ROLLUP_COUNT_COLUMN = "rollup_count"
+""" Rollup table column with the number of items of each group """
+ROLLUP_KEY_COLUMN = "rollup_key"
+""" Rollup table unique column with a hash of each group dimension values """
+
+_rollups: Dict[str, "Rollup"] = {}
+""" private registry of the declared rollups by name, used by the CLI """
+
+
+def get_rollups() -> List["Rollup"]:
+    """
+        Returns all declared rollups
+    """
+    return list(_rollups.values())
+
+
+class Rollup(object):
+    """
+        Keeps a pre aggregated table of a model, with the item count and
+        the sum and count of values of some numeric columns, grouped by
+        dimension columns. Chart views that declare it on their rollups
+        property read count, sum and avg series from it, when the definition
+        group and all filtered columns are dimensions::
+
+            sales_rollup = Rollup(Sale, ["region", "sold_on"], ["amount"])
+
+            class SalesChartView(GroupByChartView):
+                datamodel = SQLAInterface(Sale)
+                rollups = [sales_rollup]
+                definitions = [
+                    {
+                        "group": "region",
+                        "series": [(aggregate_sum, "amount")],
+                    }
+                ]
+
+        The table is created with the model's metadata, named
+        ab_rollup_<name>, with a single row per group. It's maintained
+        on the same transaction by the model's insert, update and delete
+        events. Bulk updates and deletes bypass these events, rebuild it
+        afterwards with ``flask fab rollup-refresh``, or set incremental
+        to False and only refresh it periodically.
+
+        :param model: The SQLAlchemy model class
+        :param dimensions: Column names to group by, and to filter on
+        :param columns: Numeric column names to keep sums and counts for
+        :param name: Unique rollup name, defaults to the model table name
+        :param incremental: Maintain the table on each model write
+    """
+
+    def __init__(
+        self,
+        model: Type[Model],
+        dimensions: List[str],
+        columns: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        incremental: bool = True,
+    ) -> None:
+        self.model = model
+        self.dimensions = list(dimensions)
+        self.columns = list(columns or [])
+        self.name = name or model.__tablename__
+        if self.name in _rollups:
+            raise ValueError(f"Rollup {self.name} is already declared")
+        self.incremental = incremental
+        self.rollup_model = self._make_rollup_model()
+        self.table = self.rollup_model.__table__
+        self.datamodel = SQLAInterface(self.rollup_model)
+        _rollups[self.name] = self
+        if incremental:
+            event.listen(model, "after_insert", self._after_insert)
+            event.listen(model, "after_update", self._after_update)
+            event.listen(model, "after_delete", self._after_delete)
+            # Loads the old value of expired attributes when they are set,
+            # to remove the item from its previous group on update
+            for col_name in self.dimensions + self.columns:
+                event.listen(
+                    getattr(model, col_name),
+                    "set",
+                    self._on_set_attribute,
+                    active_history=True,
+                )
+
+    @staticmethod
+    def get_sum_column(col_name: str) -> str:
+        return f"sum_{col_name}"
+
+    @staticmethod
+    def get_count_column(col_name: str) -> str:
+        return f"count_{col_name}"
+
+    def _make_rollup_model(self) -> Type:
+        mapper = sa.inspect(self.model)
+        attrs = {
+            "__tablename__": f"ab_rollup_{self.name}",
+            "id": sa.Column(sa.Integer, primary_key=True),
+            # Unique constraints on the dimensions would allow repeated nulls
+            ROLLUP_KEY_COLUMN: sa.Column(sa.String(40), nullable=False, unique=True),
+            ROLLUP_COUNT_COLUMN: sa.Column(sa.BigInteger, nullable=False, default=0),
+        }
+        bind_key = getattr(self.model, "__bind_key__", None)
+        if bind_key:
+            attrs["__bind_key__"] = bind_key
+            attrs["__table_args__"] = {"info": {"bind_key": bind_key}}
+        self._key_types = {}
+        for col_name in self.dimensions:
+            col_type = mapper.column_attrs[col_name].columns[0].type
+            attrs[col_name] = sa.Column(col_type, index=True)
+            try:
+                python_type = col_type.python_type
+            except NotImplementedError:
+                continue
+            if python_type in (int, float, str, Decimal):
+                self._key_types[col_name] = python_type
+        for col_name in self.columns:
+            col_type = mapper.column_attrs[col_name].columns[0].type
+            if isinstance(col_type, sa.Integer):
+                col_type = sa.BigInteger()
+            attrs[self.get_sum_column(col_name)] = sa.Column(col_type)
+            attrs[self.get_count_column(col_name)] = sa.Column(
+                sa.BigInteger, nullable=False, default=0
+            )
+        base = declarative_base(metadata=self.model.metadata)
+        class_name = "".join(part.title() for part in self.name.split("_"))
+        return type(f"{class_name}Rollup", (base,), attrs)
+
+    """
+    -----------------------------------------
+         Incremental maintenance
+    -----------------------------------------
+    """
+
+    def _get_group_key(self, dimensions: Dict[str, Any]) -> str:
+        """
+            Returns the rollup key of the dimension values, the same for
+            values set on items and values loaded from the database
+        """
+        values = []
+        for col_name in self.dimensions:
+            value = dimensions[col_name]
+            python_type = self._key_types.get(col_name)
+            if value is not None and python_type is not None:
+                value = python_type(value)
+                if python_type is Decimal:
+                    value = value.normalize()
+            values.append(value)
+        return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+    def _apply(
+        self, connection: Connection, dimensions: Dict[str, Any], values, sign: int
+    ) -> None:
+        """
+            Adds (sign 1) or removes (sign -1) an item from its group
+        """
+        table = self.table
+        where = table.c[ROLLUP_KEY_COLUMN] == self._get_group_key(dimensions)
+        params = {ROLLUP_COUNT_COLUMN: table.c[ROLLUP_COUNT_COLUMN] + sign}
+        for col_name, value in values.items():
+            if value is None:
+                continue
+            sum_column = self.get_sum_column(col_name)
+            count_column = self.get_count_column(col_name)
+            params[sum_column] = sa.func.coalesce(table.c[sum_column], 0) + (
+                value if sign > 0 else -value
+            )
+            params[count_column] = table.c[count_column] + sign
+        update = table.update().where(where).values(params)
+        result = connection.execute(update)
+        if sign < 0:
+            connection.execute(
+                table.delete().where(sa.and_(where, table.c[ROLLUP_COUNT_COLUMN] <= 0))
+            )
+        elif not result.rowcount:
+            try:
+                with connection.begin_nested():
+                    self._insert_group(connection, dimensions, values)
+            except IntegrityError:
+                # Inserted meanwhile by another transaction
+                connection.execute(update)
+
+    def _insert_group(
+        self, connection: Connection, dimensions: Dict[str, Any], values
+    ) -> None:
+        params = dict(dimensions)
+        params[ROLLUP_KEY_COLUMN] = self._get_group_key(dimensions)
+        params[ROLLUP_COUNT_COLUMN] = 1
+        for col_name, value in values.items():
+            params[self.get_sum_column(col_name)] = value
+            params[self.get_count_column(col_name)] = int(value is not None)
+        connection.execute(self.table.insert().values(params))
+
+    def _get_values(self, item: Model, old: bool = False) -> Tuple[Dict, Dict]:
+        state = sa.inspect(item)
+
+        def get_value(col_name):
+            history = state.attrs[col_name].history
+            if old and history.deleted:
+                return history.deleted[0]
+            return getattr(item, col_name)
+
+        return (
+            {col_name: get_value(col_name) for col_name in self.dimensions},
+            {col_name: get_value(col_name) for col_name in self.columns},
+        )
+
+    @staticmethod
+    def _on_set_attribute(item: Model, value, old_value, initiator) -> None:
+        pass
+
+    def _after_insert(self, mapper, connection: Connection, item: Model) -> None:
+        self._apply(connection, *self._get_values(item), sign=1)
+
+    def _after_update(self, mapper, connection: Connection, item: Model) -> None:
+        state = sa.inspect(item)
+        if not any(
+            state.attrs[col_name].history.has_changes()
+            for col_name in self.dimensions + self.columns
+        ):
+            return
+        self._apply(connection, *self._get_values(item, old=True), sign=-1)
+        self._apply(connection, *self._get_values(item), sign=1)
+
+    def _after_delete(self, mapper, connection: Connection, item: Model) -> None:
+        self._apply(connection, *self._get_values(item), sign=-1)
+
+    def refresh(self, session: SessionBase) -> None:
+        """
+            Rebuilds the rollup table from the model table
+        """
+        model = self.model
+        columns = [getattr(model, col_name) for col_name in self.dimensions]
+        names = list(self.dimensions) + [ROLLUP_COUNT_COLUMN]
+        aggregates = [sa.func.count()]
+        for col_name in self.columns:
+            column = getattr(model, col_name)
+            names += [self.get_sum_column(col_name), self.get_count_column(col_name)]
+            aggregates += [sa.func.sum(column), sa.func.count(column)]
+        select = sa.select(columns + aggregates).group_by(*columns)
+        try:
+            rows = [dict(zip(names, row)) for row in session.execute(select)]
+            for row in rows:
+                row[ROLLUP_KEY_COLUMN] = self._get_group_key(row)
+            session.execute(self.table.delete())
+            if rows:
+                session.execute(self.table.insert(), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    """
+    -----------------------------------------
+         Querying
+    -----------------------------------------
+    """
+
+    def _get_rollup_filters(self, filters: Optional[Filters]) -> Optional[Filters]:
+        """
+            Returns filters applied to the rollup model,
+            or None if some filtered column is not a dimension
+        """
+        rollup_filters = self.datamodel.get_filters()
+        if filters is None:
+            return rollup_filters
+        for flt, value in zip(filters.filters, filters.values):
+            if flt.column_name not in self.dimensions:
+                return None
+            rollup_filters.add_filter(flt.column_name, flt.__class__, value)
+        return rollup_filters
+
+    def query_aggregate(
+        self,
+        session: SessionBase,
+        group_by: str,
+        aggregates: List[Tuple[Any, str]],
+        filters: Optional[Filters] = None,
+        order_column: str = "",
+        order_direction: str = "",
+    ) -> Optional[List[List[Any]]]:
+        """
+            Same as SQLAInterface.query_aggregate, returns None if the group
+            is not a dimension, if some series is not a count, sum or avg of
+            the rollup columns, or if the filters are not compatible
+        """
+        if group_by not in self.dimensions or order_column not in ("", group_by):
+            return None
+        table = self.table
+        columns = [sa.func.sum(table.c[ROLLUP_COUNT_COLUMN])]
+        for aggregate in aggregates:
+            if not isinstance(aggregate, tuple) or len(aggregate) != 2:
+                return None
+            aggregate_func, col_name = aggregate
+            if aggregate_func is aggregate_count:
+                continue
+            if (
+                aggregate_func not in (aggregate_sum, aggregate_avg)
+                or col_name not in self.columns
+            ):
+                return None
+            columns += [
+                sa.func.sum(table.c[self.get_sum_column(col_name)]),
+                sa.func.sum(table.c[self.get_count_column(col_name)]),
+            ]
+        rollup_filters = self._get_rollup_filters(filters)
+        if rollup_filters is None:
+            return None
+        group_column = getattr(self.rollup_model, group_by)
+        query = self.datamodel._apply_inner_all(
+            session.query(self.rollup_model), rollup_filters, aliases_mapping={}
+        )
+        query = (
+            query.with_entities(group_column, *columns)
+            .group_by(group_column)
+            .order_by(
+                group_column.desc() if order_direction == "desc" else group_column
+            )
+        )
+        result = []
+        for row in query:
+            group, count, values = row[0], row[1], iter(row[2:])
+            result_row = [group]
+            for aggregate_func, col_name in aggregates:
+                if aggregate_func is aggregate_count:
+                    result_row.append(count)
+                    continue
+                total, values_count = next(values), next(values)
+                if aggregate_func is aggregate_sum:
+                    result_row.append(
+                        self.datamodel._get_aggregate_value(
+                            aggregate_func, self.get_sum_column(col_name), total
+                        )
+                    )
+                elif values_count:
+                    result_row.append(float(total) / values_count)
+                else:
+                    result_row.append(0.0)
+            result.append(result_row)
+        return result
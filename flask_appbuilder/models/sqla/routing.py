@@ -0,0 +1,187 @@
+from contextlib import contextmanager
+from itertools import chain
+import logging
+import threading
+import time
+from typing import Dict, Optional, Type
+
+from flask import has_request_context, session as flask_session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.session import Session as SessionBase
+
+from ..cache import get_model_generation_name
+
+log = logging.getLogger(__name__)
+
+SESSION_WRITES_KEY = "fab_replica_writes"
+""" Key on the primary session info, with the models written on the transaction """
+LAST_WRITES_SESSION_KEY = "_fab_last_writes"
+""" Key on the flask session, with the time of the user's last commit per model """
+
+
+class ReadReplicaRouter(object):
+    """
+        Routes read only interface queries to a replica engine.
+
+        Only operations inside read_only() are routed, and only while:
+
+        - The primary session has no pending or flushed uncommitted writes
+        - The model was not written by this process, or by the current user
+          on any process, for the last read_your_writes_window seconds
+    """
+
+    read_your_writes_window = 5
+    """ Seconds that reads stay on the primary after a commit, 0 disables it """
+
+    def __init__(
+        self,
+        primary_session: SessionBase,
+        replica_engine: Engine,
+        read_your_writes_window: Optional[float] = None,
+    ) -> None:
+        if read_your_writes_window is not None:
+            self.read_your_writes_window = read_your_writes_window
+        self.primary_session = primary_session
+        self.replica_engine = replica_engine
+        self.session = scoped_session(sessionmaker(bind=replica_engine))
+        self._local = threading.local()
+        self._last_writes: Dict[str, float] = {}
+        # Listeners of a scoped session are set on its session class,
+        # shared by all the scoped sessions of the same factory
+        self._listeners = [
+            ("after_flush", self._after_flush),
+            ("after_bulk_update", self._after_bulk),
+            ("after_bulk_delete", self._after_bulk),
+            ("after_commit", self._after_commit),
+            ("after_rollback", self._after_rollback),
+        ]
+        for name, listener in self._listeners:
+            event.listen(primary_session, name, listener)
+
+    def dispose(self) -> None:
+        """
+            Removes the primary session listeners, and disposes
+            the replica sessions and engine
+        """
+        for name, listener in self._listeners:
+            if event.contains(self.primary_session, name, listener):
+                event.remove(self.primary_session, name, listener)
+        self.session.remove()
+        self.replica_engine.dispose()
+
+    def _is_primary(self, session: SessionBase) -> bool:
+        primary = self.primary_session
+        if isinstance(primary, scoped_session):
+            return primary.registry.has() and primary.registry() is session
+        return primary is session
+
+    @staticmethod
+    def _add_session_write(session: SessionBase, model: Type) -> None:
+        session.info.setdefault(SESSION_WRITES_KEY, set()).add(
+            get_model_generation_name(model)
+        )
+
+    def _after_flush(self, session: SessionBase, flush_context) -> None:
+        if not self._is_primary(session):
+            return
+        # Models may define __eq__ without __hash__, collect their types only
+        models = set(
+            type(item) for item in chain(session.new, session.dirty, session.deleted)
+        )
+        for model in models:
+            self._add_session_write(session, model)
+
+    def _after_bulk(self, context) -> None:
+        if context.mapper is not None and self._is_primary(context.session):
+            self._add_session_write(context.session, context.mapper.class_)
+
+    def _after_commit(self, session: SessionBase) -> None:
+        if not self._is_primary(session):
+            return
+        names = session.info.pop(SESSION_WRITES_KEY, None)
+        if not names:
+            return
+        now = time.time()
+        for name in names:
+            self._last_writes[name] = now
+        if has_request_context():
+            last_writes = {
+                name: timestamp
+                for name, timestamp in flask_session.get(
+                    LAST_WRITES_SESSION_KEY, {}
+                ).items()
+                if self._is_recent(timestamp)
+            }
+            last_writes.update(dict.fromkeys(names, now))
+            try:
+                flask_session[LAST_WRITES_SESSION_KEY] = last_writes
+            except RuntimeError:
+                # Null session, no secret key configured
+                pass
+
+    def _after_rollback(self, session: SessionBase) -> None:
+        if self._is_primary(session):
+            session.info.pop(SESSION_WRITES_KEY, None)
+
+    @contextmanager
+    def read_only(self):
+        """
+            Marks the enclosed operations as read only,
+            so that they may be routed to the replica
+        """
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+
+    @property
+    def is_read_only(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    def _is_recent(self, timestamp: Optional[float]) -> bool:
+        return (
+            timestamp is not None
+            and time.time() - timestamp < self.read_your_writes_window
+        )
+
+    def use_replica(self, model: Type) -> bool:
+        """
+            Returns True if a read of model should go to the replica
+        """
+        # The replica mirrors the default database, other binds stay put
+        if not self.is_read_only or getattr(model, "__bind_key__", None):
+            return False
+        primary = self.primary_session
+        if (
+            primary.info.get(SESSION_WRITES_KEY)
+            or primary.new
+            or primary.deleted
+            or primary.dirty
+        ):
+            return False
+        name = get_model_generation_name(model)
+        if self._is_recent(self._last_writes.get(name)):
+            return False
+        if has_request_context() and self._is_recent(
+            flask_session.get(LAST_WRITES_SESSION_KEY, {}).get(name)
+        ):
+            return False
+        return True
+
+    def get_session(self, model: Type) -> SessionBase:
+        """
+            Returns the session to use for reading model
+        """
+        if self.use_replica(model):
+            return self.session
+        return self.primary_session
+
+    def remove(self, *args) -> None:
+        """
+            Disposes the replica session of the current scope,
+            registered on app context teardown
+        """
+        self.session.remove()
@@ -436,6 +436,18 @@ class BaseSecurityManager(AbstractSecurityManager):
         elif current_user_jwt:
             return current_user_jwt
 
+    def get_user_roles_fingerprint(self) -> str:
+        """
+            Returns a stable string that identifies the set of roles
+            of the current user, or the public role for anonymous access.
+            Users with the same roles get the same fingerprint, so it can
+            be used to safely share computed results between them
+        """
+        user = self.current_user
+        if user is None:
+            return self.auth_role_public
+        return ",".join(sorted(role.name for role in user.roles))
+
     def oauth_user_info_getter(self, f):
         """
             Decorator function to be the OAuth user info getter
@@ -1144,13 +1156,7 @@ class BaseSecurityManager(AbstractSecurityManager):
             else:
                 db_role_ids.append(role.id)
         # Then check against database-stored roles
-        pvms_names = [
-            pvm.view_menu.name
-            for pvm in self.find_roles_permission_view_menus(
-                permission_name, db_role_ids
-            )
-        ]
-        result.update(pvms_names)
+        result.update(self.find_roles_view_menu_names(permission_name, db_role_ids))
         return result
 
     def has_access(self, permission_name, view_name):
@@ -1558,6 +1564,18 @@ class BaseSecurityManager(AbstractSecurityManager):
         """
         raise NotImplementedError
 
+    def find_roles_view_menu_names(
+        self, permission_name: str, role_ids: List[int]
+    ) -> Set[str]:
+        """
+            Returns the names of the view menus with a permission
+            on any of a group of roles
+        """
+        return set(
+            pvm.view_menu.name
+            for pvm in self.find_roles_permission_view_menus(permission_name, role_ids)
+        )
+
     def add_permission(self, name):
         """
             Adds a permission to the backend, model permission
@@ -1,16 +1,67 @@
 import logging
-from typing import List, Optional
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 import uuid
 
+from bson import ObjectId
+from flask import g, has_request_context
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from werkzeug.security import generate_password_hash
 
-from .models import Permission, PermissionView, RegisterUser, Role, User, ViewMenu
+from .models import (
+    Permission,
+    PermissionView,
+    RegisterUser,
+    Role,
+    SecurityVersion,
+    User,
+    ViewMenu,
+)
 from ..manager import BaseSecurityManager
 from ... import const as c
 from ...models.mongoengine.interface import MongoEngineInterface
 
 log = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+""" Mongo error code of unique index violations """
+
+PERMISSIONS_VERSION = "permissions"
+""" SecurityVersion name of the roles and permissions version """
+
+
+class SecurityMongoEngineInterface(MongoEngineInterface):
+    """
+        MongoEngineInterface for the roles and permissions models,
+        bumps the permissions version after each change
+    """
+
+    def __init__(self, obj, security_manager):
+        self.security_manager = security_manager
+        super(SecurityMongoEngineInterface, self).__init__(obj)
+
+    def get_related_interface(self, col_name):
+        return self.__class__(self.get_related_model(col_name), self.security_manager)
+
+    def add(self, item):
+        if super(SecurityMongoEngineInterface, self).add(item):
+            self.security_manager.bump_permissions_version()
+            return True
+        return False
+
+    def edit(self, item):
+        if super(SecurityMongoEngineInterface, self).edit(item):
+            self.security_manager.bump_permissions_version()
+            return True
+        return False
+
+    def delete(self, item):
+        if super(SecurityMongoEngineInterface, self).delete(item):
+            self.security_manager.bump_permissions_version()
+            return True
+        return False
+
 
 class SecurityManager(BaseSecurityManager):
     """
@@ -29,6 +80,7 @@ class SecurityManager(BaseSecurityManager):
     viewmenu_model = ViewMenu
     permissionview_model = PermissionView
     registeruser_model = RegisterUser
+    securityversion_model = SecurityVersion
 
     def __init__(self, appbuilder):
         """
@@ -37,6 +89,8 @@ class SecurityManager(BaseSecurityManager):
                 F.A.B AppBuilder main object
         """
         super(SecurityManager, self).__init__(appbuilder)
+        self._role_permissions = None
+        self._role_permissions_lock = threading.Lock()
         user_datamodel = MongoEngineInterface(self.user_model)
         if self.auth_type == c.AUTH_DB:
             self.userdbmodelview.datamodel = user_datamodel
@@ -55,11 +109,17 @@ class SecurityManager(BaseSecurityManager):
                 self.registeruser_model
             )
 
-        self.rolemodelview.datamodel = MongoEngineInterface(self.role_model)
-        self.permissionmodelview.datamodel = MongoEngineInterface(self.permission_model)
-        self.viewmenumodelview.datamodel = MongoEngineInterface(self.viewmenu_model)
-        self.permissionviewmodelview.datamodel = MongoEngineInterface(
-            self.permissionview_model
+        self.rolemodelview.datamodel = SecurityMongoEngineInterface(
+            self.role_model, self
+        )
+        self.permissionmodelview.datamodel = SecurityMongoEngineInterface(
+            self.permission_model, self
+        )
+        self.viewmenumodelview.datamodel = SecurityMongoEngineInterface(
+            self.viewmenu_model, self
+        )
+        self.permissionviewmodelview.datamodel = SecurityMongoEngineInterface(
+            self.permissionview_model, self
         )
         self.create_db()
 
@@ -163,6 +223,7 @@ class SecurityManager(BaseSecurityManager):
             try:
                 role = self.role_model(name=name)
                 role.save()
+                self.bump_permissions_version()
                 log.info(c.LOGMSG_INF_SEC_ADD_ROLE.format(name))
                 return role
             except Exception as e:
@@ -172,6 +233,7 @@ class SecurityManager(BaseSecurityManager):
     def update_role(self, pk, name: str) -> Optional[Role]:
         try:
             role = self.role_model.objects(id=pk).update(name=name)
+            self.bump_permissions_version()
             log.info(c.LOGMSG_INF_SEC_UPD_ROLE.format(role))
         except Exception as e:
             log.error(c.LOGMSG_ERR_SEC_UPD_ROLE.format(str(e)))
@@ -183,8 +245,11 @@ class SecurityManager(BaseSecurityManager):
     def get_all_roles(self):
         return self.role_model.objects
 
+    def get_public_role(self):
+        return self.find_role(self.auth_role_public)
+
     def get_public_permissions(self):
-        role = self.find_role(self.auth_role_public)
+        role = self.get_public_role()
         return role.permissions
 
     def find_permission(self, name):
@@ -196,16 +261,54 @@ class SecurityManager(BaseSecurityManager):
     def exist_permission_on_roles(
         self, view_name: str, permission_name: str, role_ids: List[int]
     ) -> bool:
-        for role_id in role_ids:
-            role = self.role_model.objects(id=role_id).first()
-            permissions = role.permissions
-            if permissions:
-                for permission in permissions:
-                    if (view_name == permission.view_menu.name) and (
-                        permission_name == permission.permission.name
-                    ):
-                        return True
-        return False
+        """
+            Method to efficiently check if a certain permission exists
+            on a list of role id's, using the cached role permissions.
+            This is used by `has_access`
+
+        :param view_name: The view's name to check if exists on one of the roles
+        :param permission_name: The permission name to check if exists
+        :param role_ids: a list of Role ids
+        :return: Boolean
+        """
+        role_permissions = self.get_role_permissions()
+        return any(
+            (permission_name, view_name) in role_permissions.get(role_id, ())
+            for role_id in role_ids
+        )
+
+    def find_roles_permission_view_menus(
+        self, permission_name: str, role_ids: List[int]
+    ):
+        permission = self.find_permission(permission_name)
+        roles = self.role_model._get_collection().find(
+            {"_id": {"$in": list(role_ids)}}, {"permissions": 1}
+        )
+        pv_ids = set(pv_id for role in roles for pv_id in role.get("permissions", []))
+        return self.permissionview_model.objects(
+            id__in=list(pv_ids), permission=permission
+        )
+
+    def find_roles_view_menu_names(
+        self, permission_name: str, role_ids: List[int]
+    ) -> Set[str]:
+        role_permissions = self.get_role_permissions()
+        return set(
+            view_menu_name
+            for role_id in role_ids
+            for _permission_name, view_menu_name in role_permissions.get(role_id, ())
+            if _permission_name == permission_name
+        )
+
+    def is_item_public(self, permission_name, view_name):
+        """
+            Check if view has public permissions, using the
+            cached role permissions
+        """
+        role_id = self.get_role_ids_by_name().get(self.auth_role_public)
+        if role_id is None:
+            return False
+        return self.exist_permission_on_roles(view_name, permission_name, [role_id])
 
     def add_permission(self, name):
         """
@@ -235,6 +338,7 @@ class SecurityManager(BaseSecurityManager):
         if perm:
             try:
                 perm.delete()
+                self.bump_permissions_version()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMISSION.format(str(e)))
 
@@ -280,6 +384,7 @@ class SecurityManager(BaseSecurityManager):
         if obj:
             try:
                 obj.delete()
+                self.bump_permissions_version()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMISSION.format(str(e)))
 
@@ -339,6 +444,7 @@ class SecurityManager(BaseSecurityManager):
             pv = self.find_permission_view_menu(permission_name, view_menu_name)
             # delete permission on view
             pv.delete()
+            self.bump_permissions_version()
             if not cascade:
                 return
             # if no more permission on permission view, delete permission
@@ -376,6 +482,7 @@ class SecurityManager(BaseSecurityManager):
             try:
                 role.permissions.append(perm_view)
                 role.save()
+                self.bump_permissions_version()
                 log.info(
                     c.LOGMSG_INF_SEC_ADD_PERMROLE.format(str(perm_view), role.name)
                 )
@@ -395,8 +502,290 @@ class SecurityManager(BaseSecurityManager):
             try:
                 role.permissions.remove(perm_view)
                 role.save()
+                self.bump_permissions_version()
                 log.info(
                     c.LOGMSG_INF_SEC_DEL_PERMROLE.format(str(perm_view), role.name)
                 )
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMROLE.format(str(e)))
+
+    def add_permissions_view(self, base_permissions, view_menu):
+        """
+            Adds a permission on a view menu to the backend, the existing
+            permissions are diffed with base_permissions, and the changes
+            written with bulk writes
+
+            :param base_permissions:
+                list of permissions from view (all exposed methods):
+                 'can_add','can_edit' etc...
+            :param view_menu:
+                name of the view or menu to add
+        """
+        self._sync_permissions_view(base_permissions, view_menu, delete_missing=True)
+
+    def add_permissions_menu(self, view_menu_name):
+        """
+            Adds menu_access to menu on permission_view_menu
+
+            :param view_menu_name:
+                The menu name
+        """
+        self._sync_permissions_view(["menu_access"], view_menu_name)
+
+    @staticmethod
+    def _insert_many(collection, docs: List[Dict]) -> Set:
+        """
+            Inserts docs with a bulk write, returns the ids of the docs
+            that already existed, by their unique index
+        """
+        try:
+            collection.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            return set(docs[error["index"]]["_id"] for error in errors)
+        return set()
+
+    def _add_names(self, model, names: List[str]) -> Dict[str, object]:
+        """
+            Returns the ids of the documents of model by name,
+            inserting the missing ones
+        """
+        collection = model._get_collection()
+        ids = {
+            doc["name"]: doc["_id"]
+            for doc in collection.find({"name": {"$in": names}}, {"name": 1})
+        }
+        docs = [{"_id": ObjectId(), "name": name} for name in names if name not in ids]
+        if docs:
+            existing = self._insert_many(collection, docs)
+            ids.update((doc["name"], doc["_id"]) for doc in docs)
+            if existing:
+                # Inserted meanwhile by another process
+                missing = [doc["name"] for doc in docs if doc["_id"] in existing]
+                for doc in collection.find({"name": {"$in": missing}}, {"name": 1}):
+                    ids[doc["name"]] = doc["_id"]
+        return ids
+
+    def _sync_permissions_view(
+        self, permission_names: List[str], view_menu_name: str, delete_missing=False
+    ) -> None:
+        permission_names = list(dict.fromkeys(permission_names))
+        view_menu_id = self._add_names(self.viewmenu_model, [view_menu_name])[
+            view_menu_name
+        ]
+        pv_collection = self.permissionview_model._get_collection()
+        pvs = list(pv_collection.find({"view_menu": view_menu_id}))
+        permission_ids = [pv["permission"] for pv in pvs if pv.get("permission")]
+        names = {
+            doc["_id"]: doc["name"]
+            for doc in self.permission_model._get_collection().find(
+                {"_id": {"$in": permission_ids}}, {"name": 1}
+            )
+        }
+        pv_ids = {
+            names[pv["permission"]]: pv["_id"]
+            for pv in pvs
+            if pv.get("permission") in names
+        }
+        changed = False
+
+        new_names = [name for name in permission_names if name not in pv_ids]
+        if new_names:
+            new_permission_ids = self._add_names(self.permission_model, new_names)
+            docs = [
+                {
+                    "_id": ObjectId(),
+                    "permission": new_permission_ids[name],
+                    "view_menu": view_menu_id,
+                }
+                for name in new_names
+            ]
+            self._insert_many(pv_collection, docs)
+            for name, doc in zip(new_names, docs):
+                pv_ids[name] = doc["_id"]
+                log.info(
+                    c.LOGMSG_INF_SEC_ADD_PERMVIEW.format(
+                        "{0} on {1}".format(name, view_menu_name)
+                    )
+                )
+            changed = True
+
+        role_collection = self.role_model._get_collection()
+        if delete_missing:
+            deleted = {
+                name: pv_id
+                for name, pv_id in pv_ids.items()
+                if name not in permission_names
+            }
+            if deleted:
+                deleted_pv_ids = list(deleted.values())
+                role_collection.update_many(
+                    {"permissions": {"$in": deleted_pv_ids}},
+                    {"$pullAll": {"permissions": deleted_pv_ids}},
+                )
+                pv_collection.delete_many({"_id": {"$in": deleted_pv_ids}})
+                # Delete the permissions that are no longer on any view
+                deleted_permission_ids = [
+                    permission_id
+                    for permission_id, name in names.items()
+                    if name in deleted
+                ]
+                used_permission_ids = pv_collection.distinct(
+                    "permission", {"permission": {"$in": deleted_permission_ids}}
+                )
+                self.permission_model._get_collection().delete_many(
+                    {
+                        "_id": {
+                            "$in": [
+                                permission_id
+                                for permission_id in deleted_permission_ids
+                                if permission_id not in used_permission_ids
+                            ]
+                        }
+                    }
+                )
+                for name in deleted:
+                    log.info(c.LOGMSG_INF_SEC_DEL_PERMVIEW.format(name, view_menu_name))
+                changed = True
+
+        if self.auth_role_admin not in self.builtin_roles:
+            # Role Admin must have all permissions
+            result = role_collection.update_one(
+                {"name": self.auth_role_admin},
+                {
+                    "$addToSet": {
+                        "permissions": {
+                            "$each": [pv_ids[name] for name in permission_names]
+                        }
+                    }
+                },
+            )
+            changed = changed or bool(result.modified_count)
+        if changed:
+            self.bump_permissions_version()
+
+    """
+    -------------------
+     PERMISSIONS CACHE
+    -------------------
+    """
+
+    def get_permissions_version(self) -> int:
+        """
+            Returns the version of the roles and permissions, read
+            once per request from the SecurityVersion collection
+        """
+        if has_request_context():
+            version = getattr(g, "_fab_permissions_version", None)
+            if version is None:
+                version = g._fab_permissions_version = self._read_permissions_version()
+            return version
+        return self._read_permissions_version()
+
+    def _read_permissions_version(self) -> int:
+        doc = self.securityversion_model._get_collection().find_one(
+            {"_id": PERMISSIONS_VERSION}
+        )
+        return doc["version"] if doc else 0
+
+    def bump_permissions_version(self) -> int:
+        """
+            Invalidates the cached role permissions of all processes,
+            call it if you change roles or permissions directly
+            on the database
+        """
+        doc = self.securityversion_model._get_collection().find_one_and_update(
+            {"_id": PERMISSIONS_VERSION},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if has_request_context():
+            g._fab_permissions_version = doc["version"]
+        return doc["version"]
+
+    def _get_compiled_permissions(self):
+        version = self.get_permissions_version()
+        compiled = self._role_permissions
+        if compiled is not None and compiled[0] == version:
+            return compiled
+        with self._role_permissions_lock:
+            compiled = self._role_permissions
+            if compiled is None or compiled[0] != version:
+                compiled = (version,) + self._compile_role_permissions()
+                self._role_permissions = compiled
+        return compiled
+
+    def get_role_permissions(self) -> Dict[object, FrozenSet[Tuple[str, str]]]:
+        """
+            Returns the (permission name, view menu name) pairs
+            of each role id, cached until the permissions version changes
+        """
+        return self._get_compiled_permissions()[1]
+
+    def get_role_ids_by_name(self) -> Dict[str, object]:
+        """
+            Returns the role ids by role name, cached
+            until the permissions version changes
+        """
+        return self._get_compiled_permissions()[2]
+
+    def _compile_role_permissions(self):
+        """
+            Reads the permissions of all roles with one aggregation
+        """
+        role_collection = self.role_model._get_collection()
+        role_ids = {
+            role["name"]: role["_id"] for role in role_collection.find({}, {"name": 1})
+        }
+        pipeline = [
+            {"$project": {"permissions": 1}},
+            {"$unwind": "$permissions"},
+            {
+                "$lookup": {
+                    "from": self.permissionview_model._get_collection_name(),
+                    "localField": "permissions",
+                    "foreignField": "_id",
+                    "as": "permission_view",
+                }
+            },
+            {"$unwind": "$permission_view"},
+            {
+                "$lookup": {
+                    "from": self.permission_model._get_collection_name(),
+                    "localField": "permission_view.permission",
+                    "foreignField": "_id",
+                    "as": "permission",
+                }
+            },
+            {"$unwind": "$permission"},
+            {
+                "$lookup": {
+                    "from": self.viewmenu_model._get_collection_name(),
+                    "localField": "permission_view.view_menu",
+                    "foreignField": "_id",
+                    "as": "view_menu",
+                }
+            },
+            {"$unwind": "$view_menu"},
+            {
+                "$group": {
+                    "_id": "$_id",
+                    "permissions": {
+                        "$push": {
+                            "permission": "$permission.name",
+                            "view_menu": "$view_menu.name",
+                        }
+                    },
+                }
+            },
+        ]
+        role_permissions = {
+            role["_id"]: frozenset(
+                (item["permission"], item["view_menu"]) for item in role["permissions"]
+            )
+            for role in role_collection.aggregate(pipeline)
+        }
+        return role_permissions, role_ids
@@ -52,6 +52,17 @@ class PermissionView(Document):
         return str(self.permission).replace("_", " ") + " on " + str(self.view_menu)
 
 
+class SecurityVersion(Document):
+    """
+        Version counters of the security data, bumped on each change
+        of roles or permissions, so that all processes invalidate
+        their cached role permissions
+    """
+
+    name = StringField(primary_key=True)
+    version = IntField(default=0)
+
+
 class Role(Document):
     meta = {
         "allow_inheritance": True
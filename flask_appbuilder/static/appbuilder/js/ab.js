@@ -42,6 +42,36 @@ function loadSelectData() {
 }
 
 
+//----------------------------------------------------
+// Select2 that pages and searches related choices
+// from the server while the user types
+//----------------------------------------------------
+function loadSelectLazy() {
+    $(".my_select2_lazy").each(function( index ) {
+        var elem = $(this);
+        elem.select2({
+            placeholder: elem.data('placeholder'),
+            allowClear: elem.data('allow-clear'),
+            multiple: elem.attr('multiple') !== undefined,
+            minimumInputLength: 0,
+            ajax: {
+                url: elem.attr('endpoint'),
+                dataType: 'json',
+                quietMillis: 250,
+                data: function (term, page) {
+                    return {q: term, page: page - 1, page_size: elem.attr('page_size')};
+                },
+                results: function (data, page) {
+                    return data;
+                }
+            },
+            initSelection: function (element, callback) {
+                callback(elem.data('selected'));
+            }
+        });
+    });
+}
+
 //---------------------------------------
 // Setup date time modal views, select2
 //---------------------------------------
@@ -54,6 +84,7 @@ $(function() {
     $(".my_select2.readonly").select2("readonly", true);
     loadSelectData();
     loadSelectDataSlave();
+    loadSelectLazy();
     $("a").tooltip({container:'.row', 'placement': 'bottom'});
 });
 
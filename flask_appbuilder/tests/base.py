@@ -1,4 +1,7 @@
 import json
+import os
+import shutil
+import tempfile
 import unittest
 
 from flask_appbuilder.const import (
@@ -8,8 +11,43 @@ from flask_appbuilder.const import (
     API_SECURITY_VERSION,
 )
 
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+
 
 class FABTestCase(unittest.TestCase):
+    def setup_app(self, tmp_dir=None, **config):
+        """
+            Creates an app and its tables on a new sqlite file database,
+            with an admin user. Sets tmp_dir, app, db, appbuilder and client
+
+        :param tmp_dir: The database directory, a new temporary one by default,
+            removed by teardown_app
+        :param config: Config keys to set before the app is initialized
+        """
+        from flask import Flask
+        from flask_appbuilder import AppBuilder, SQLA
+
+        self.tmp_dir = tmp_dir or tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.from_object("flask_appbuilder.tests.config_api")
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
+            self.tmp_dir, "app.db"
+        )
+        self.app.config.update(config)
+        self.db = SQLA(self.app)
+        self.db.create_all()
+        self.appbuilder = AppBuilder(self.app, self.db.session)
+        self.create_admin_user(self.appbuilder, USERNAME_ADMIN, PASSWORD_ADMIN)
+        self.client = self.app.test_client()
+
+    def teardown_app(self):
+        """
+            Disposes the app created by setup_app and removes its database
+        """
+        self.db.session.remove()
+        self.db.get_engine().dispose()
+        shutil.rmtree(self.tmp_dir)
+
     @staticmethod
     def auth_client_get(client, token, uri):
         return client.get(uri, headers={"Authorization": "Bearer {}".format(token)})
@@ -24,6 +62,14 @@ class FABTestCase(unittest.TestCase):
             uri, json=json, headers={"Authorization": "Bearer {}".format(token)}
         )
 
+    @staticmethod
+    def auth_client_patch(client, token, uri, json, headers=None):
+        return client.patch(
+            uri,
+            json=json,
+            headers={"Authorization": "Bearer {}".format(token), **(headers or {})},
+        )
+
     @staticmethod
     def auth_client_post(client, token, uri, json):
         return client.post(
@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+from unittest import mock
 
 from flask_appbuilder import ModelRestApi, SQLA
 from flask_appbuilder.const import (
@@ -29,6 +30,11 @@ from flask_appbuilder.const import (
     API_SHOW_TITLE_RIS_KEY,
     API_URI_RIS_KEY,
 )
+from flask_appbuilder.models.cache import (
+    FileSystemCache,
+    get_model_generation_name,
+    MemoryCache,
+)
 from flask_appbuilder.models.sqla.filters import FilterGreater, FilterSmaller
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 import prison
@@ -373,6 +379,34 @@ class APITestCase(FABTestCase):
 
         self.appbuilder.add_api(Model1ApiIncludeRoutes)
 
+        class Model1ApiCoalescing(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+            list_query_coalescing = True
+
+        self.model1apicoalescing = self.appbuilder.add_api(Model1ApiCoalescing)
+
+        class Model1ApiCached(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+            cache_backend = MemoryCache()
+
+        self.model1apicached = self.appbuilder.add_api(Model1ApiCached)
+
+        class Model1ApiBulk(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+            allow_bulk_operations = True
+
+        self.appbuilder.add_api(Model1ApiBulk)
+
+        class Model1ApiBulkHooks(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+            allow_bulk_operations = True
+            deleted = []
+
+            def pre_delete(self, item):
+                self.deleted.append(item.field_string)
+
+        self.model1apibulkhooks = self.appbuilder.add_api(Model1ApiBulkHooks)
+
     def tearDown(self):
         self.appbuilder.get_session.close()
         engine = self.db.session.get_bind(mapper=None, clause=None)
@@ -883,6 +917,241 @@ class APITestCase(FABTestCase):
         # Tests data result default page size
         self.assertEqual(len(data[API_RESULT_RES_KEY]), self.model1api.page_size)
 
+    def test_get_list_coalescing(self):
+        """
+            REST Api: Test get list with query coalescing
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        api = self.model1apicoalescing
+
+        arguments = {
+            API_FILTERS_RIS_KEY: [{"col": "field_integer", "opr": "gt", "value": 2}],
+            "order_column": "field_integer",
+            "order_direction": "asc",
+        }
+        uri = f"api/v1/model1apicoalescing/?q={prison.dumps(arguments)}"
+        rv = self.auth_client_get(client, token, uri)
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["count"], MODEL1_DATA_SIZE - 3)
+        self.assertEqual(data[API_RESULT_RES_KEY][0]["field_integer"], 3)
+        self.assertEqual(len(data["ids"]), len(data[API_RESULT_RES_KEY]))
+
+        stats = api.list_query_single_flight.stats
+        self.assertEqual(stats["calls"], 1)
+        self.assertEqual(stats["executed"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_get_list_cache(self):
+        """
+            REST Api: Test get list cache and write invalidation
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        cache = self.model1apicached.cache_backend
+
+        uri = "api/v1/model1apicached/"
+        rv = self.auth_client_get(client, token, uri)
+        self.assertEqual(rv.status_code, 200)
+        count = json.loads(rv.data.decode("utf-8"))["count"]
+        self.assertEqual(len(cache), 1)
+
+        # Writes made outside the interface are not seen
+        session = self.appbuilder.get_session
+        model = Model1(field_string="test_cache", field_integer=0)
+        session.add(model)
+        session.commit()
+        model_pk = model.id
+        rv = self.auth_client_get(client, token, uri)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["count"], count)
+
+        # Writes made through the interface invalidate the cache
+        rv = self.auth_client_delete(client, token, f"{uri}{model_pk}")
+        self.assertEqual(rv.status_code, 200)
+        item = dict(field_string="test_cache", field_integer=0)
+        rv = self.auth_client_post(client, token, uri, item)
+        self.assertEqual(rv.status_code, 201)
+        pk = json.loads(rv.data.decode("utf-8"))["id"]
+        rv = self.auth_client_get(client, token, uri)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["count"], count + 1)
+
+        # Revert data changes
+        rv = self.auth_client_delete(client, token, f"{uri}{pk}")
+        self.assertEqual(rv.status_code, 200)
+        rv = self.auth_client_get(client, token, uri)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["count"], count)
+
+    def test_get_item_filesystem_cache(self):
+        """
+            REST Api: Test get item with a filesystem cache
+        """
+        import shutil
+        import tempfile
+
+        cache_dir = tempfile.mkdtemp()
+
+        class Model1ApiFileCached(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+            cache_backend = FileSystemCache(cache_dir)
+
+        self.appbuilder.add_api(Model1ApiFileCached)
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        try:
+            model = (
+                self.appbuilder.get_session.query(Model1)
+                .filter_by(field_string="test2")
+                .one_or_none()
+            )
+            pk = model.id
+            uri = f"api/v1/model1apifilecached/{pk}"
+            for _ in range(2):
+                rv = self.auth_client_get(client, token, uri)
+                data = json.loads(rv.data.decode("utf-8"))
+                self.assertEqual(rv.status_code, 200)
+                self.assertEqual(data[API_RESULT_RES_KEY]["field_string"], "test2")
+
+            item = dict(field_string="test_cache", field_integer=2)
+            rv = self.auth_client_put(client, token, uri, item)
+            self.assertEqual(rv.status_code, 200)
+            rv = self.auth_client_get(client, token, uri)
+            data = json.loads(rv.data.decode("utf-8"))
+            self.assertEqual(data[API_RESULT_RES_KEY]["field_string"], "test_cache")
+            # A new backend on the same directory shares the generations
+            cache = FileSystemCache(cache_dir)
+            self.assertEqual(
+                cache.get_generation(get_model_generation_name(Model1)),
+                Model1ApiFileCached.cache_backend.get_generation(
+                    get_model_generation_name(Model1)
+                ),
+            )
+        finally:
+            shutil.rmtree(cache_dir)
+            # Revert data changes
+            insert_model1(self.appbuilder.get_session, i=pk - 1)
+
+    def test_filesystem_cache_generation(self):
+        """
+            REST Api: Test concurrent filesystem cache generation bumps
+        """
+        import shutil
+        import tempfile
+        import threading
+
+        def bump(cache):
+            for _ in range(25):
+                cache.bump_generation("model")
+
+        def assert_generation_bumps():
+            cache_dir = tempfile.mkdtemp()
+            try:
+                caches = [FileSystemCache(cache_dir) for _ in range(4)]
+                threads = [
+                    threading.Thread(target=bump, args=(cache,)) for cache in caches
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join(10)
+                self.assertEqual(caches[0].get_generation("model"), 100)
+                filename = caches[0]._get_generation_filename("model")
+                self.assertEqual(
+                    [
+                        name
+                        for name in os.listdir(cache_dir)
+                        if not name.endswith(".lock")
+                    ],
+                    [os.path.basename(filename)],
+                )
+
+                # Locks left by dead processes are broken
+                open(f"{filename}.lock", "w").close()
+                os.utime(f"{filename}.lock", (0, 0))
+                self.assertEqual(caches[0].bump_generation("model"), 101)
+            finally:
+                shutil.rmtree(cache_dir)
+
+        assert_generation_bumps()
+        # Lock files, where flock is not available
+        with mock.patch("flask_appbuilder.models.cache.fcntl", None):
+            assert_generation_bumps()
+
+        # A lock taken meanwhile by another waiter is given back
+        cache_dir = tempfile.mkdtemp()
+        try:
+            lock_filename = os.path.join(cache_dir, "generation.lock")
+            open(lock_filename, "w").close()
+            FileSystemCache(cache_dir)._break_lock(lock_filename)
+            self.assertEqual(os.listdir(cache_dir), ["generation.lock"])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_memory_cache_lru(self):
+        """
+            REST Api: Test memory cache LRU eviction and timeout
+        """
+        cache = MemoryCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        cache.set("d", 4, timeout=-1)
+        self.assertIsNone(cache.get("d"))
+        generation = cache.get_generation("model")
+        self.assertEqual(cache.bump_generation("model"), generation + 1)
+
+    def test_single_flight(self):
+        """
+            REST Api: Test single flight shares concurrent identical calls
+        """
+        import threading
+        import time
+        from flask_appbuilder.utils.singleflight import SingleFlight
+
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow_call():
+            started.set()
+            release.wait(5)
+            return ["result"]
+
+        def call():
+            results.append(single_flight.do("key", slow_call))
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        try:
+            while single_flight.stats["coalesced"] < 3:
+                self.assertLess(time.monotonic(), deadline, "Calls were not coalesced")
+                time.sleep(0.01)
+        finally:
+            release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [["result"]] * 4)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = single_flight.stats
+        self.assertEqual(stats["executed"], 1)
+        self.assertEqual(stats["coalesced"], 3)
+        self.assertEqual(stats["hit_rate"], 0.75)
+        # Nothing is kept after the call
+        self.assertEqual(single_flight.do("key", lambda: 1), 1)
+
     def test_get_list_dotted_mo_field(self):
         """
             REST Api: Test get list with dotted M-O related field
@@ -1886,6 +2155,299 @@ class APITestCase(FABTestCase):
         # Revert data changes
         insert_model1(self.appbuilder.get_session, i=pk - 1)
 
+    def test_patch_item(self):
+        """
+            REST Api: Test patch item updates only the sent columns
+        """
+        from sqlalchemy import event
+
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        model1 = (
+            self.appbuilder.get_session.query(Model1)
+            .filter_by(field_string="test2")
+            .one_or_none()
+        )
+        pk = model1.id
+        field_integer = model1.field_integer
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.db.get_engine()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            uri = f"api/v1/model1api/{pk}"
+            rv = self.auth_client_patch(client, token, uri, {"field_float": 1.5})
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data[API_RESULT_RES_KEY]["field_float"], 1.5)
+        self.assertEqual(data[API_RESULT_RES_KEY]["field_integer"], field_integer)
+        updates = [
+            statement
+            for statement in statements
+            if statement.startswith("UPDATE model1")
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("SET field_float=", updates[0])
+        self.assertNotIn("field_string", updates[0])
+        self.assertNotIn("field_integer", updates[0])
+
+        model = self.db.session.query(Model1).get(pk)
+        self.assertEqual(model.field_string, "test2")
+        self.assertEqual(model.field_float, 1.5)
+
+        # Revert data changes
+        insert_model1(self.appbuilder.get_session, i=pk - 1)
+
+    def test_patch_item_minimal(self):
+        """
+            REST Api: Test patch item with a no content response
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        model1 = (
+            self.appbuilder.get_session.query(Model1)
+            .filter_by(field_string="test2")
+            .one_or_none()
+        )
+        pk = model1.id
+        uri = f"api/v1/model1api/{pk}"
+        rv = self.auth_client_patch(
+            client,
+            token,
+            uri,
+            {"field_string": "test_Patch"},
+            headers={"Prefer": "return=minimal"},
+        )
+        self.assertEqual(rv.status_code, 204)
+        self.assertEqual(rv.data, b"")
+        model = self.db.session.query(Model1).get(pk)
+        self.assertEqual(model.field_string, "test_Patch")
+
+        # Revert data changes
+        insert_model1(self.appbuilder.get_session, i=pk - 1)
+
+    def test_patch_item_validation(self):
+        """
+            REST Api: Test patch item validation, not found and excluded cols
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        model1 = (
+            self.appbuilder.get_session.query(Model1)
+            .filter_by(field_string="test2")
+            .one_or_none()
+        )
+        pk = model1.id
+        uri = f"api/v1/model1api/{pk}"
+        rv = self.auth_client_patch(client, token, uri, {"field_integer": "a"})
+        self.assertEqual(rv.status_code, 422)
+        rv = self.auth_client_patch(client, token, uri, {"wrong_col": 1})
+        self.assertEqual(rv.status_code, 422)
+        rv = self.auth_client_patch(client, token, uri, [1])
+        self.assertEqual(rv.status_code, 400)
+        uri = f"api/v1/model1api/{MAX_PAGE_SIZE * 1000}"
+        rv = self.auth_client_patch(client, token, uri, {"field_integer": 1})
+        self.assertEqual(rv.status_code, 404)
+        # Excluded from the base filters
+        uri = f"api/v1/model1apifiltered/{pk}"
+        rv = self.auth_client_patch(client, token, uri, {"field_integer": 1})
+        self.assertEqual(rv.status_code, 404)
+
+        # Read only users can't patch
+        token = self.login(client, USERNAME_READONLY, PASSWORD_READONLY)
+        uri = f"api/v1/model1api/{pk}"
+        rv = self.auth_client_patch(client, token, uri, {"field_integer": 1})
+        self.assertEqual(rv.status_code, 401)
+
+    def test_bulk_update_delete(self):
+        """
+            REST Api: Test bulk update and delete with a single statement
+        """
+        from sqlalchemy import event
+
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        session = self.appbuilder.get_session
+        for i in range(3):
+            session.add(Model1(field_string=f"bulk{i}", field_integer=i))
+        session.commit()
+
+        arguments = {
+            API_FILTERS_RIS_KEY: [{"col": "field_string", "opr": "sw", "value": "bulk"}]
+        }
+        uri = f"api/v1/model1apibulk/?q={prison.dumps(arguments)}"
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.db.get_engine()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            rv = self.auth_client_patch(client, token, uri, {"field_float": 9.5})
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(json.loads(rv.data.decode("utf-8"))["count"], 3)
+        statements = [statement for statement in statements if "model1" in statement]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(
+            statements[0].startswith("UPDATE model1 SET field_float=? WHERE")
+        )
+        models = session.query(Model1).filter(Model1.field_string.like("bulk%"))
+        self.assertEqual([model.field_float for model in models], [9.5] * 3)
+
+        rv = self.auth_client_delete(client, token, uri)
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(json.loads(rv.data.decode("utf-8"))["count"], 3)
+        self.assertEqual(models.count(), 0)
+
+    def test_bulk_delete_hooks(self):
+        """
+            REST Api: Test bulk delete calls hooks for each item
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        session = self.appbuilder.get_session
+        for i in range(2):
+            session.add(Model1(field_string=f"bulk{i}", field_integer=i))
+        session.commit()
+
+        arguments = {
+            API_FILTERS_RIS_KEY: [{"col": "field_string", "opr": "sw", "value": "bulk"}]
+        }
+        uri = f"api/v1/model1apibulkhooks/?q={prison.dumps(arguments)}"
+        rv = self.auth_client_delete(client, token, uri)
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(json.loads(rv.data.decode("utf-8"))["count"], 2)
+        self.assertEqual(sorted(self.model1apibulkhooks.deleted), ["bulk0", "bulk1"])
+        self.assertEqual(
+            session.query(Model1).filter(Model1.field_string.like("bulk%")).count(), 0
+        )
+
+    def test_bulk_operations_validation(self):
+        """
+            REST Api: Test bulk operations are opt in, filtered and protected
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        arguments = {
+            API_FILTERS_RIS_KEY: [{"col": "field_string", "opr": "sw", "value": "x"}]
+        }
+        # Not enabled by default
+        rv = self.auth_client_delete(
+            client, token, f"api/v1/model1api/?q={prison.dumps(arguments)}"
+        )
+        self.assertEqual(rv.status_code, 405)
+        # Filters are mandatory
+        rv = self.auth_client_delete(client, token, "api/v1/model1apibulk/")
+        self.assertEqual(rv.status_code, 400)
+        rv = self.auth_client_delete(
+            client,
+            token,
+            f"api/v1/model1apibulk/?q={prison.dumps({API_FILTERS_RIS_KEY: []})}",
+        )
+        self.assertEqual(rv.status_code, 400)
+        # Unknown operations are never dropped
+        invalid_arguments = {
+            API_FILTERS_RIS_KEY: [{"col": "field_string", "opr": "bogus", "value": "x"}]
+        }
+        invalid_uri = f"api/v1/model1apibulk/?q={prison.dumps(invalid_arguments)}"
+        count = self.appbuilder.get_session.query(Model1).count()
+        rv = self.auth_client_delete(client, token, invalid_uri)
+        self.assertEqual(rv.status_code, 400)
+        rv = self.auth_client_patch(client, token, invalid_uri, {"field_integer": 1})
+        self.assertEqual(rv.status_code, 400)
+        self.assertEqual(self.appbuilder.get_session.query(Model1).count(), count)
+        uri = f"api/v1/model1apibulk/?q={prison.dumps(arguments)}"
+        rv = self.auth_client_patch(client, token, uri, {"field_integer": "a"})
+        self.assertEqual(rv.status_code, 422)
+        rv = self.auth_client_patch(client, token, uri, {"id": 1})
+        self.assertEqual(rv.status_code, 400)
+        rv = self.auth_client_patch(client, token, uri, {})
+        self.assertEqual(rv.status_code, 400)
+
+        token = self.login(client, USERNAME_READONLY, PASSWORD_READONLY)
+        rv = self.auth_client_delete(client, token, uri)
+        self.assertEqual(rv.status_code, 401)
+
+    def test_iter_query(self):
+        """
+            SQLAInterface: Test iter_query streams the same results as query
+        """
+        datamodel = SQLAInterface(Model1, self.appbuilder.get_session)
+        filters = datamodel.get_filters().add_filter("field_integer", FilterGreater, 2)
+        _, expected = datamodel.query(
+            filters, "field_integer", "desc", select_columns=["field_string"]
+        )
+        items = datamodel.iter_query(
+            filters,
+            "field_integer",
+            "desc",
+            select_columns=["field_string"],
+            chunk_size=7,
+        )
+        self.assertNotIsInstance(items, list)
+        self.assertEqual(
+            [item.field_string for item in items],
+            [item.field_string for item in expected],
+        )
+
+        # to many relations are paged, so collections are not split
+        datamodel = SQLAInterface(ModelMMParent, self.appbuilder.get_session)
+        select_columns = ["field_string", "children.field_string"]
+        _, expected = datamodel.query(
+            order_column="id", order_direction="asc", select_columns=select_columns
+        )
+        items = list(datamodel.iter_query(select_columns=select_columns, chunk_size=4))
+        self.assertEqual(
+            [
+                (item.field_string, sorted(c.field_string for c in item.children))
+                for item in items
+            ],
+            [
+                (item.field_string, sorted(c.field_string for c in item.children))
+                for item in expected
+            ],
+        )
+
+    def test_query_group_streaming(self):
+        """
+            SQLAInterface: Test group queries sorted by the database
+        """
+        from flask_appbuilder.models.group import aggregate_sum, GroupByCol
+
+        datamodel = SQLAInterface(Model1, self.appbuilder.get_session)
+        filters = datamodel.get_filters().add_filter("field_integer", FilterGreater, -1)
+        _, items = datamodel.query(filters)
+        self.assertEqual(
+            datamodel.query_simple_group("field_integer", filters=filters),
+            GroupByCol("field_integer", "").apply(items),
+        )
+
+        # Case insensitive collations sort equal values in any order
+        items = [
+            Model1(field_string=value, field_integer=i)
+            for i, value in enumerate(["a", "b", "B", "b"])
+        ]
+        with mock.patch.object(datamodel, "iter_query", return_value=iter(items)):
+            self.assertEqual(
+                datamodel.query_simple_group("field_string"),
+                [["B", 1], ["a", 1], ["b", 2]],
+            )
+
+        # Unsorted items are aggregated without being held in memory
+        group = GroupByCol("field_string", "", aggregate_sum, "field_integer")
+        self.assertEqual(
+            group.apply(iter(items), sort=False), [["B", 2], ["a", 0], ["b", 4]]
+        )
+        self.assertEqual(group.apply(iter(items), sort=False), group.apply(items))
+
     def test_update_custom_validation(self):
         """
             REST Api: Test update item custom validation
@@ -0,0 +1,152 @@
+import json
+
+from flask_appbuilder import ChartRestApi, DirectByChartRestApi, Model
+from flask_appbuilder.models.cache import MemoryCache
+from flask_appbuilder.models.group import aggregate_count, aggregate_sum
+from flask_appbuilder.models.sqla.interface import SQLAInterface
+import prison
+from sqlalchemy import Column, Integer, MetaData, String
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+
+
+class SaleModel(Model):
+    """ Keeps the test tables off the shared metadata """
+
+    __abstract__ = True
+    metadata = MetaData()
+
+
+class ChartSale(SaleModel):
+    id = Column(Integer, primary_key=True)
+    region = Column(String(50))
+    units = Column(Integer)
+
+
+DEFINITIONS = [
+    {
+        "label": "Units by region",
+        "group": "region",
+        "series": [(aggregate_count, "units"), (aggregate_sum, "units")],
+    }
+]
+
+
+class ChartRestApiTestCase(FABTestCase):
+    def setUp(self):
+        self.setup_app()
+        SaleModel.metadata.create_all(self.db.get_engine())
+        self.datamodel = SQLAInterface(ChartSale, self.db.session)
+        for i in range(12):
+            self.datamodel.add(
+                ChartSale(region=["north", "south", "east"][i % 3], units=i)
+            )
+        self.token = self.login(self.client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+    def tearDown(self):
+        self.teardown_app()
+
+    def add_chart_api(self, base=ChartRestApi, **attrs):
+        attrs.setdefault("definitions", [dict(item) for item in DEFINITIONS])
+        attrs["datamodel"] = SQLAInterface(ChartSale)
+        attrs["resource_name"] = "salechart"
+        self.appbuilder.add_api(type("SaleChartApi", (base,), attrs))
+
+    def get_chart(self, uri, headers=None):
+        headers = dict(headers or {}, Authorization=f"Bearer {self.token}")
+        return self.client.get(uri, headers=headers)
+
+    def test_info(self):
+        """
+            Chart REST API: info returns the definitions and filters
+        """
+        self.add_chart_api()
+        rv = self.get_chart("api/v1/salechart/_info")
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(len(data["definitions"]), 1)
+        definition = data["definitions"][0]
+        self.assertEqual(definition["index"], 0)
+        self.assertEqual(definition["label"], "Units by region")
+        self.assertEqual(
+            [col["id"] for col in definition["columns"]], ["region", "units", "units"]
+        )
+        self.assertIn("region", data["filters"])
+
+    def test_get(self):
+        """
+            Chart REST API: get returns the aggregated series, filtered
+        """
+        self.add_chart_api()
+        rv = self.get_chart("api/v1/salechart/0")
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["label"], "Units by region")
+        self.assertEqual(
+            data["result"],
+            [["east", 4, 2 + 5 + 8 + 11], ["north", 4, 18], ["south", 4, 22]],
+        )
+
+        arguments = {"filters": [{"col": "units", "opr": "gt", "value": 5}]}
+        rv = self.get_chart(f"api/v1/salechart/0?q={prison.dumps(arguments)}")
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(
+            data["result"], [["east", 2, 19], ["north", 2, 15], ["south", 2, 17]]
+        )
+
+        arguments = {"filters": [{"col": "nope", "opr": "eq", "value": 1}]}
+        rv = self.get_chart(f"api/v1/salechart/0?q={prison.dumps(arguments)}")
+        self.assertEqual(rv.status_code, 400)
+        rv = self.get_chart("api/v1/salechart/1")
+        self.assertEqual(rv.status_code, 404)
+
+    def test_etag(self):
+        """
+            Chart REST API: 304 on a matching If-None-Match
+        """
+        self.add_chart_api()
+        rv = self.get_chart("api/v1/salechart/0")
+        etag = rv.headers["ETag"]
+        self.assertIn("no-cache", rv.headers["Cache-Control"])
+        rv = self.get_chart("api/v1/salechart/0", {"If-None-Match": etag})
+        self.assertEqual(rv.status_code, 304)
+        self.assertEqual(rv.data, b"")
+
+        self.datamodel.add(ChartSale(region="west", units=1))
+        rv = self.get_chart("api/v1/salechart/0", {"If-None-Match": etag})
+        self.assertEqual(rv.status_code, 200)
+        self.assertNotEqual(rv.headers["ETag"], etag)
+
+    def test_etag_cached(self):
+        """
+            Chart REST API: cached data ETags change with the cache entry
+        """
+        self.add_chart_api(cache_backend=MemoryCache())
+        rv = self.get_chart("api/v1/salechart/0")
+        etag = rv.headers["ETag"]
+        rv = self.get_chart("api/v1/salechart/0", {"If-None-Match": etag})
+        self.assertEqual(rv.status_code, 304)
+
+        self.datamodel.add(ChartSale(region="west", units=1))
+        rv = self.get_chart("api/v1/salechart/0", {"If-None-Match": etag})
+        self.assertEqual(rv.status_code, 200)
+        self.assertNotEqual(rv.headers["ETag"], etag)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["result"][-1], ["west", 1, 1])
+
+    def test_stream(self):
+        """
+            Chart REST API: large results are streamed
+        """
+        self.add_chart_api(
+            DirectByChartRestApi,
+            definitions=[{"group": "units", "series": ["id"]}],
+            stream_threshold=5,
+            stream_chunk_size=2,
+        )
+        rv = self.get_chart("api/v1/salechart/0")
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.is_streamed)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["result"], [[str(i), i + 1] for i in range(12)])
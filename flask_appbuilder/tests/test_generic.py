@@ -0,0 +1,543 @@
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import datetime
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from flask_appbuilder.models.generic import (
+    GenericColumn,
+    GenericModel,
+    GenericSession,
+    PSModel,
+    PSSession,
+    SnapshotGenericSession,
+)
+from flask_appbuilder.models.generic.columnar import ColumnarGenericSession
+from flask_appbuilder.models.generic.file import DataFile, FileGenericSession
+from flask_appbuilder.utils.rwlock import ReadWriteLock
+
+
+class IndexedModel(GenericModel):
+    id = GenericColumn(int, primary_key=True)
+    name = GenericColumn(str, index=True)
+    age = GenericColumn(int, index=True)
+    born = GenericColumn(datetime.date, index=True)
+    city = GenericColumn(str)
+    score = GenericColumn(float)
+
+
+def make_items(count):
+    rnd = random.Random(42)
+    items = list()
+    for i in range(count):
+        items.append(
+            IndexedModel(
+                id=i,
+                name=rnd.choice(["Ann", "anna", "Bob", "bobby", "Carl", None]),
+                age=rnd.choice([None, rnd.randrange(60)]),
+                born=datetime.date(1980 + rnd.randrange(20), 1, 1 + i % 28),
+                city=rnd.choice(["Lisbon", "Porto"]),
+                score=rnd.random() * 10,
+            )
+        )
+    return items
+
+
+class GenericSessionIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.indexed = GenericSession()
+        self.scanned = GenericSession()
+        self.scanned.use_indexes = False
+        for item in make_items(300):
+            self.indexed.add(item)
+            self.scanned.add(item)
+
+    def assert_same_query(self, build):
+        self.assertEqual(
+            build(self.indexed.query(IndexedModel)).all(),
+            build(self.scanned.query(IndexedModel)).all(),
+        )
+
+    def test_get(self):
+        """
+            GenericSession: get by primary key with the hash index
+        """
+        query = self.indexed.query(IndexedModel)
+        self.assertEqual(query.get("10").id, 10)
+        self.assertIsNone(query.get(1000))
+        self.indexed.add(IndexedModel(id=1000, name="new"))
+        self.assertEqual(query.get(1000).name, "new")
+        # Repeated keys return the first item
+        self.indexed.add(IndexedModel(id=10, name="repeated"))
+        self.assertNotEqual(query.get(10).name, "repeated")
+        self.indexed.delete_all(IndexedModel)
+        self.assertIsNone(query.get(10))
+
+    def test_filters(self):
+        """
+            GenericSession: indexed filters match the scanned filters
+        """
+        filters = [
+            ("equal", "age", "30"),
+            ("equal", "age", "nope"),
+            ("greater", "age", 30),
+            ("smaller", "age", "10"),
+            ("greater", "born", "1990-06-01"),
+            ("equal", "name", "Bob"),
+            ("starts_with", "name", "an"),
+            ("starts_with", "name", "BOB bobb"),
+            ("starts_with", "name", "anna bob"),
+            ("starts_with", "name", ""),
+            ("equal", "city", "Porto"),
+            ("not_equal", "name", "Carl"),
+        ]
+        for (name, col, value), (other, other_col, other_value) in itertools.product(
+            filters, repeat=2
+        ):
+            self.assert_same_query(
+                lambda query: getattr(getattr(query, name)(col, value), other)(
+                    other_col, other_value
+                )
+            )
+
+    def test_order(self):
+        """
+            GenericSession: indexed and paged orders match the scanned order
+        """
+        for col, direction, offset, limit in itertools.product(
+            ["id", "name", "age", "born", "city"],
+            ["asc", "desc"],
+            [0, 20],
+            [0, 10, 1000],
+        ):
+            self.assert_same_query(
+                lambda query: query.order_by(f"{col} {direction}")
+                .offset(offset)
+                .limit(limit)
+            )
+            self.assert_same_query(
+                lambda query: query.greater("age", 20)
+                .order_by(f"{col} {direction}")
+                .offset(offset)
+                .limit(limit)
+            )
+
+    def test_add_after_query(self):
+        """
+            GenericSession: indexes catch up with added items
+        """
+        self.assert_same_query(lambda query: query.order_by("age asc"))
+        for item in make_items(5) + make_items(100):
+            self.indexed.add(item)
+            self.scanned.add(item)
+        self.assert_same_query(lambda query: query.order_by("age desc"))
+        self.assert_same_query(lambda query: query.starts_with("name", "bo"))
+        self.indexed.delete_all(IndexedModel)
+        self.scanned.delete_all(IndexedModel)
+        self.assert_same_query(lambda query: query.order_by("age asc"))
+
+
+class ColumnarGenericSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.columnar = ColumnarGenericSession()
+        self.scanned = GenericSession()
+        self.scanned.use_indexes = False
+        self.items = make_items(300)
+        for item in self.items:
+            self.columnar.add(item)
+            self.scanned.add(item)
+
+    def assert_same_query(self, build):
+        columnar_count, columnar_items = build(self.columnar.query(IndexedModel)).all()
+        count, items = build(self.scanned.query(IndexedModel)).all()
+        self.assertEqual(columnar_count, count)
+        self.assertEqual(
+            [str(item) for item in columnar_items], [str(item) for item in items]
+        )
+
+    def test_storage(self):
+        """
+            Columnar GenericSession: typed columns and slotted rows
+        """
+        store = self.columnar.store["IndexedModel"]
+        self.assertEqual(store.columns["age"].values.typecode, "q")
+        self.assertIsNotNone(store.columns["age"].nulls)
+        self.assertEqual(store.columns["score"].values.typecode, "d")
+        self.assertIsInstance(store.columns["name"].values, list)
+        self.columnar.add(IndexedModel(id=1000, age=2 ** 70, score=1))
+        self.assertIsInstance(store.columns["age"].values, list)
+        self.assertIsInstance(store.columns["score"].values, list)
+
+        query = self.columnar.query(IndexedModel)
+        item = query.get("1000")
+        self.assertIsInstance(item, IndexedModel)
+        self.assertEqual((item.age, item.score, item.name), (2 ** 70, 1, None))
+        self.assertEqual(item.get_col_type("age"), int)
+        self.assertEqual(query.get(10).name, self.items[10].name)
+        self.assertIsNone(query.get(2000))
+
+    def test_filters(self):
+        """
+            Columnar GenericSession: filters match GenericSession
+        """
+        filters = [
+            ("equal", "age", "30"),
+            ("equal", "age", "nope"),
+            ("not_equal", "age", 30),
+            ("greater", "score", "5"),
+            ("smaller", "age", "10"),
+            ("greater", "born", "1990-06-01"),
+            ("equal", "name", "Bob"),
+            ("starts_with", "name", "an"),
+            ("ilike", "name", "OB"),
+            ("like", "city", "or"),
+            ("not_like", "city", "or"),
+        ]
+        for name, col, value in filters:
+            self.assert_same_query(
+                lambda query: getattr(query, name)(col, value)
+                .order_by("id desc")
+                .limit(20)
+            )
+
+    def test_order(self):
+        """
+            Columnar GenericSession: orders and pages match GenericSession
+        """
+        for col, direction, limit in itertools.product(
+            ["id", "name", "age", "born", "score"], ["asc", "desc"], [0, 10]
+        ):
+            self.assert_same_query(
+                lambda query: query.order_by(f"{col} {direction}")
+                .offset(5)
+                .limit(limit)
+            )
+        self.columnar.delete_all(IndexedModel)
+        self.assertEqual(self.columnar.query(IndexedModel).all(), (0, []))
+
+
+class GenericQueryTestCase(unittest.TestCase):
+    def test_immutable(self):
+        """
+            GenericQuery: building a query doesn't change other queries
+        """
+        session = GenericSession()
+        for item in make_items(50):
+            session.add(item)
+        query = session.query(IndexedModel).greater("age", 20)
+        ordered = query.order_by("age desc").limit(5)
+        filtered = query.equal("city", "Porto")
+        self.assertEqual(len(query.filters_cmd), 1)
+        self.assertEqual(len(filtered.filters_cmd), 2)
+        self.assertIsNone(query.order_by_cmd)
+        count, items = ordered.all()
+        self.assertEqual(len(items), 5)
+        self.assertEqual(query.all()[0], count)
+        self.assertTrue(all(item.city == "Porto" for item in filtered.all()[1]))
+
+    def test_concurrent_queries(self):
+        """
+            GenericQuery: threads share a session while it's written
+        """
+        for session in (GenericSession(), ColumnarGenericSession()):
+            items = make_items(200)
+            for item in items:
+                session.add(item)
+            expected = {
+                age: sorted(item.id for item in items if item.age == age)
+                for age in range(0, 60, 5)
+            }
+
+            def read(age):
+                for _ in range(20):
+                    count, result = (
+                        session.query(IndexedModel)
+                        .equal("age", age)
+                        .order_by("id asc")
+                        .all()
+                    )
+                    ids = [item.id for item in result if item.id < 200]
+                    if ids != expected[age] or count != len(result):
+                        return False
+                return True
+
+            def write():
+                for i in range(200, 400):
+                    session.add(IndexedModel(id=i, age=i % 60, name="new"))
+                return True
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = [executor.submit(read, age) for age in expected]
+                futures.append(executor.submit(write))
+                self.assertTrue(all(future.result() for future in futures))
+            self.assertEqual(session.query(IndexedModel).all()[0], 400)
+
+
+class ReadWriteLockTestCase(unittest.TestCase):
+    def test_readers_and_writers(self):
+        """
+            ReadWriteLock: readers share it, writers hold it alone
+        """
+        lock = ReadWriteLock()
+        state = {"readers": 0, "max_readers": 0, "writing": False, "errors": 0}
+        state_lock = threading.Lock()
+        entered = threading.Barrier(5)
+        release = threading.Barrier(5)
+
+        def read():
+            with lock.read():
+                with lock.read():
+                    with state_lock:
+                        state["readers"] += 1
+                        state["max_readers"] = max(
+                            state["max_readers"], state["readers"]
+                        )
+                        state["errors"] += state["writing"]
+                    entered.wait()
+                    release.wait()
+                    with state_lock:
+                        state["readers"] -= 1
+
+        def write():
+            with lock.write():
+                with lock.write(), lock.read():
+                    state["writing"] = True
+                    state["errors"] += state["readers"] > 0
+                    state["writing"] = False
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writers = [threading.Thread(target=write) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        # All readers hold the lock together, writers wait for them
+        entered.wait()
+        for thread in writers:
+            thread.start()
+        release.wait()
+        for thread in readers + writers:
+            thread.join()
+        self.assertEqual(state["max_readers"], 4)
+        self.assertEqual(state["errors"], 0)
+        with lock.read():
+            with self.assertRaises(RuntimeError):
+                with lock.write():
+                    pass
+
+
+class CountingSnapshotSession(SnapshotGenericSession):
+    def __init__(self):
+        super(CountingSnapshotSession, self).__init__()
+        self.loads = 0
+        self.error = None
+        self.loading = threading.Event()
+        self.loading.set()
+
+    def load_snapshot(self):
+        self.loading.wait(5)
+        self.loads += 1
+        if self.error:
+            raise self.error
+        return make_items(self.loads * 10)
+
+
+class SnapshotGenericSessionTestCase(unittest.TestCase):
+    def wait_refresh(self, session):
+        for _ in range(500):
+            if not session._refreshing:
+                return
+            time.sleep(0.01)
+
+    def test_ttl(self):
+        """
+            Snapshot GenericSession: snapshots are served until they expire
+        """
+        session = CountingSnapshotSession()
+        session.snapshot_ttl = 60
+        query = session.query(IndexedModel)
+        self.assertEqual(query.all()[0], 10)
+        self.assertEqual(query.get(5).id, 5)
+        self.assertEqual(session.loads, 1)
+
+        session.snapshot_ttl = 0
+        session.refresh_in_background = False
+        session.refresh()
+        self.assertEqual(query.all()[0], 30)
+        self.assertEqual(session.loads, 3)
+
+    def test_background_refresh(self):
+        """
+            Snapshot GenericSession: queries read the last snapshot while refreshing
+        """
+        session = CountingSnapshotSession()
+        session.snapshot_ttl = 0
+        query = session.query(IndexedModel)
+        self.assertEqual(query.all()[0], 10)
+        session.loading.clear()
+        self.assertEqual(query.all()[0], 10)
+        self.assertEqual(query.equal("id", 3).all()[0], 1)
+        self.assertTrue(session._refreshing)
+        session.snapshot_ttl = 60
+        session.loading.set()
+        self.wait_refresh(session)
+        self.assertEqual(query.all()[0], 20)
+
+    def test_failed_refresh(self):
+        """
+            Snapshot GenericSession: failed refreshes keep the last snapshot
+        """
+        session = CountingSnapshotSession()
+        session.error = ValueError("unavailable")
+        with self.assertRaises(ValueError):
+            session.query(IndexedModel).all()
+
+        session.error = None
+        session.snapshot_ttl = 0
+        self.assertEqual(session.query(IndexedModel).all()[0], 20)
+        session.error = ValueError("unavailable")
+        self.assertEqual(session.query(IndexedModel).all()[0], 20)
+        self.wait_refresh(session)
+        self.assertEqual(session.query(IndexedModel).all()[0], 20)
+
+    @unittest.skipUnless(os.path.isdir("/proc/self"), "Requires /proc")
+    def test_ps_session(self):
+        """
+            Snapshot GenericSession: PSSession reads the processes from /proc
+        """
+        query = PSSession().query(PSModel)
+        process = query.get(os.getpid())
+        self.assertEqual(process.PPID, os.getppid())
+        self.assertIn("python", process.CMD)
+        self.assertRegex(process.TIME, r"^(\d+-)?\d\d:\d\d:\d\d$")
+        count, items = query.equal("PID", os.getpid()).all()
+        self.assertEqual(count, 1)
+        self.assertGreater(query.all()[0], 1)
+
+
+class FileGenericSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.items = make_items(300)
+        self.items[3].city = 'Lis\nbon, "old"'
+        self.scanned = GenericSession()
+        self.scanned.use_indexes = False
+        for item in self.items:
+            self.scanned.add(item)
+
+        self.csv_path = os.path.join(self.tmp_dir, "items.csv")
+        with open(self.csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(IndexedModel.columns)
+            for item in self.items:
+                writer.writerow(
+                    [
+                        "" if getattr(item, col) is None else getattr(item, col)
+                        for col in IndexedModel.columns
+                    ]
+                )
+        self.jsonl_path = os.path.join(self.tmp_dir, "items.jsonl")
+        with open(self.jsonl_path, "w") as f:
+            for item in self.items:
+                values = {col: getattr(item, col) for col in IndexedModel.columns}
+                values["born"] = values["born"].isoformat()
+                f.write(json.dumps(values) + "\n\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_session(self, path):
+        session = FileGenericSession()
+        session.add_file(IndexedModel, path)
+        return session
+
+    def assert_same_query(self, session, build):
+        file_count, file_items = build(session.query(IndexedModel)).all()
+        count, items = build(self.scanned.query(IndexedModel)).all()
+        self.assertEqual(file_count, count)
+        self.assertEqual(
+            [str(item) for item in file_items], [str(item) for item in items]
+        )
+
+    def test_queries(self):
+        """
+            File GenericSession: CSV and JSONL queries match GenericSession
+        """
+        filters = [
+            None,
+            ("equal", "age", "30"),
+            ("equal", "age", "nope"),
+            ("greater", "age", 30),
+            ("smaller", "age", "10"),
+            ("greater", "born", "1990-06-01"),
+            ("equal", "name", "Bob"),
+            ("starts_with", "name", "an"),
+            ("equal", "city", "Porto"),
+            ("not_equal", "name", "Carl"),
+        ]
+        for path in (self.csv_path, self.jsonl_path):
+            session = self.make_session(path)
+            for flt, col, direction, limit in itertools.product(
+                filters, ["id", "name", "age", "score"], ["asc", "desc"], [0, 10]
+            ):
+
+                def build(query):
+                    if flt:
+                        query = getattr(query, flt[0])(flt[1], flt[2])
+                    return query.order_by(f"{col} {direction}").offset(5).limit(limit)
+
+                self.assert_same_query(session, build)
+            query = session.query(IndexedModel)
+            self.assertEqual(str(query.get("3")), str(self.items[3]))
+            self.assertIsNone(query.get(1000))
+            self.assertIsNone(query.get("nope"))
+
+    def test_page_parsing(self):
+        """
+            File GenericSession: indexed pages only parse the needed rows
+        """
+        session = self.make_session(self.csv_path)
+        session.query(IndexedModel).order_by("age desc").limit(1).all()
+        data_file = session.files["IndexedModel"]
+        self.assertTrue(os.path.exists(self.csv_path + ".idx"))
+        self.assertTrue(os.path.exists(self.csv_path + ".age.idx"))
+
+        parsed = list()
+        get_values = data_file.get_values
+
+        def counting_get_values(row):
+            parsed.append(row)
+            return get_values(row)
+
+        data_file.get_values = counting_get_values
+        count, items = (
+            session.query(IndexedModel).order_by("age desc").offset(20).limit(10).all()
+        )
+        self.assertEqual(count, 300)
+        self.assertLess(len(parsed), 100)
+        # Builds the primary key index
+        session.query(IndexedModel).get(1)
+        del parsed[:]
+        self.assertEqual(session.query(IndexedModel).get(250).id, 250)
+        self.assertLess(len(parsed), 20)
+
+    def test_sidecar(self):
+        """
+            File GenericSession: sidecar indexes are reused until the file changes
+        """
+        self.make_session(self.csv_path).query(IndexedModel).all()
+        data_file = DataFile(IndexedModel, self.csv_path)
+        data_file._build_offsets = None
+        data_file.open()
+        self.assertEqual(data_file.size, 300)
+
+        with open(self.csv_path, "a") as f:
+            f.write("1000,new,,,,\n")
+        session = self.make_session(self.csv_path)
+        self.assertEqual(session.query(IndexedModel).all()[0], 301)
+        self.assertEqual(session.query(IndexedModel).get(1000).name, "new")
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from flask_appbuilder import ModelView, SQLA
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+
+try:
+    from flask_appbuilder.models.mongoengine.interface import MongoEngineInterface
+    import mongoengine
+    from mongoengine import Document, FileField, StringField
+    import mongomock
+    from mongomock.gridfs import enable_gridfs_integration
+except ImportError:
+    mongomock = None
+    Document = object
+else:
+    # Connections take mongo_client_class since mongoengine 0.27
+    if mongoengine.VERSION < (0, 27):
+        mongomock = None
+
+
+if mongomock:
+
+    class GridFSDocument(Document):
+        name = StringField()
+        file = FileField()
+
+
+DATA = bytes(range(256)) * 4096
+""" 1MB, four GridFS chunks """
+
+
+@unittest.skipUnless(mongomock, "Requires mongoengine>=0.27 and mongomock")
+class GridFSModelViewTestCase(FABTestCase):
+    @classmethod
+    def setUpClass(cls):
+        enable_gridfs_integration()
+
+    @classmethod
+    def tearDownClass(cls):
+        mock.patch.stopall()
+
+    def setUp(self):
+        from flask import Flask
+        from flask_appbuilder import AppBuilder
+
+        mongoengine.connect(
+            "fab_gridfs",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.from_object("flask_appbuilder.tests.config_api")
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
+            self.tmp_dir, "app.db"
+        )
+        self.db = SQLA(self.app)
+        self.appbuilder = AppBuilder(self.app, self.db.session)
+
+        class GridFSModelView(ModelView):
+            datamodel = MongoEngineInterface(GridFSDocument)
+
+        self.view = self.appbuilder.add_view_no_menu(GridFSModelView)
+        self.item = GridFSDocument(name="video")
+        self.item.file.put(DATA, filename="video.mp4", content_type="video/mp4")
+        self.item.save()
+        self.create_admin_user(self.appbuilder, USERNAME_ADMIN, PASSWORD_ADMIN)
+        self.client = self.app.test_client()
+        self.browser_login(self.client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+    def tearDown(self):
+        GridFSDocument.drop_collection()
+        mongoengine.disconnect()
+        self.db.session.remove()
+        self.db.get_engine().dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_url(self, **kwargs):
+        with self.app.test_request_context():
+            return self.view.get_gridfs_url(self.item, "file", **kwargs)
+
+    def test_stream(self):
+        """
+            GridFS: files are streamed with validators and range support
+        """
+        url = self.get_url()
+        self.assertIn(str(self.item.file.grid_id), url)
+        rv = self.client.get(url)
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.is_streamed)
+        self.assertEqual(rv.data, DATA)
+        self.assertEqual(rv.mimetype, "video/mp4")
+        self.assertEqual(rv.content_length, len(DATA))
+        self.assertEqual(rv.headers["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", rv.headers["Cache-Control"])
+        self.assertIsNotNone(rv.headers["ETag"])
+        self.assertNotIn("Content-Disposition", rv.headers)
+
+        rv = self.client.get(
+            url, headers={"If-None-Match": rv.headers["ETag"].strip('"')}
+        )
+        self.assertEqual(rv.status_code, 304)
+        self.assertEqual(rv.data, b"")
+
+        rv = self.client.get(self.get_url(download=True))
+        self.assertIn("video.mp4", rv.headers["Content-Disposition"])
+
+        # Without the file id clients revalidate
+        rv = self.client.get(f"/gridfsmodelview/gridfs/{self.item.id}/file")
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.headers["Cache-Control"], "no-cache")
+
+        rv = self.client.get(f"/gridfsmodelview/gridfs/{self.item.id}/file/other")
+        self.assertEqual(rv.status_code, 404)
+        rv = self.client.get(f"/gridfsmodelview/gridfs/{self.item.id}/name")
+        self.assertEqual(rv.status_code, 404)
+
+    def test_range(self):
+        """
+            GridFS: byte ranges are read from their chunks
+        """
+        url = self.get_url()
+        rv = self.client.get(url, headers={"Range": "bytes=300000-600000"})
+        self.assertEqual(rv.status_code, 206)
+        self.assertEqual(rv.data, DATA[300000:600001])
+        self.assertEqual(
+            rv.headers["Content-Range"], f"bytes 300000-600000/{len(DATA)}"
+        )
+        rv = self.client.get(url, headers={"Range": "bytes=-10"})
+        self.assertEqual(rv.data, DATA[-10:])
+        rv = self.client.get(url, headers={"Range": f"bytes={len(DATA)}-"})
+        self.assertEqual(rv.status_code, 416)
+        self.assertEqual(rv.headers["Content-Range"], f"bytes */{len(DATA)}")
+
+        etag = self.client.get(url).headers["ETag"]
+        rv = self.client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+        self.assertEqual(rv.status_code, 206)
+        self.assertEqual(rv.data, DATA[:10])
+        # Changed files are sent whole
+        rv = self.client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"x"'})
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.data, DATA)
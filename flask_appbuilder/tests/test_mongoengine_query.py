@@ -0,0 +1,251 @@
+import unittest
+from unittest import mock
+
+from flask_appbuilder.models.filters import Filters
+
+try:
+    from flask_appbuilder.models.mongoengine.filters import (
+        FilterGreater,
+        MongoEngineFilterConverter,
+    )
+    from flask_appbuilder.models.mongoengine.interface import MongoEngineInterface
+    import mongoengine
+    from bson import DBRef
+    from flask_appbuilder.models.group import (
+        aggregate,
+        aggregate_avg,
+        aggregate_count,
+        aggregate_max,
+        aggregate_sum,
+        DirectProcessData,
+        GroupByProcessData,
+    )
+    from mongoengine import (
+        Document,
+        FloatField,
+        IntField,
+        ListField,
+        ReferenceField,
+        StringField,
+    )
+    import mongomock
+except ImportError:
+    mongomock = None
+    Document = object
+else:
+    # Connections take mongo_client_class since mongoengine 0.27
+    if mongoengine.VERSION < (0, 27):
+        mongomock = None
+
+
+if mongomock:
+
+    class QueryGroup(Document):
+        name = StringField()
+        rank = IntField()
+
+    class QueryTag(Document):
+        name = StringField()
+
+    class QueryItem(Document):
+        name = StringField()
+        value = IntField()
+        price = FloatField()
+        category = StringField()
+        group = ReferenceField(QueryGroup)
+        tags = ListField(ReferenceField(QueryTag))
+
+        def value_method(self):
+            return self.value
+
+
+@unittest.skipUnless(mongomock, "Requires mongoengine>=0.27 and mongomock")
+class MongoEngineQueryTestCase(unittest.TestCase):
+    def setUp(self):
+        mongoengine.connect(
+            "fab_query",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        groups = [QueryGroup(name=f"group{i}", rank=i).save() for i in range(3)]
+        tags = [QueryTag(name=f"tag{i}").save() for i in range(4)]
+        for i in range(20):
+            QueryItem(
+                name=f"item{i:02d}",
+                value=i,
+                price=i * 1.5,
+                category=["a", "b", "c", "d"][i % 4],
+                group=groups[i % 3],
+                tags=[tags[i % 4], tags[(i + 1) % 4]],
+            ).save()
+        self.datamodel = MongoEngineInterface(QueryItem)
+
+    def tearDown(self):
+        mongoengine.disconnect()
+
+    def count_queries(self):
+        """
+            Counts the find and aggregate calls on the mongomock collections
+        """
+        calls = list()
+        depth = [0]
+
+        def counting(name, method):
+            def counting_method(collection, *args, **kwargs):
+                # mongomock aggregates with find
+                if not depth[0]:
+                    calls.append((name, collection.name))
+                depth[0] += 1
+                try:
+                    return method(collection, *args, **kwargs)
+                finally:
+                    depth[0] -= 1
+
+            return counting_method
+
+        collection_class = mongomock.collection.Collection
+        patches = [
+            mock.patch.object(
+                collection_class, name, counting(name, getattr(collection_class, name))
+            )
+            for name in ("find", "aggregate")
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return calls
+
+    def get_filters(self):
+        filters = Filters(MongoEngineFilterConverter, self.datamodel)
+        filters.add_filter("value", FilterGreater, 4)
+        return filters
+
+    def test_select_columns(self):
+        """
+            MongoEngine query: select_columns loads just their fields
+        """
+        count, items = self.datamodel.query(
+            page=0, page_size=5, select_columns=["name", "group.name"]
+        )
+        self.assertEqual(count, 20)
+        self.assertIsNone(items[0].value)
+        self.assertEqual(items[0].tags, [])
+        self.assertIsNotNone(items[0].name)
+        self.assertIsNotNone(items[0].group.name)
+        self.assertIsNone(items[0].group.rank)
+
+        # Methods may read any field
+        count, items = self.datamodel.query(
+            page=0, page_size=5, select_columns=["name", "value_method"]
+        )
+        self.assertIsNotNone(items[0].value)
+
+    def test_select_related(self):
+        """
+            MongoEngine query: references are fetched with one query each
+        """
+        calls = self.count_queries()
+        count, items = self.datamodel.query(
+            self.get_filters(), "value", "desc", page=1, page_size=5
+        )
+        self.assertEqual(count, 15)
+        self.assertEqual([item.value for item in items], [10, 11, 12, 13, 14])
+        self.assertEqual(
+            [item.group.name for item in items],
+            [f"group{i % 3}" for i in range(10, 15)],
+        )
+        self.assertEqual(
+            [[tag.name for tag in item.tags] for item in items],
+            [[f"tag{i % 4}", f"tag{(i + 1) % 4}"] for i in range(10, 15)],
+        )
+        collections = [name for call, name in calls if call == "find"]
+        self.assertEqual(collections.count("query_group"), 1)
+        self.assertEqual(collections.count("query_tag"), 1)
+
+        count, items = self.datamodel.query(
+            page=0, page_size=5, select_related=["tags"]
+        )
+        self.assertIsInstance(items[0]._data["group"], DBRef)
+        self.assertIsInstance(items[0]._data["tags"][0], QueryTag)
+
+    def test_facet(self):
+        """
+            MongoEngine query: facet mode returns the count and page together
+        """
+        expected = self.datamodel.query(
+            self.get_filters(), "value", "asc", page=2, page_size=4
+        )
+        self.datamodel.query_facet = True
+        calls = self.count_queries()
+        count, items = self.datamodel.query(
+            self.get_filters(), "value", "asc", page=2, page_size=4
+        )
+        self.assertEqual(calls[0], ("aggregate", "query_item"))
+        self.assertNotIn(("find", "query_item"), calls)
+        self.assertEqual(count, expected[0])
+        self.assertEqual(items, expected[1])
+        self.assertEqual(
+            [item.group.name for item in items],
+            [item.group.name for item in expected[1]],
+        )
+
+        count, items = self.datamodel.query(
+            page=0, page_size=5, select_columns=["name", "group.name"]
+        )
+        self.assertEqual(count, 20)
+        self.assertIsNone(items[0].value)
+        self.assertIsNotNone(items[0].group.name)
+
+        filters = Filters(MongoEngineFilterConverter, self.datamodel)
+        filters.add_filter("value", FilterGreater, 100)
+        self.assertEqual(self.datamodel.query(filters, page=0, page_size=5), (0, []))
+
+    def test_query_aggregate(self):
+        """
+            MongoEngine query: chart aggregations match the python processing
+        """
+        series = [
+            (aggregate_count, "value"),
+            (aggregate_sum, "value"),
+            (aggregate_avg, "price"),
+            (aggregate_max, "value"),
+        ]
+        group = GroupByProcessData(["category"], series, {})
+        for filters in (None, self.get_filters()):
+            rows = self.datamodel.query_aggregate("category", series, filters)
+            count, items = self.datamodel.query(filters)
+            self.assertEqual(group.format_rows(rows), group.apply(items))
+
+        @aggregate("Custom")
+        def aggregate_custom(items, col):
+            return len(items)
+
+        # Processed in python
+        self.assertIsNone(
+            self.datamodel.query_aggregate("value_method", [(aggregate_count, "value")])
+        )
+        self.assertIsNone(
+            self.datamodel.query_aggregate("group", [(aggregate_count, "value")])
+        )
+        self.assertIsNone(
+            self.datamodel.query_aggregate("category", [(aggregate_sum, "name")])
+        )
+        self.assertIsNone(
+            self.datamodel.query_aggregate("category", [(aggregate_custom, "value")])
+        )
+
+    def test_query_columns(self):
+        """
+            MongoEngine query: chart columns are read without documents
+        """
+        group = DirectProcessData(["value"], ["price"], {})
+        rows = self.datamodel.query_columns(
+            ["value", "price"], self.get_filters(), "value", "desc"
+        )
+        count, items = self.datamodel.query(self.get_filters())
+        self.assertEqual(rows, group.get_rows(items)[::-1])
+        self.assertEqual(
+            self.datamodel.query_columns(["value"], order_column="value")[:2],
+            [[0], [1]],
+        )
+        self.assertIsNone(self.datamodel.query_columns(["value", "group"]))
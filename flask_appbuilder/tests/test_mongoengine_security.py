@@ -0,0 +1,161 @@
+import unittest
+from unittest import mock
+
+try:
+    from flask_appbuilder.security.mongoengine.manager import SecurityManager
+    import mongoengine
+    import mongomock
+except ImportError:
+    mongomock = None
+else:
+    # Connections take mongo_client_class since mongoengine 0.27
+    if mongoengine.VERSION < (0, 27):
+        mongomock = None
+
+
+@unittest.skipUnless(mongomock, "Requires mongoengine>=0.27 and mongomock")
+class MongoEngineSecurityManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        from flask import Flask
+        from flask_appbuilder import AppBuilder
+
+        mongoengine.connect(
+            "fab_security",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        self.app = Flask(__name__)
+        self.app.config["SECRET_KEY"] = "thisismyscretkey"
+        self.appbuilder = AppBuilder(self.app, security_manager_class=SecurityManager)
+        self.sm = self.appbuilder.sm
+        self.admin = self.sm.find_role(self.sm.auth_role_admin)
+
+    def tearDown(self):
+        mongoengine.connection.get_db().client.drop_database("fab_security")
+        mongoengine.disconnect()
+
+    def count_calls(self, name):
+        collection_class = mongomock.collection.Collection
+        method = mock.patch.object(
+            collection_class,
+            name,
+            autospec=True,
+            side_effect=getattr(collection_class, name),
+        )
+        self.addCleanup(method.stop)
+        return method.start()
+
+    def get_view_permissions(self, view_menu_name):
+        view_menu = self.sm.find_view_menu(view_menu_name)
+        return sorted(
+            pv.permission.name for pv in self.sm.find_permissions_view_menu(view_menu)
+        )
+
+    def test_sync(self):
+        """
+            MongoEngine security: permissions are synced as a diff
+        """
+        role_view = next(
+            view
+            for view in self.appbuilder.baseviews
+            if view.class_permission_name == "RoleModelView"
+        )
+        self.assertEqual(
+            self.get_view_permissions("RoleModelView"),
+            sorted(role_view.base_permissions),
+        )
+        admin_pv_ids = set(pv.id for pv in self.admin.permissions)
+        self.assertEqual(
+            admin_pv_ids, set(pv.id for pv in self.sm.permissionview_model.objects)
+        )
+
+        version = self.sm.get_permissions_version()
+        bulk_write = self.count_calls("bulk_write")
+        self.sm.add_permissions_view(role_view.base_permissions, "RoleModelView")
+        self.assertEqual(bulk_write.call_count, 0)
+        self.assertEqual(self.sm.get_permissions_version(), version)
+
+        self.sm.add_permissions_view(["can_list", "can_export"], "RoleModelView")
+        self.assertEqual(bulk_write.call_count, 2)
+        self.assertEqual(
+            self.get_view_permissions("RoleModelView"), ["can_export", "can_list"]
+        )
+        self.assertGreater(self.sm.get_permissions_version(), version)
+        self.admin.reload()
+        self.assertEqual(
+            set(pv.id for pv in self.admin.permissions),
+            set(pv.id for pv in self.sm.permissionview_model.objects),
+        )
+        # Permissions still on other views are kept
+        self.assertIsNotNone(self.sm.find_permission("can_show"))
+        self.assertIsNotNone(self.sm.find_permission("can_export"))
+        self.sm.add_permissions_view(["can_list"], "RoleModelView")
+        self.assertIsNone(self.sm.find_permission("can_export"))
+
+        self.sm.add_permissions_menu("RoleModelView")
+        self.assertEqual(
+            self.get_view_permissions("RoleModelView"), ["can_list", "menu_access"]
+        )
+
+    def test_exist_permission_on_roles(self):
+        """
+            MongoEngine security: role permissions are compiled and cached
+        """
+        role = self.sm.add_role("reader")
+        aggregate = self.count_calls("aggregate")
+        with self.app.test_request_context():
+            self.assertTrue(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id, self.admin.id]
+                )
+            )
+            self.assertFalse(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id]
+                )
+            )
+            self.assertIn(
+                "List Roles",
+                self.sm.find_roles_view_menu_names("menu_access", [self.admin.id]),
+            )
+            self.assertFalse(self.sm.is_item_public("can_list", "RoleModelView"))
+        self.assertEqual(aggregate.call_count, 1)
+
+        pv = self.sm.find_permission_view_menu("can_list", "RoleModelView")
+        self.sm.add_permission_role(role, pv)
+        with self.app.test_request_context():
+            self.assertTrue(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id]
+                )
+            )
+        self.assertEqual(aggregate.call_count, 2)
+
+        # Changes by other processes are seen on the next request
+        self.sm.role_model.objects(id=role.id).update(set__permissions=[])
+        with self.app.test_request_context():
+            self.assertTrue(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id]
+                )
+            )
+        self.sm.securityversion_model.objects(name="permissions").update_one(
+            inc__version=1
+        )
+        with self.app.test_request_context():
+            self.assertFalse(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id]
+                )
+            )
+
+        # Role edits from the security views
+        role.reload()
+        role.permissions = [pv]
+        self.sm.rolemodelview.datamodel.edit(role)
+        with self.app.test_request_context():
+            self.assertTrue(
+                self.sm.exist_permission_on_roles(
+                    "RoleModelView", "can_list", [role.id]
+                )
+            )
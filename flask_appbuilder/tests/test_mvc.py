@@ -22,6 +22,7 @@ from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.views import CompactCRUDMixin, MasterDetailView, ModelView
 from flask_wtf import CSRFProtect
 import jinja2
+from sqlalchemy import event
 
 from .base import FABTestCase
 from .const import (
@@ -1286,6 +1287,419 @@ class MVCTestCase(BaseMVCTestCase):
         rv = client.get("/model2timechartview/chart/")
         self.assertEqual(rv.status_code, 200)
 
+    def test_charts_aggregate_on_database(self):
+        """
+            Test chart definitions grouped and aggregated on the database
+        """
+        from flask_appbuilder.models.group import (
+            aggregate_max,
+            aggregate_min,
+            DirectProcessData,
+            GroupByProcessData,
+        )
+
+        datamodel = SQLAInterface(Model2, self.db.session)
+        filters = datamodel.get_filters().add_filter(
+            "field_string", FilterStartsWith, "test"
+        )
+        _, items = datamodel.query(filters)
+        series = [
+            (aggregate_sum, "field_integer"),
+            (aggregate_avg, "field_integer"),
+            (aggregate_count, "field_integer"),
+            (aggregate_sum, "field_float"),
+            (aggregate_min, "field_integer"),
+            (aggregate_max, "field_float"),
+        ]
+        group = GroupByProcessData(["group_id"], series, {})
+        self.assertEqual(
+            group.format_rows(datamodel.query_aggregate("group_id", series, filters)),
+            group.apply(items),
+        )
+        # null values are skipped, groups are ordered by the group column only
+        null_group = Model1(field_string="null_group")
+        self.db.session.add(null_group)
+        self.db.session.flush()
+        for i, value in enumerate([None, None, 3]):
+            self.db.session.add(
+                Model2(
+                    field_string=f"test_null{i}",
+                    field_integer=value,
+                    group_id=null_group.id if value is None else 1,
+                )
+            )
+        self.db.session.commit()
+        try:
+            _, null_items = datamodel.query(filters, "group_id", "desc")
+            self.assertEqual(
+                group.format_rows(
+                    datamodel.query_aggregate(
+                        "group_id", series, filters, "group_id", "desc"
+                    )
+                ),
+                group.apply(null_items, sort=False),
+            )
+            self.assertIsNone(
+                datamodel.query_aggregate(
+                    "group_id", series, filters, "field_integer", "asc"
+                )
+            )
+        finally:
+            self.db.session.query(Model2).filter(
+                Model2.field_string.startswith("test_null")
+            ).delete(synchronize_session=False)
+            self.db.session.delete(null_group)
+            self.db.session.commit()
+        group = DirectProcessData(["field_string"], ["field_integer"], {})
+        self.assertEqual(
+            group.format_rows(
+                datamodel.query_columns(
+                    ["field_string", "field_integer"], filters, "field_string", "asc"
+                )
+            ),
+            group.apply(items),
+        )
+        # functions, relations and custom aggregations are processed in python
+        self.assertIsNone(datamodel.query_aggregate("field_method", series))
+        self.assertIsNone(datamodel.query_aggregate("group", series))
+        self.assertIsNone(
+            datamodel.query_aggregate("group_id", [(lambda i, c: 0, "field_integer")])
+        )
+        self.assertIsNone(
+            datamodel.query_aggregate("group_id", [(aggregate_sum, "field_string")])
+        )
+        self.assertIsNone(datamodel.query_columns(["field_string", "field_method"]))
+
+        class Model2GroupByChartViewSQL(GroupByChartView):
+            route_base = "/model2groupbychartview_sql"
+            datamodel = SQLAInterface(Model2)
+            chart_title = "Test Model1 Chart"
+
+            definitions = [
+                {
+                    "group": "field_string",
+                    "series": [
+                        (aggregate_sum, "field_integer"),
+                        (aggregate_avg, "field_integer"),
+                    ],
+                }
+            ]
+
+        self.appbuilder.add_view(Model2GroupByChartViewSQL, "Model2 Group By Chart SQL")
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.db.get_engine()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            client = self.app.test_client()
+            self.browser_login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+            statements.clear()
+            rv = client.get("/model2groupbychartview_sql/chart/")
+            self.assertEqual(rv.status_code, 200)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        model2_statements = [stmt for stmt in statements if "model2" in stmt]
+        self.assertEqual(len(model2_statements), 1)
+        self.assertIn("GROUP BY", model2_statements[0])
+
+    def test_charts_columnar_processing(self):
+        """
+            Test columnar chart processing returns the same as the default
+        """
+        from flask_appbuilder.models.group import (
+            ColumnarGroupByProcessData,
+            GroupByProcessData,
+        )
+
+        def aggregate_first(items, col):
+            return getattr(items[0], col)
+
+        datamodel = SQLAInterface(Model2, self.db.session)
+        _, items = datamodel.query()
+        series = [
+            (aggregate_count, "field_integer"),
+            (aggregate_sum, "field_integer"),
+            (aggregate_avg, "field_float"),
+            (aggregate_first, "field_string"),
+        ]
+        labels = {"group_id": "Group"}
+        labels.update({f.__name__ + col: col for f, col in series})
+        expected = GroupByProcessData(["group_id"], series, {})
+        expected = expected.to_json(expected.apply(items), labels)
+        group = ColumnarGroupByProcessData(["group_id"], series, {})
+        group.use_numpy = False
+        self.assertEqual(group.to_json(group.apply(items), labels), expected)
+        self.assertEqual(group.apply([]), [])
+        if group.use_numpy != ColumnarGroupByProcessData.use_numpy:
+            group.use_numpy = True
+            result = group.to_json(group.apply(items), labels)
+            self.assertEqual(result["cols"], expected["cols"])
+            for row, expected_row in zip(result["rows"], expected["rows"]):
+                for value, expected_value in zip(row["c"], expected_row["c"]):
+                    self.assertAlmostEqual(value["v"], expected_value["v"])
+
+        # sums of large integers don't overflow
+        items = [
+            Model2(group_id=i % 2, field_integer=2 ** 62, field_float=1.0)
+            for i in range(5)
+        ]
+        expected = GroupByProcessData(["group_id"], series, {}).apply(items)
+        for use_numpy in {False, ColumnarGroupByProcessData.use_numpy}:
+            group.use_numpy = use_numpy
+            self.assertEqual(group.apply(items), expected)
+
+    def test_charts_reducers(self):
+        """
+            Test chart aggregation reducers, single pass and mergeable
+        """
+        import random
+        import statistics
+
+        from flask_appbuilder.models.group import (
+            aggregate_max,
+            aggregate_min,
+            aggregate_percentile,
+            aggregate_stddev,
+            GroupByProcessData,
+        )
+
+        datamodel = SQLAInterface(Model2, self.db.session)
+        _, items = datamodel.query()
+        values = [item.field_float for item in items]
+        # aggregate functions accept any iterable
+        self.assertEqual(
+            aggregate_avg((item for item in items), "field_float"),
+            sum(values) / len(values),
+        )
+        self.assertEqual(aggregate_min(iter(items), "field_float"), min(values))
+        self.assertEqual(aggregate_max(iter(items), "field_float"), max(values))
+        self.assertAlmostEqual(
+            aggregate_stddev(iter(items), "field_float"), statistics.stdev(values)
+        )
+        self.assertEqual(
+            aggregate_percentile(50)(iter(items), "field_float"),
+            statistics.median(values),
+        )
+        self.assertIsNone(aggregate_min([], "field_float"))
+
+        def aggregate_first(items, col):
+            return getattr(items[0], col)
+
+        series = [
+            (aggregate_count, "field_integer"),
+            (aggregate_sum, "field_integer"),
+            (aggregate_avg, "field_float"),
+            (aggregate_min, "field_integer"),
+            (aggregate_stddev, "field_float"),
+            (aggregate_percentile(90), "field_float"),
+            (aggregate_first, "field_string"),
+        ]
+        group = GroupByProcessData(["group_id"], series, {})
+        result = group.apply(items)
+        half = len(items) // 2
+        partial = group.merge_partials(
+            group.apply_partial(items[:half]), group.apply_partial(items[half:])
+        )
+        merged = group.finalize_partial(partial)
+        self.assertEqual([row[0] for row in merged], [row[0] for row in result])
+        for row, expected_row in zip(merged, result):
+            self.assertEqual(row[1:4] + row[6:], expected_row[1:4] + expected_row[6:])
+            self.assertAlmostEqual(row[4], expected_row[4])
+            self.assertAlmostEqual(row[5], expected_row[5])
+
+        # null values are skipped
+        null_items = [
+            Model2(field_string=f"null{i}", group_id=item.group_id)
+            for i, item in enumerate(items)
+        ]
+        self.assertAlmostEqual(
+            aggregate_stddev(items + null_items, "field_float"),
+            statistics.stdev(values),
+        )
+        self.assertEqual(
+            aggregate_percentile(50)(items + null_items, "field_float"),
+            statistics.median(values),
+        )
+        for row, expected_row in zip(group.apply(items + null_items), result):
+            self.assertAlmostEqual(row[4], expected_row[4])
+            self.assertAlmostEqual(row[5], expected_row[5])
+
+        # Approximate percentiles once compressed
+        rnd = random.Random(1)
+        data = [rnd.random() for _ in range(10000)]
+        reducer = aggregate_percentile(99)._reducer
+        chunks = []
+        for chunk in (data[:3000], data[3000:]):
+            state = reducer.init()
+            for value in chunk:
+                state = reducer.step(state, value)
+            chunks.append(state)
+        self.assertLessEqual(len(chunks[1]), 200)
+        expected = statistics.quantiles(data, n=100, method="inclusive")[98]
+        self.assertAlmostEqual(
+            reducer.finalize(reducer.merge(*chunks)), expected, delta=0.01
+        )
+
+    def test_charts_cache(self):
+        """
+            Test chart data cache, invalidation and stale while revalidate
+        """
+        import time
+
+        from flask_appbuilder.models.cache import (
+            bump_model_generation,
+            get_model_generation_name,
+            MemoryCache,
+        )
+
+        class Model2ChartCachedView(GroupByChartView):
+            route_base = "/model2chartcachedview"
+            datamodel = SQLAInterface(Model2)
+            cache_backend = MemoryCache()
+            definitions = [
+                {"group": "group_id", "series": [(aggregate_count, "field_integer")]}
+            ]
+
+        self.appbuilder.add_view(Model2ChartCachedView, "Model2 Chart Cached")
+        view = [
+            view
+            for view in self.appbuilder.baseviews
+            if isinstance(view, Model2ChartCachedView)
+        ][0]
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if "model2" in statement:
+                statements.append(statement)
+
+        def get_chart_statements():
+            statements.clear()
+            rv = client.get("/model2chartcachedview/chart/")
+            self.assertEqual(rv.status_code, 200)
+            return len(statements)
+
+        client = self.app.test_client()
+        self.browser_login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        datamodel = SQLAInterface(Model2, self.db.session)
+        engine = self.db.get_engine()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            self.assertEqual(get_chart_statements(), 1)
+            self.assertEqual(get_chart_statements(), 0)
+            # writes through an interface invalidate the cache
+            item = Model2(field_string="chart cache", field_integer=1, group_id=1)
+            datamodel.add(item)
+            self.assertEqual(get_chart_statements(), 1)
+            datamodel.delete(item)
+            self.assertEqual(get_chart_statements(), 1)
+            self.assertEqual(get_chart_statements(), 0)
+
+            # invalidated entries are refreshed before responding
+            view.cache_stale_timeout = 60
+            bump_model_generation(Model2)
+            self.assertEqual(get_chart_statements(), 1)
+            self.assertFalse(view._refreshing_keys)
+            [(key, (expiration, entry))] = view.cache_backend._entries.items()
+            self.assertEqual(
+                entry[1],
+                (view.cache_backend.get_generation(get_model_generation_name(Model2)),),
+            )
+
+            # expired entries are served and refreshed on the background
+            view.cache_timeout = 10
+            view.cache_backend._entries[key] = (
+                expiration,
+                (entry[0] - 20,) + entry[1:],
+            )
+            client.get("/model2chartcachedview/chart/")
+            for _ in range(100):
+                if not view._refreshing_keys:
+                    break
+                time.sleep(0.05)
+            [(_, (created, _, _))] = view.cache_backend._entries.values()
+            self.assertGreaterEqual(created, entry[0])
+            self.assertEqual(get_chart_statements(), 0)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    def test_charts_downsampling(self):
+        """
+            Test direct chart downsampling with time buckets and LTTB
+        """
+        from flask_appbuilder.models.group import lttb, time_buckets
+
+        datamodel = SQLAInterface(Model2, self.db.session)
+        rows = [
+            row
+            for row in datamodel.query_columns(
+                ["field_date", "field_integer"], None, "field_date", "asc"
+            )
+            if row[0] is not None
+        ]
+        bucket_size = datetime.timedelta(days=3650)
+        self.assertEqual(
+            datamodel.query_time_buckets(
+                "field_date", ["field_integer"], bucket_size=bucket_size
+            ),
+            list(time_buckets(rows, bucket_size)),
+        )
+        buckets = datamodel.query_time_buckets(
+            "field_date", ["field_integer"], max_points=5
+        )
+        self.assertLessEqual(len(buckets), 6)
+        self.assertEqual(buckets, list(time_buckets(rows, max_points=5)))
+        self.assertIsNone(datamodel.query_time_buckets("field_string", []))
+        self.assertIsNone(datamodel.query_time_buckets("field_date", ["field_string"]))
+
+        points = [[i, (i % 7) * (-1) ** i] for i in range(1000)]
+        downsampled = list(lttb(iter(points), 50, count=len(points)))
+        self.assertEqual(len(downsampled), 50)
+        self.assertEqual(downsampled[0], points[0])
+        self.assertEqual(downsampled[-1], points[-1])
+        self.assertEqual(list(lttb(points[:10], 50)), points[:10])
+
+        class Model2DownsampledChartView(DirectByChartView):
+            route_base = "/model2downsampledchartview"
+            datamodel = SQLAInterface(Model2)
+            definitions = [
+                {
+                    "group": "field_date",
+                    "series": ["field_integer", "field_float"],
+                    "downsample": "lttb",
+                    "max_points": 3,
+                },
+                {
+                    "group": "field_date",
+                    "series": ["field_integer"],
+                    "downsample": "bucket",
+                    "bucket_size": bucket_size,
+                },
+            ]
+
+        self.appbuilder.add_view(Model2DownsampledChartView, "Model2 Downsampled")
+        view = [
+            view
+            for view in self.appbuilder.baseviews
+            if isinstance(view, Model2DownsampledChartView)
+        ][0]
+        filters = datamodel.get_filters()
+        data = view.get_chart_data(view.definitions[0], filters, "", "")
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0][0], rows[0][0])
+        self.assertEqual(data[-1][0], rows[-1][0])
+        data = view.get_chart_data(view.definitions[1], filters, "", "")
+        self.assertEqual(data, list(time_buckets(rows, bucket_size)))
+
+        client = self.app.test_client()
+        self.browser_login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+        for i in range(2):
+            rv = client.get(f"/model2downsampledchartview/chart/{i}")
+            self.assertEqual(rv.status_code, 200)
+
     def test_master_detail_view(self):
         """
             Test Master detail view
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+
+from flask_appbuilder import Model, ModelRestApi, ModelView
+from flask_appbuilder.models.cache import get_model_generation_name
+from flask_appbuilder.models.sqla.interface import SQLAInterface
+from flask_appbuilder.models.sqla.routing import SESSION_WRITES_KEY
+from flask_appbuilder.security.sqla.models import ViewMenu
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+from .sqla.models import Model1
+
+
+class ReadReplicaTestCase(FABTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        replica_uri = "sqlite:///" + os.path.join(tmp_dir, "replica.db")
+        self.setup_app(tmp_dir, FAB_READ_REPLICA_DATABASE_URI=replica_uri)
+        self.router = self.appbuilder.read_replica_router
+
+        # The replica has the same schema with different data
+        # so that tests can tell where reads went
+        self.replica_engine = create_engine(replica_uri)
+        Model.metadata.create_all(self.replica_engine)
+        replica_session = Session(bind=self.replica_engine)
+        replica_session.add(Model1(field_string="replica"))
+        replica_session.commit()
+        replica_session.close()
+        self.db.session.add(Model1(field_string="primary"))
+        self.db.session.commit()
+        # Forget the fixture writes, they would pin reads to the primary
+        self.router._last_writes.clear()
+
+        class Model1Api(ModelRestApi):
+            datamodel = SQLAInterface(Model1)
+
+        class Model1View(ModelView):
+            datamodel = SQLAInterface(Model1)
+            list_columns = ["field_string"]
+            show_columns = ["field_string"]
+
+        self.appbuilder.add_api(Model1Api)
+        self.appbuilder.add_view(Model1View, "Model1")
+
+    def tearDown(self):
+        self.router.dispose()
+        self.replica_engine.dispose()
+        self.teardown_app()
+
+    def get_list_strings(self, client, token):
+        rv = self.auth_client_get(client, token, "api/v1/model1api/")
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        return [item["field_string"] for item in data["result"]]
+
+    def test_api_reads_from_replica(self):
+        """
+            Read replica: REST API get, get_list and info read from the replica
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+        self.assertEqual(self.get_list_strings(client, token), ["replica"])
+        rv = self.auth_client_get(client, token, "api/v1/model1api/1")
+        self.assertEqual(rv.status_code, 200)
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data["result"]["field_string"], "replica")
+        rv = self.auth_client_get(client, token, "api/v1/model1api/_info")
+        self.assertEqual(rv.status_code, 200)
+
+    def test_view_reads_from_replica(self):
+        """
+            Read replica: ModelView list and show read from the replica
+        """
+        client = self.app.test_client()
+        self.browser_login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+        rv = client.get("/model1view/list/")
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn("<td>replica</td>", rv.data.decode("utf-8"))
+        self.assertNotIn("<td>primary</td>", rv.data.decode("utf-8"))
+        rv = client.get("/model1view/show/1")
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn("replica", rv.data.decode("utf-8"))
+
+    def test_read_your_writes(self):
+        """
+            Read replica: reads stay on the primary after a write
+        """
+        client = self.app.test_client()
+        token = self.login(client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+        rv = self.auth_client_post(
+            client, token, "api/v1/model1api/", {"field_string": "new"}
+        )
+        self.assertEqual(rv.status_code, 201)
+        self.assertEqual(
+            sorted(self.get_list_strings(client, token)), ["new", "primary"]
+        )
+        # Another process does not know about the write,
+        # but the user's session is still pinned
+        self.router._last_writes.clear()
+        self.assertEqual(
+            sorted(self.get_list_strings(client, token)), ["new", "primary"]
+        )
+        # Once the window has passed reads go back to the replica
+        self.router.read_your_writes_window = 0
+        self.assertEqual(self.get_list_strings(client, token), ["replica"])
+
+    def test_write_transaction_on_primary(self):
+        """
+            Read replica: reads inside a write transaction use the primary
+        """
+        datamodel = SQLAInterface(Model1, self.db.session)
+        with self.app.app_context():
+            self.assertIs(datamodel.get_read_session(), self.db.session)
+            with datamodel.read_only():
+                self.assertIs(datamodel.get_read_session(), self.router.session)
+                self.db.session.add(Model1(field_string="pending"))
+                self.assertIs(datamodel.get_read_session(), self.db.session)
+                self.db.session.flush()
+                self.assertIs(datamodel.get_read_session(), self.db.session)
+                self.db.session.rollback()
+                self.assertIs(datamodel.get_read_session(), self.router.session)
+                _, items = datamodel.query()
+                self.assertEqual([item.field_string for item in items], ["replica"])
+
+    def test_session_listeners(self):
+        """
+            Read replica: writes are tracked until the router is disposed
+        """
+        with self.app.app_context():
+            # ViewMenu defines __eq__ without __hash__
+            self.db.session.add(ViewMenu(name="replica_view"))
+            self.db.session.flush()
+            self.assertEqual(
+                self.db.session.info[SESSION_WRITES_KEY],
+                {get_model_generation_name(ViewMenu)},
+            )
+            self.db.session.rollback()
+
+        self.router.dispose()
+        self.router._last_writes.clear()
+        with self.app.app_context():
+            self.db.session.add(Model1(field_string="disposed"))
+            self.db.session.commit()
+        self.assertEqual(self.router._last_writes, {})
@@ -0,0 +1,134 @@
+import json
+
+from flask_appbuilder import ModelView
+from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+from .sqla.models import Model1, Model2, ModelMMChild, ModelMMParent
+
+
+class RelatedSelectTestCase(FABTestCase):
+    def setUp(self):
+        self.setup_app(FAB_RELATED_SELECT_THRESHOLD=10)
+
+        class Model2View(ModelView):
+            datamodel = SQLAInterface(Model2)
+
+        class ModelMMParentView(ModelView):
+            datamodel = SQLAInterface(ModelMMParent)
+
+        self.appbuilder.add_view(Model2View, "Model2")
+        self.appbuilder.add_view(ModelMMParentView, "ModelMMParent")
+
+        for i in range(30):
+            self.db.session.add(Model1(field_string=f"group{i:02d}"))
+            self.db.session.add(ModelMMChild(field_string=f"child{i:02d}"))
+        self.db.session.commit()
+        self.browser_login(self.client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+    def tearDown(self):
+        self.teardown_app()
+
+    def get_group(self, field_string):
+        return (
+            self.db.session.query(Model1)
+            .filter_by(field_string=field_string)
+            .one_or_none()
+        )
+
+    def test_lazy_select(self):
+        """
+            Related select: forms page related choices above the threshold
+        """
+        rv = self.client.get("/model2view/add")
+        data = rv.data.decode("utf-8")
+        self.assertIn("my_select2_lazy", data)
+        self.assertIn("/model2view/api/column/add/group", data)
+        self.assertNotIn("group29", data)
+
+        self.app.config["FAB_RELATED_SELECT_THRESHOLD"] = 100
+        rv = self.client.get("/model2view/add")
+        data = rv.data.decode("utf-8")
+        self.assertNotIn("my_select2_lazy", data)
+        self.assertIn("group29", data)
+
+    def test_lazy_select_validate(self):
+        """
+            Related select: submitted primary keys are looked up one by one
+        """
+        group = self.get_group("group25")
+        rv = self.client.post(
+            "/model2view/add",
+            data={"field_string": "item", "group": str(group.id)},
+            follow_redirects=True,
+        )
+        self.assertEqual(rv.status_code, 200)
+        item = self.db.session.query(Model2).filter_by(field_string="item").one()
+        self.assertEqual(item.group.field_string, "group25")
+
+        rv = self.client.get(f"/model2view/edit/{item.id}")
+        data = rv.data.decode("utf-8")
+        self.assertIn("group25", data)
+        self.assertNotIn("group24", data)
+
+        # Unknown keys are not loaded, the required relation is then missing
+        for pk in ("1000", "x", ""):
+            rv = self.client.post(
+                "/model2view/add", data={"field_string": "invalid", "group": pk}
+            )
+            self.assertIn("This field is required.", rv.data.decode("utf-8"))
+        self.assertIsNone(
+            self.db.session.query(Model2).filter_by(field_string="invalid").first()
+        )
+
+        # Multiple selects submit the lazy marker and comma joined keys
+        children = [child.id for child in self.db.session.query(ModelMMChild).limit(2)]
+        rv = self.client.post(
+            "/modelmmparentview/add",
+            data={
+                "field_string": "parent",
+                "children": ",".join(str(child) for child in children),
+                "_children-lazy": "1",
+            },
+            follow_redirects=True,
+        )
+        self.assertEqual(rv.status_code, 200)
+        parent = self.db.session.query(ModelMMParent).one()
+        self.assertEqual(sorted(child.id for child in parent.children), children)
+        rv = self.client.post(
+            "/modelmmparentview/add",
+            data={
+                "field_string": "invalid",
+                "children": f"{children[0]},1000",
+                "_children-lazy": "1",
+            },
+        )
+        self.assertIn("Not a valid choice", rv.data.decode("utf-8"))
+
+    def test_related_column_page(self):
+        """
+            Related select: the column API pages and searches choices
+        """
+        rv = self.client.get("/model2view/api/column/add/group?page=0&page_size=4")
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(
+            [item["text"] for item in data["results"]],
+            ["group00", "group01", "group02", "group03"],
+        )
+        self.assertEqual(data["results"][0]["id"], str(self.get_group("group00").id))
+        self.assertTrue(data["more"])
+
+        rv = self.client.get("/model2view/api/column/add/group?page=1&q=group2")
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(data, {"results": [], "more": False})
+        rv = self.client.get("/model2view/api/column/add/group?page=0&q=group2")
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(len(data["results"]), 10)
+        self.assertFalse(data["more"])
+
+        # Page sizes are capped to the threshold
+        rv = self.client.get("/model2view/api/column/edit/group?page=0&page_size=50")
+        data = json.loads(rv.data.decode("utf-8"))
+        self.assertEqual(len(data["results"]), 10)
+        self.assertTrue(data["more"])
@@ -0,0 +1,122 @@
+import threading
+from unittest import mock
+
+from flask_appbuilder import ModelView
+from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+from .sqla.models import Model1, Model2, Model4
+
+
+class RelatedViewsTestCase(FABTestCase):
+    def setUp(self):
+        self.setup_app()
+
+        class Model2View(ModelView):
+            datamodel = SQLAInterface(Model2)
+            list_columns = ["field_string", "group"]
+
+        class Model2IntegerView(ModelView):
+            datamodel = SQLAInterface(Model2)
+            list_columns = ["field_integer"]
+
+        class Model4View(ModelView):
+            datamodel = SQLAInterface(Model4)
+            list_columns = ["field_string"]
+
+        class Model1View(ModelView):
+            datamodel = SQLAInterface(Model1)
+            related_views = [Model2View, Model2IntegerView, Model4View]
+
+        self.appbuilder.add_view_no_menu(Model2View)
+        self.appbuilder.add_view_no_menu(Model2IntegerView)
+        self.appbuilder.add_view_no_menu(Model4View)
+        self.appbuilder.add_view(Model1View, "Model1")
+
+        group = Model1(field_string="group")
+        self.db.session.add(group)
+        for i in range(3):
+            self.db.session.add(
+                Model2(field_string=f"item{i}", field_integer=100 + i, group=group)
+            )
+        self.db.session.add(
+            Model4(field_string="model4", model1_1=group, model1_2=group)
+        )
+        self.db.session.commit()
+        self.group_id = group.id
+        self.browser_login(self.client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+    def tearDown(self):
+        self.teardown_app()
+
+    def count_queries(self):
+        calls = []
+        query = SQLAInterface.query
+
+        def counting_query(datamodel, *args, **kwargs):
+            calls.append((datamodel.obj, threading.current_thread().name))
+            return query(datamodel, *args, **kwargs)
+
+        patch = mock.patch.object(SQLAInterface, "query", counting_query)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return calls
+
+    def assert_related_views(self, data):
+        for value in ("item0", "item2", "100", "102", "model4"):
+            self.assertIn(value, data)
+
+    def test_related_views_batch(self):
+        """
+            Related views: identical queries of the same model and fk are shared
+        """
+        calls = self.count_queries()
+        with self.assertLogs("flask_appbuilder.baseviews", "DEBUG") as logs:
+            rv = self.client.get(f"/model1view/show/{self.group_id}")
+        self.assertEqual(rv.status_code, 200)
+        self.assert_related_views(rv.data.decode("utf-8"))
+        self.assertEqual(
+            sorted(call[0].__name__ for call in calls), ["Model2", "Model4"]
+        )
+        timings = [line for line in logs.output if "Related view" in line]
+        self.assertEqual(len(timings), 3)
+        self.assertIn("Model2IntegerView of Model1View", timings[1])
+
+        # Different pages are not shared
+        del calls[:]
+        rv = self.client.get(f"/model1view/edit/{self.group_id}?psize_Model2View=1")
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(len(calls), 3)
+
+    def test_related_views_parallel(self):
+        """
+            Related views: groups are rendered on the thread pool
+        """
+        self.app.config["FAB_RELATED_VIEWS_PARALLEL"] = True
+        self.app.config["FAB_RELATED_VIEWS_MAX_WORKERS"] = 2
+        calls = self.count_queries()
+        for url in ("show", "edit"):
+            del calls[:]
+            rv = self.client.get(f"/model1view/{url}/{self.group_id}")
+            self.assertEqual(rv.status_code, 200)
+            data = rv.data.decode("utf-8")
+            self.assert_related_views(data)
+            self.assertLess(data.index("item0"), data.index("model4"))
+            # Lazy relationship columns are loaded by the workers
+            self.assertEqual(data.count("<td>group</td>"), 3)
+            self.assertEqual(len(calls), 2)
+            for model, thread_name in calls:
+                self.assertTrue(thread_name.startswith("fab-related-views"))
+
+        # Saved edits are seen by the workers
+        rv = self.client.post(
+            f"/model1view/edit/{self.group_id}",
+            data={"field_string": "renamed"},
+            follow_redirects=True,
+        )
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn(
+            "renamed",
+            self.client.get(f"/model1view/show/{self.group_id}").data.decode("utf-8"),
+        )
@@ -0,0 +1,196 @@
+from flask_appbuilder import GroupByChartView, Model
+from flask_appbuilder.cli import rollup_refresh
+from flask_appbuilder.models.group import aggregate_avg, aggregate_count, aggregate_sum
+from flask_appbuilder.models.sqla.filters import FilterEqual, FilterGreater
+from flask_appbuilder.models.sqla.interface import SQLAInterface
+from flask_appbuilder.models.sqla.rollup import Rollup
+from sqlalchemy import Column, event, Float, Integer, MetaData, String
+
+from .base import FABTestCase
+from .const import PASSWORD_ADMIN, USERNAME_ADMIN
+
+
+class SaleModel(Model):
+    """ Keeps the test tables off the shared metadata """
+
+    __abstract__ = True
+    metadata = MetaData()
+
+
+class RollupSale(SaleModel):
+    id = Column(Integer, primary_key=True)
+    region = Column(String(50))
+    product = Column(String(50))
+    units = Column(Integer)
+    price = Column(Float)
+
+
+sales_rollup = Rollup(RollupSale, ["region", "product"], ["units", "price"], "sales")
+
+SERIES = [
+    (aggregate_count, "units"),
+    (aggregate_sum, "units"),
+    (aggregate_avg, "price"),
+]
+
+
+class RollupTestCase(FABTestCase):
+    def setUp(self):
+        self.setup_app()
+        SaleModel.metadata.create_all(self.db.get_engine())
+        self.datamodel = SQLAInterface(RollupSale, self.db.session)
+        for i in range(20):
+            self.datamodel.add(
+                RollupSale(
+                    region=["north", "south", None][i % 3],
+                    product=f"product{i % 2}",
+                    units=i,
+                    price=None if i == 4 else i * 1.5,
+                )
+            )
+
+    def tearDown(self):
+        self.teardown_app()
+
+    def assert_rollup_equal(self, group_by="region", filters=None):
+        self.assertEqual(
+            sales_rollup.query_aggregate(self.db.session, group_by, SERIES, filters),
+            self.datamodel.query_aggregate(group_by, SERIES, filters),
+        )
+
+    def test_incremental(self):
+        """
+            Rollup: maintained on insert, update and delete
+        """
+        self.assert_rollup_equal()
+        self.assert_rollup_equal("product")
+
+        item = self.datamodel.get(1)
+        item.region = "east"
+        item.units = 100
+        self.datamodel.edit(item)
+        self.assert_rollup_equal()
+        item.price = 3.0
+        self.datamodel.edit(item)
+        self.assert_rollup_equal()
+        # Old values of attributes expired by the commit are loaded
+        item.region = "west"
+        item.units = 5
+        self.datamodel.edit(item)
+        self.assert_rollup_equal()
+
+        self.datamodel.delete(item)
+        self.assert_rollup_equal()
+        for item in self.datamodel.query()[1]:
+            self.datamodel.delete(item)
+        self.assertEqual(
+            sales_rollup.query_aggregate(self.db.session, "region", SERIES), []
+        )
+        self.assertEqual(self.db.session.query(sales_rollup.rollup_model).count(), 0)
+
+    def test_concurrent_group(self):
+        """
+            Rollup: groups inserted meanwhile by another transaction are updated
+        """
+        other = {"id": 1000, "region": "west", "product": "product0", "units": 5}
+        engine = self.db.get_engine()
+        savepoints = []
+
+        def savepoint(conn, name):
+            savepoints.append(name)
+            if len(savepoints) == 1:
+                # Another transaction commits the first item of the group
+                conn.execute(RollupSale.__table__.insert().values(other))
+                sales_rollup._insert_group(
+                    conn,
+                    {"region": "west", "product": "product0"},
+                    {"units": 5, "price": None},
+                )
+
+        event.listen(engine, "savepoint", savepoint)
+        try:
+            item = RollupSale(region="west", product="product0", units=1, price=2.0)
+            self.datamodel.add(item)
+        finally:
+            event.remove(engine, "savepoint", savepoint)
+        self.assertEqual(len(savepoints), 1)
+        self.assertEqual(
+            self.db.session.query(sales_rollup.rollup_model)
+            .filter_by(region="west")
+            .count(),
+            1,
+        )
+        self.assert_rollup_equal()
+        item.units = 3
+        self.datamodel.edit(item)
+        self.assert_rollup_equal()
+        self.datamodel.delete(self.datamodel.get(1000))
+        self.assert_rollup_equal()
+        self.datamodel.delete(item)
+        self.assert_rollup_equal()
+
+    def test_filters(self):
+        """
+            Rollup: used only with compatible filters and series
+        """
+        filters = self.datamodel.get_filters().add_filter(
+            "product", FilterEqual, "product1"
+        )
+        self.assert_rollup_equal(filters=filters)
+        filters = self.datamodel.get_filters().add_filter("units", FilterGreater, 3)
+        self.assertIsNone(
+            sales_rollup.query_aggregate(self.db.session, "region", SERIES, filters)
+        )
+        self.assertIsNone(
+            sales_rollup.query_aggregate(self.db.session, "units", SERIES)
+        )
+        self.assertIsNone(
+            sales_rollup.query_aggregate(
+                self.db.session, "region", [(aggregate_sum, "id")]
+            )
+        )
+
+    def test_refresh(self):
+        """
+            Rollup: rebuilt by the rollup-refresh command after bulk changes
+        """
+        self.db.session.query(RollupSale).filter(RollupSale.region == "north").update(
+            {"units": 1000}, synchronize_session=False
+        )
+        self.db.session.commit()
+        self.assertNotEqual(
+            sales_rollup.query_aggregate(self.db.session, "region", SERIES),
+            self.datamodel.query_aggregate("region", SERIES),
+        )
+        result = self.app.test_cli_runner().invoke(rollup_refresh, ["-n", "sales"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Refreshed rollup sales", result.output)
+        self.assert_rollup_equal()
+
+    def test_chart_view(self):
+        """
+            Rollup: chart views read from their rollups
+        """
+
+        class SalesChartView(GroupByChartView):
+            datamodel = SQLAInterface(RollupSale)
+            rollups = [sales_rollup]
+            definitions = [{"group": "region", "series": SERIES}]
+
+        self.appbuilder.add_view(SalesChartView, "Sales")
+        self.browser_login(self.client, USERNAME_ADMIN, PASSWORD_ADMIN)
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.db.get_engine()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            rv = self.client.get("/saleschartview/chart/")
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(any("ab_rollup_sales" in stmt for stmt in statements))
+        self.assertFalse(any("FROM rollup_sale" in stmt for stmt in statements))
@@ -1,9 +1,11 @@
 import unittest
 
-from flask_appbuilder.models.sqla.interface import _is_sqla_type
+from flask_appbuilder.models.sqla.interface import _is_sqla_type, SQLAInterface
 from nose.tools import eq_
 import sqlalchemy as sa
 
+from .sqla.models import Model2, ModelMMParent, ModelOMParent, ModelWithEnums, TmpEnum
+
 
 class CustomSqlaType(sa.types.TypeDecorator):
     impl = sa.types.DateTime(timezone=True)
@@ -22,3 +24,41 @@ class FlaskTestCase(unittest.TestCase):
         eq_(True, _is_sqla_type(t1, sa.types.DateTime))
         eq_(True, _is_sqla_type(t2, sa.types.DateTime))
         eq_(False, _is_sqla_type(t3, sa.types.DateTime))
+
+    def test_column_info(self):
+        datamodel = SQLAInterface(Model2)
+        info = datamodel.get_column_info("field_string")
+        eq_(False, info.pk)
+        eq_(True, info.unique)
+        eq_(False, info.nullable)
+        eq_(50, datamodel.get_max_length("field_string"))
+        eq_(True, datamodel.is_string("field_string"))
+        eq_(False, datamodel.is_integer("field_string"))
+        eq_(True, datamodel.is_numeric("field_float"))
+        eq_(True, datamodel.is_float("field_float"))
+        eq_(True, datamodel.is_pk("id"))
+        eq_(True, datamodel.is_fk("group_id"))
+        eq_(-1, datamodel.get_max_length("field_integer"))
+        # Descriptors are built once and are immutable
+        self.assertIs(info, datamodel.get_column_info("field_string"))
+        with self.assertRaises(AttributeError):
+            info.nullable = True
+
+    def test_column_info_relations(self):
+        datamodel = SQLAInterface(Model2)
+        eq_(True, datamodel.is_relation_many_to_one("group"))
+        eq_(False, datamodel.is_nullable("group"))
+        eq_(False, datamodel.is_string("group"))
+        eq_(True, SQLAInterface(ModelMMParent).is_relation_many_to_many("children"))
+        eq_(True, SQLAInterface(ModelOMParent).is_relation_one_to_many("children"))
+        # Unknown names are never errors
+        eq_(False, datamodel.is_relation("not_a_column"))
+        eq_(False, datamodel.is_nullable("not_a_column"))
+        eq_(-1, datamodel.get_max_length("not_a_column"))
+
+    def test_column_info_enums(self):
+        datamodel = SQLAInterface(ModelWithEnums)
+        eq_(True, datamodel.is_enum("enum1"))
+        eq_(-1, datamodel.get_max_length("enum1"))
+        eq_(None, datamodel.get_column_info("enum1").enum_class)
+        eq_(TmpEnum, datamodel.get_column_info("enum2").enum_class)
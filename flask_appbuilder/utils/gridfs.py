@@ -0,0 +1,152 @@
+from datetime import timezone
+import mimetypes
+
+from flask import request, Response
+from werkzeug.datastructures import ContentRange
+from werkzeug.http import is_resource_modified
+
+IMMUTABLE_CACHE_TIMEOUT = 31536000
+""" max-age of immutable files, one year """
+
+
+def get_gridfs_etag(grid_out):
+    """
+        Returns the ETag of a GridFS file, its md5 when one was
+        computed on upload, else its id and upload date.
+        GridFS files are never changed, a new upload gets a new id
+
+        :param grid_out: A gridfs GridOut
+    """
+    md5 = getattr(grid_out, "md5", None)
+    if md5:
+        return md5
+    upload_date = get_upload_date(grid_out).replace(tzinfo=timezone.utc)
+    return "{0}-{1}".format(grid_out._id, int(upload_date.timestamp() * 1000))
+
+
+def _as_naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def get_upload_date(grid_out):
+    """
+        Returns the upload date of a GridFS file as a naive UTC datetime,
+        like pymongo returns them by default
+    """
+    return _as_naive_utc(grid_out.upload_date)
+
+
+def iter_gridfs(grid_out, start=0, length=None):
+    """
+        Yields the GridFS file chunk by chunk, from start and up to
+        length bytes, so only one chunk is kept in memory
+
+        :param grid_out: A gridfs GridOut
+        :param start: The first byte
+        :param length: The number of bytes, None for up to the end
+    """
+    remaining = grid_out.length - start if length is None else length
+    try:
+        grid_out.seek(start)
+        while remaining > 0:
+            data = grid_out.readchunk()
+            if not data:
+                break
+            if len(data) > remaining:
+                data = data[:remaining]
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
+
+
+def _if_range_matches(etag, last_modified):
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return last_modified.replace(microsecond=0) <= _as_naive_utc(if_range.date)
+    return True
+
+
+def send_gridfs_file(
+    grid_out,
+    mimetype=None,
+    as_attachment=False,
+    filename=None,
+    immutable=False,
+    cache_timeout=IMMUTABLE_CACHE_TIMEOUT,
+):
+    """
+        Returns a streamed response for a GridFS file, the file is read a
+        chunk at a time while it's sent. Handles conditional requests with
+        the file ETag and upload date, and single byte ranges, so that
+        browsers can seek on videos and large PDFs.
+
+        :param grid_out: A gridfs GridOut, from a GridFSProxy.get()
+            or an ImageGridFsProxy.thumbnail
+        :param mimetype: The response mimetype, by default the file
+            content type or guessed from the file name
+        :param as_attachment: Sends the file with an attachment
+            Content-Disposition
+        :param filename: The attachment file name, by default the
+            GridFS file name
+        :param immutable: Set when the URL identifies this exact file,
+            responses are then cached by clients for cache_timeout seconds.
+            Otherwise clients revalidate with the ETag on each use
+        :param cache_timeout: The max-age of immutable responses
+    """
+    filename = filename or grid_out.filename
+    mimetype = (
+        mimetype
+        or getattr(grid_out, "content_type", None)
+        or (filename and mimetypes.guess_type(filename)[0])
+        or "application/octet-stream"
+    )
+    etag = get_gridfs_etag(grid_out)
+    last_modified = get_upload_date(grid_out)
+    complete_length = grid_out.length
+
+    response = Response(mimetype=mimetype, direct_passthrough=True)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.accept_ranges = "bytes"
+    if immutable:
+        response.headers["Cache-Control"] = "public, max-age={0}, immutable".format(
+            cache_timeout
+        )
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    if as_attachment and filename:
+        response.headers.set("Content-Disposition", "attachment", filename=filename)
+
+    if not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response.status_code = 304
+        return response
+
+    start, length = 0, complete_length
+    byte_range = request.range
+    # Multiple ranges are not supported, the whole file is sent
+    if (
+        byte_range
+        and len(byte_range.ranges) == 1
+        and _if_range_matches(etag, last_modified)
+    ):
+        bounds = byte_range.range_for_length(complete_length)
+        if bounds is None:
+            response.status_code = 416
+            response.content_range = ContentRange("bytes", None, None, complete_length)
+            response.content_length = 0
+            return response
+        start, stop = bounds
+        length = stop - start
+        response.status_code = 206
+        response.content_range = ContentRange("bytes", start, stop, complete_length)
+    response.content_length = length
+    if request.method != "HEAD":
+        response.response = iter_gridfs(grid_out, start, length)
+    return response
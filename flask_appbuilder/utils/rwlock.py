@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+import threading
+
+
+class ReadWriteLock(object):
+    """
+        A lock shared by many readers or held by a single writer.
+        Waiting writers go before new readers, so that readers can't
+        starve them. Both are reentrant for the same thread, and the
+        writer may also read, but a reader can't become a writer.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer = None
+        self._write_depth = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        """
+            Holds the lock for reading while the context is active
+        """
+        me = threading.get_ident()
+        depth = getattr(self._local, "read_depth", 0)
+        if depth or self._writer == me:
+            self._local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth -= 1
+            return
+        with self._condition:
+            while self._writer is not None or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+            Holds the lock for writing while the context is active
+        """
+        me = threading.get_ident()
+        if getattr(self._local, "read_depth", 0) and self._writer != me:
+            raise RuntimeError("Can't write while holding the lock for reading")
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                self._writers_waiting += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._writers_waiting -= 1
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._condition.notify_all()
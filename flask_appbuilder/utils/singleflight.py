@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+log = logging.getLogger(__name__)
+
+
+class _Call(object):
+    """
+        An in-flight call, the leader sets the result
+        and the followers wait on the event
+    """
+
+    __slots__ = ("event", "result", "exception", "followers")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
+        self.followers = 0
+
+
+class SingleFlight(object):
+    """
+        Coalesces identical concurrent calls: while a call for a key
+        is in flight, other callers for the same key wait for it and
+        share its result (or its exception) instead of executing again.
+
+        Nothing is kept after the leader finishes, this is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._total = 0
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+            Executes func once for all concurrent callers of key
+
+        :param key: A hashable that identifies identical calls
+        :param func: The callable to execute
+        :return: The result of func
+        """
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+        if not leader:
+            call.event.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.followers:
+                log.debug("Shared call result with %s waiting callers", call.followers)
+            call.event.set()
+        return call.result
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the coalescing counters since creation or last reset,
+            hit_rate is the ratio of calls that shared an in-flight result
+        """
+        with self._lock:
+            return {
+                "calls": self._total,
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+                "hit_rate": self._coalesced / self._total if self._total else 0.0,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._total = 0
+            self._executed = 0
+            self._coalesced = 0
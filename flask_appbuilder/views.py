@@ -1,10 +1,11 @@
 import json
 import logging
 import os.path as op
-from typing import Set
+from typing import Dict, Optional, Set
 
 from flask import (
     abort,
+    current_app,
     flash,
     jsonify,
     make_response,
@@ -18,9 +19,11 @@ from flask import (
 from ._compat import as_unicode, string_types
 from .baseviews import BaseCRUDView, BaseFormView, BaseView, expose, expose_api
 from .const import FLAMSG_ERR_SEC_ACCESS_DENIED, PERMISSION_PREFIX
+from .fields import DEFAULT_RELATED_SELECT_THRESHOLD
 from .filemanager import uuid_originalname
 from .security.decorators import has_access, has_access_api, permission_name
 from .urltools import get_filter_args, get_order_args, get_page_args, get_page_size_args
+from .utils.gridfs import IMMUTABLE_CACHE_TIMEOUT, send_gridfs_file
 from .widgets import GroupFormListWidget, ListMasterWidget
 
 log = logging.getLogger(__name__)
@@ -159,6 +162,15 @@ class RestCRUDView(BaseCRUDView):
     disable_api_route_methods: bool = False
     """ Flag to disable this class exposed methods, note that this class
     will eventually get deprecated """
+    related_select_search_columns: Optional[Dict[str, str]] = None
+    """
+        Dictionary of related column names and the column of the related
+        model searched by their paged select, when there are more choices
+        than the FAB_RELATED_SELECT_THRESHOLD config key. By default the
+        first string search column of the related model::
+
+            related_select_search_columns = {"contact_group": "name"}
+    """
 
     def __init__(self, **kwargs):
         if self.disable_api_route_methods:
@@ -179,6 +191,17 @@ class RestCRUDView(BaseCRUDView):
     def _search_form_json(self):
         pass
 
+    def _get_related_url_func(self, form_name):
+        method_name = "api_column_" + form_name
+        if method_name in self.exclude_route_methods or (
+            self.include_route_methods is not None
+            and method_name not in self.include_route_methods
+        ):
+            return None
+        return lambda col_name: url_for(
+            self.endpoint + "." + method_name, col_name=col_name
+        )
+
     def _get_api_urls(self, api_urls=None):
         """
             Completes a dict with the CRUD urls of the API.
@@ -420,6 +443,57 @@ class RestCRUDView(BaseCRUDView):
         response.headers["Content-Type"] = "application/json"
         return response
 
+    def _get_related_search_filter(self, col_name, filters):
+        """
+            Returns the column and the starts with filter class used to
+            search the paged select of a related column
+        """
+        search_filters = filters.get_search_filters()
+        search_column = (self.related_select_search_columns or {}).get(col_name)
+        if search_column:
+            search_columns = [search_column]
+        else:
+            search_columns = [
+                col
+                for col in filters.search_columns
+                if filters.datamodel.is_string(col)
+            ]
+        for col in search_columns:
+            for flt in search_filters.get(col, []):
+                if flt.arg_name == "sw":
+                    return col, type(flt)
+        return None, None
+
+    def _get_related_column_page(self, col_name, filters):
+        """
+            Returns a page of the choices of a related column,
+            searched with the q argument
+        """
+        rel_datamodel = filters.datamodel
+        page = max(request.args.get("page", 0, type=int), 0)
+        threshold = current_app.config.get(
+            "FAB_RELATED_SELECT_THRESHOLD", DEFAULT_RELATED_SELECT_THRESHOLD
+        )
+        page_size = request.args.get("page_size", 25, type=int)
+        page_size = max(1, min(page_size, threshold or page_size))
+        search_column, filter_class = self._get_related_search_filter(col_name, filters)
+        term = request.args.get("q", "")
+        if term and filter_class:
+            filters.add_filter(search_column, filter_class, term)
+        order_column = search_column or rel_datamodel.get_pk_name()
+        count, result = rel_datamodel.query(
+            filters, order_column, "asc", page=page, page_size=page_size
+        )
+        return json.dumps(
+            {
+                "results": [
+                    {"id": str(rel_datamodel.get_pk_value(item)), "text": str(item)}
+                    for item in result
+                ],
+                "more": (page + 1) * page_size < count,
+            }
+        )
+
     def _get_related_column_data(self, col_name, filters):
         rel_datamodel = self.datamodel.get_related_interface(col_name)
         _filters = rel_datamodel.get_filters(rel_datamodel.get_search_columns_list())
@@ -428,6 +502,9 @@ class RestCRUDView(BaseCRUDView):
             filters = _filters.add_filter_list(filters)
         else:
             filters = _filters
+        if "page" in request.args:
+            return self._get_related_column_page(col_name, filters)
+        log.warning("This API is deprecated and will be removed on 2.3.X")
         result = rel_datamodel.query(filters)[1]
         ret_list = list()
         for item in result:
@@ -445,10 +522,12 @@ class RestCRUDView(BaseCRUDView):
             Use only for related columns.
             Always filters with add_form_query_rel_fields, and accepts extra filters
             on endpoint arguments.
+            With a page argument returns a page of the choices and if there
+            are more, searched with the q argument, for the paged select2
+            of related columns with too many choices.
         :param col_name: The related column name
         :return: JSON response
         """
-        log.warning("This API is deprecated and will be removed on 2.3.X")
         filter_rel_fields = None
         if self.add_form_query_rel_fields:
             filter_rel_fields = self.add_form_query_rel_fields.get(col_name)
@@ -466,13 +545,15 @@ class RestCRUDView(BaseCRUDView):
             Use only for related columns.
             Always filters with edit_form_query_rel_fields, and accepts extra filters
             on endpoint arguments.
+            With a page argument returns a page of the choices and if there
+            are more, searched with the q argument, for the paged select2
+            of related columns with too many choices.
         :param col_name: The related column name
         :return: JSON response
         """
-        log.warning("This API is deprecated and will be removed on 2.3.X")
         filter_rel_fields = None
         if self.edit_form_query_rel_fields:
-            filter_rel_fields = self.edit_form_query_rel_fields
+            filter_rel_fields = self.edit_form_query_rel_fields.get(col_name)
         ret_json = self._get_related_column_data(col_name, filter_rel_fields)
         response = make_response(ret_json, 200)
         response.headers["Content-Type"] = "application/json"
@@ -521,6 +602,13 @@ class ModelView(RestCRUDView):
     """
 
     def __init__(self, **kwargs):
+        # The gridfs route is only added to views of models with GridFS columns
+        if not any(
+            self.datamodel.is_gridfs_file(col_name)
+            or self.datamodel.is_gridfs_image(col_name)
+            for col_name in self.datamodel.get_columns_list()
+        ):
+            self.exclude_route_methods = self.exclude_route_methods | {"gridfs"}
         super(ModelView, self).__init__(**kwargs)
 
     def post_add_redirect(self):
@@ -547,11 +635,11 @@ class ModelView(RestCRUDView):
     @expose("/list/")
     @has_access
     def list(self):
-
-        widgets = self._list()
-        return self.render_template(
-            self.list_template, title=self.list_title, widgets=widgets
-        )
+        with self.datamodel.read_only():
+            widgets = self._list()
+            return self.render_template(
+                self.list_template, title=self.list_title, widgets=widgets
+            )
 
     """
     --------------------------------
@@ -563,14 +651,15 @@ class ModelView(RestCRUDView):
     @has_access
     def show(self, pk):
         pk = self._deserialize_pk_if_composite(pk)
-        widgets = self._show(pk)
-        return self.render_template(
-            self.show_template,
-            pk=pk,
-            title=self.show_title,
-            widgets=widgets,
-            related_views=self._related_views,
-        )
+        with self.datamodel.read_only():
+            widgets = self._show(pk)
+            return self.render_template(
+                self.show_template,
+                pk=pk,
+                title=self.show_title,
+                widgets=widgets,
+                related_views=self._related_views,
+            )
 
     """
     ---------------------------
@@ -638,6 +727,69 @@ class ModelView(RestCRUDView):
             as_attachment=True,
         )
 
+    @expose("/gridfs/<pk>/<string:col_name>")
+    @expose("/gridfs/<pk>/<string:col_name>/<string:file_id>")
+    @has_access
+    @permission_name("show")
+    def gridfs(self, pk, col_name, file_id=None):
+        """
+            Streams a MongoEngine GridFS file or image column, with range
+            requests. Use the thumbnail query argument for image thumbnails
+            and download to send the file as an attachment. URLs with the
+            GridFS file id, from get_gridfs_url, are cached as immutable
+        """
+        if not (
+            self.datamodel.is_gridfs_file(col_name)
+            or self.datamodel.is_gridfs_image(col_name)
+        ):
+            abort(404)
+        pk = self._deserialize_pk_if_composite(pk)
+        item = self.datamodel.get(pk, self._base_filters)
+        if not item:
+            abort(404)
+        proxy = getattr(item, col_name)
+        if request.args.get("thumbnail") and self.datamodel.is_gridfs_image(col_name):
+            grid_out = proxy.thumbnail
+        else:
+            grid_out = proxy.get()
+        if not grid_out:
+            abort(404)
+        if file_id is not None and file_id != str(grid_out._id):
+            abort(404)
+        return send_gridfs_file(
+            grid_out,
+            as_attachment=bool(request.args.get("download")),
+            immutable=file_id is not None,
+            cache_timeout=self.appbuilder.get_app.config.get(
+                "FAB_GRIDFS_CACHE_TIMEOUT", IMMUTABLE_CACHE_TIMEOUT
+            ),
+        )
+
+    def get_gridfs_url(self, item, col_name, thumbnail=False, download=False):
+        """
+            Returns the gridfs endpoint URL of a GridFS file or image
+            column of item, with the GridFS file id, so that browsers
+            cache the file until a new one is uploaded.
+            Returns None when there is no file
+
+            :param item: A MongoEngine document
+            :param col_name: The GridFS column name
+            :param thumbnail: The URL of the image thumbnail
+            :param download: The URL sends the file as an attachment
+        """
+        proxy = getattr(item, col_name)
+        grid_out = proxy.thumbnail if thumbnail else proxy.get()
+        if not grid_out:
+            return None
+        return url_for(
+            self.endpoint + ".gridfs",
+            pk=str(self.datamodel.get_pk_value(item)),
+            col_name=col_name,
+            file_id=str(grid_out._id),
+            thumbnail=1 if thumbnail else None,
+            download=1 if download else None,
+        )
+
     def get_action_permission_name(self, name: str) -> str:
         """
             Get the permission name of an action name
@@ -682,9 +834,9 @@ class ModelView(RestCRUDView):
 
         if self.appbuilder.sm.has_access(permission_name, self.class_permission_name):
             action = self.actions.get(name)
-            items = [
-                self.datamodel.get(self._deserialize_pk_if_composite(pk)) for pk in pks
-            ]
+            items = self.datamodel.get_many(
+                [self._deserialize_pk_if_composite(pk) for pk in pks]
+            )
             return action.func(items)
         else:
             flash(as_unicode(FLAMSG_ERR_SEC_ACCESS_DENIED), "danger")
@@ -0,0 +1,91 @@
+"""
+    Compares the default and the columnar chart processing classes,
+    on synthetic items grouped by a model method, like GroupByChartView does.
+
+    Usage: python scripts/benchmark_chart_processing.py [ROWS] [GROUPS]
+"""
+import random
+import sys
+import time
+
+from flask_appbuilder.models.group import (
+    aggregate_avg,
+    aggregate_count,
+    aggregate_sum,
+    ColumnarGroupByProcessData,
+    GroupByProcessData,
+)
+
+
+class Sale(object):
+    def __init__(self, region, units, price):
+        self.region = region
+        self.units = units
+        self.price = price
+
+    def region_name(self):
+        return f"Region {self.region}"
+
+
+def make_items(rows, groups):
+    rnd = random.Random(42)
+    return [
+        Sale(rnd.randrange(groups), rnd.randrange(100), rnd.random() * 100)
+        for _ in range(rows)
+    ]
+
+
+def run(process_class, items, use_numpy=None):
+    series = [
+        (aggregate_count, "units"),
+        (aggregate_sum, "units"),
+        (aggregate_avg, "price"),
+    ]
+    labels = {"region_name": "Region"}
+    labels.update({func.__name__ + col: col for func, col in series})
+    group = process_class(["region_name"], series, {})
+    if use_numpy is not None:
+        group.use_numpy = use_numpy
+    start = time.perf_counter()
+    result = group.to_json(group.apply(items), labels)
+    return time.perf_counter() - start, result
+
+
+def max_difference(expected, result):
+    """
+        NumPy sums floats pairwise, so results may differ on rounding
+    """
+    differences = [0]
+    for expected_row, result_row in zip(expected, result):
+        expected_cells = [cell["v"] for cell in expected_row["c"]]
+        result_cells = [cell["v"] for cell in result_row["c"]]
+        assert expected_cells[0] == result_cells[0]
+        differences.extend(
+            abs(value - other)
+            for value, other in zip(expected_cells[1:], result_cells[1:])
+        )
+    return max(differences)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    groups = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    items = make_items(rows, groups)
+    print(f"{rows} rows, {groups} groups")
+
+    baseline, expected = run(GroupByProcessData, items)
+    print(f"GroupByProcessData:                {baseline:.3f}s")
+    engines = [("array", False)]
+    if ColumnarGroupByProcessData.use_numpy:
+        engines.append(("numpy", True))
+    for name, use_numpy in engines:
+        elapsed, result = run(ColumnarGroupByProcessData, items, use_numpy)
+        print(
+            f"ColumnarGroupByProcessData {name:6} {elapsed:.3f}s "
+            f"({baseline / elapsed:.1f}x, max difference: "
+            f"{max_difference(expected['rows'], result['rows']):.2g})"
+        )
+
+
+if __name__ == "__main__":
+    main()